@@ -1,90 +1,196 @@
 import gradio as gr
 import os
-import shutil
-from src.vector_store import vector_store
-from src.qa_chain import qa_chain
+import time
+from src.document_processing import doc_processor
+from src.ingest_jobs import ingest_queue
+from src.folder_watcher import data_watcher
+from src.startup_sync import SYNC_FAILED, SYNC_RUNNING, initial_sync
 from src.acoustic_tools import AcousticCalculator
-from src.utils import extract_top_keywords, generate_knowledge_charts, generate_tl_range_plot
+from src.utils import generate_knowledge_charts, generate_tl_range_plot
+
+# Data 目录同步时的并行解析进程数 (1 = 逐个文件串行处理)
+BULK_INGEST_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+# 监听 data 目录的文件增删改并自动增量入库 (需要 watchfiles)，关闭时只在启动和点击"扫描并同步"时同步
+WATCH_DATA_FOLDER = False
+# "列出已入库文件" 每页显示的文件数
+FILE_LIST_PAGE_SIZE = 50
 
 # ================= 辅助函数 =================
 
-def upload_and_process(file_obj, doc_type):
-    if not file_obj:
-        return "请选择文件。"
-    
-    try:
-        # Create temp directory
-        temp_dir = os.path.join(os.getcwd(), "temp_uploads")
-        os.makedirs(temp_dir, exist_ok=True)
+def get_vector_store():
+    """
+    向量库单例 (嵌入模型、Chroma) 按需导入：解析/OCR/嵌入进程池的子进程在 spawn 方式 (Windows)
+    下会重新导入本模块，模块顶层不能加载模型
+    """
+    from src.vector_store import vector_store
+    return vector_store
+
+def get_qa_chain():
+    """
+    问答链单例 (LLM、重排模型)，同样按需导入
+    """
+    from src.qa_chain import qa_chain
+    return qa_chain
+
+def upload_and_process(file_objs, doc_type):
+    """
+    只负责把文件加入后台入库队列 (可一次上传多个文件)，解析/OCR/向量化由队列的工作线程并行完成
+    返回 (提示信息, 批次 ID)
+    """
+    if not file_objs:
+        return "请选择文件。", None
+    if not isinstance(file_objs, list):
+        file_objs = [file_objs]
 
+    paths = []
+    skipped = []
+    for file_obj in file_objs:
         # Determine source path
         if hasattr(file_obj, 'name'):
             source_path = file_obj.name
         else:
             source_path = str(file_obj)
-        
-        filename = os.path.basename(source_path)
-        saved_path = os.path.join(temp_dir, filename)
-        
-        shutil.copy2(source_path, saved_path)
-        
-        if not os.path.exists(saved_path) or os.path.getsize(saved_path) == 0:
-            return "上传失败: 文件为空或无法读取。"
-
-        success, msg, num_chunks = vector_store.add_document(saved_path, doc_type)
-        
-        try:
-            if os.path.exists(saved_path):
-                os.remove(saved_path)
-        except:
-            pass
-        
-        if success:
-            return f"成功！文件名: {filename}\n类型: {doc_type}\n新增片段数: {num_chunks}"
+        if not os.path.exists(source_path) or os.path.getsize(source_path) == 0:
+            skipped.append(os.path.basename(source_path))
         else:
-            return f"失败: {msg}"
-            
+            paths.append(source_path)
+    if not paths:
+        return "上传失败: 文件为空或无法读取。", None
+
+    try:
+        # Staged from Gradio's temp path (hard link, a copy if it is on another volume),
+        # the jobs survive a restart
+        batch_id, job_ids = ingest_queue.enqueue_batch(paths, doc_type)
     except Exception as e:
-        return f"处理异常: {str(e)}"
+        return f"处理异常: {str(e)}", None
+    msg = f"已加入入库队列！批次 {batch_id}：{len(job_ids)} 个文件\n类型: {doc_type}\n进度见下方任务列表。"
+    if skipped:
+        msg += f"\n跳过空文件或无法读取的文件: {', '.join(skipped)}"
+    return msg, batch_id
+
+def batch_report_text(batch_id):
+    """
+    当前上传批次的逐个文件结果和吞吐量 (供前端轮询)
+    """
+    report = ingest_queue.batch_report(batch_id) if batch_id else None
+    if report is None:
+        return ""
+    lines = [
+        f"批次 {report['batch']}：完成 {report['finished']}/{report['total']} 个文件 (成功 {report['completed']})，"
+        f"用时 {report['elapsed_s']} 秒，{report['files_per_min']} 文件/分钟，"
+        f"{report['pages_per_s']} 页/秒，{report['chunks_per_s']} 片段/秒"
+    ]
+    for item in report["files"]:
+        status = JOB_STATUS_LABELS.get(item["status"], item["status"])
+        lines.append(f"  {item['file_name']}: {status}，{item['pages']} 页，{item['chunks']} 片段，{item['seconds']} 秒 {item['message']}")
+    return "\n".join(lines)
+
+JOB_STATUS_LABELS = {"queued": "排队中", "running": "处理中", "completed": "完成", "failed": "失败", "cancelled": "已取消"}
+
+def list_ingest_jobs():
+    """
+    入库任务列表 (供前端轮询)
+    """
+    rows = []
+    for job in ingest_queue.list_jobs(limit=20):
+        progress = f"{job['current_page']}/{job['total_pages']} 页"
+        rows.append([
+            job["id"], job["file_name"], JOB_STATUS_LABELS.get(job["status"], job["status"]),
+            progress, job["chunks"], job["message"]
+        ])
+    return rows
+
+def list_indexed_files_page(page):
+    """
+    已入库文件的一页 (来自来源登记表，不扫描向量库)
+    """
+    vector_store = get_vector_store()
+    total = vector_store.registry.totals()["files"]
+    num_pages = max(1, (total + FILE_LIST_PAGE_SIZE - 1) // FILE_LIST_PAGE_SIZE)
+    page = min(max(int(page or 0), 0), num_pages - 1)
+    rows = []
+    for entry in vector_store.registry.list_sources(page * FILE_LIST_PAGE_SIZE, FILE_LIST_PAGE_SIZE):
+        rows.append([
+            entry["source_path"], entry["doc_type"] or "", entry["chunks"], entry["over_limit"], entry["pages"],
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["ingested_at"]))
+        ])
+    info = f"第 {page + 1} / {num_pages} 页，共 {total} 个文件" if total else "暂无已入库文件。"
+    return rows, info, page
+
+def cancel_ingest_job(job_id):
+    job_id = (job_id or "").strip()
+    if not job_id:
+        return "请输入任务 ID。"
+    if ingest_queue.cancel(job_id):
+        return f"已请求取消任务 {job_id}。"
+    return f"任务 {job_id} 不存在或已结束。"
 
 def sync_data_folder_ui():
     folder_path = "data"
+    if initial_sync.running:
+        return "启动时的后台同步尚未完成，请稍后再试 (进度见页面顶部)。"
     if not os.path.exists(folder_path):
         return f"文件夹 {folder_path} 不存在。"
-    added_files = vector_store.scan_and_ingest(folder_path)
-    if added_files:
-        return f"同步成功！已自动添加 {len(added_files)} 个新文件：\n" + "\n".join(added_files)
-    else:
-        return "data 文件夹中没有发现新文件。"
+    result = get_vector_store().sync_folder(folder_path, workers=BULK_INGEST_WORKERS)
+    if not any(result.values()):
+        return "data 文件夹中没有发现新增、修改或删除的文件。"
+    lines = []
+    for label, key in [("新增", "added"), ("更新", "updated"), ("移除", "removed"), ("失败", "failed")]:
+        if result[key]:
+            lines.append(f"{label} {len(result[key])} 个文件：")
+            lines.extend(result[key])
+    return "同步完成！\n" + "\n".join(lines)
+
+def readiness_text():
+    """
+    页面顶部的就绪状态 (供前端轮询)。后台同步期间问答照常使用当前索引
+    """
+    status = initial_sync.status()
+    if status["state"] == SYNC_RUNNING:
+        if not status["total"]:
+            return f"⏳ 正在扫描 data 目录... (已用时 {status['elapsed_s']} 秒，可正常问答)"
+        return (f"⏳ 正在后台同步 data 目录：{status['done']}/{status['total']} 个文件"
+                f" (当前: {status['current']})，已用时 {status['elapsed_s']} 秒。"
+                f"同步期间可正常问答，回答基于已入库的内容。")
+    if status["state"] == SYNC_FAILED:
+        return f"⚠️ 启动同步失败: {status['error']}。可在 知识库管理 → 同步 Data 目录 中重试。"
+    result = status["result"]
+    if result and any(result.values()):
+        return (f"✅ 知识库就绪 (启动同步: 新增 {result['added']}，更新 {result['updated']}，"
+                f"移除 {result['removed']}，失败 {result['failed']}，用时 {status['elapsed_s']} 秒)")
+    return "✅ 知识库就绪"
+
+def data_watcher_status():
+    if not data_watcher.running:
+        return "目录监听：未开启 (见 app.py 中的 WATCH_DATA_FOLDER)"
+    stats = data_watcher.stats()
+    return (f"目录监听：运行中 | 新增 {stats['added']}，更新 {stats['updated']}，"
+            f"移除 {stats['removed']}，失败 {stats['failed']}，等待写入完成 {stats['pending']}")
 
 def get_knowledge_stats():
     """
-    获取知识库统计数据和热词 (全量统计)
+    获取知识库统计数据和热词 (读登记表和增量词频，不扫描向量库)
     """
     try:
-        files = vector_store.get_indexed_files()
-        
-        # 获取向量总数
-        total_vectors = 0
-        collection = vector_store.vectordb.get()
-        if collection and "ids" in collection:
-            total_vectors = len(collection["ids"])
-            
+        vector_store = get_vector_store()
+        totals = vector_store.registry.totals()
         stats = {
-            "total_files": len(files),
-            "total_vectors": total_vectors
+            "total_files": totals["files"],
+            "total_pages": totals["pages"],
+            "total_vectors": vector_store.vectordb._collection.count(),
+            # Chunks longer than the embedding model's window (their tail is truncated when embedded)
+            "over_token_limit": totals["over_limit"],
+            "embedding_cache": vector_store.embedding_cache.stats(),
+            # Parse/OCR cache lookups since startup, including those of bulk ingest workers
+            "parse_cache": doc_processor.cache.stats() if doc_processor.cache is not None else None,
+            "embedding": vector_store.batch_embedder.stats()
         }
         
-        # 2. 提取热词 (全量统计)
-        keywords = [("暂无数据", 0)]
+        # 2. 热词：入库时按片段统计的词频 (src/keyword_stats.py)，不再对全库重新分词
+        keywords = vector_store.top_keywords(top_n=5)
         chart_path = None
         
-        if collection and "documents" in collection and collection["documents"]:
-            # 全量统计：虽然有点慢，但能保证准确和一致
-            # 如果文档真的超级多（>10万），再考虑采样。现在 1.2万还可以接受。
-            all_docs = collection["documents"]
-            keywords = extract_top_keywords(all_docs, top_n=5)
-            
+        if keywords and keywords[0][1] > 0:
             # 3. 生成统计图表 (Top 5 柱状图)
             chart_path = generate_knowledge_charts(keywords)
             
@@ -207,7 +313,7 @@ def chat_response(message, history, scene_env, sonar_type, sea_state, bottom_typ
     # 注意：这里我们把 effective_query 传进去
     full_response = ""
     try:
-        for answer, _ in qa_chain.answer_question_stream(effective_query, history[:-2]):
+        for answer, _ in get_qa_chain().answer_question_stream(effective_query, history[:-2]):
             full_response = answer
             history[-1]["content"] = full_response
             yield "", history
@@ -267,6 +373,9 @@ def send_calc_to_chat(result, history):
 
 with gr.Blocks(title="水声工程智能问答系统") as demo:
     gr.Markdown("# 🌊 水声工程智能问答系统")
+    readiness = gr.Markdown()
+    readiness_timer = gr.Timer(2.0)
+    readiness_timer.tick(readiness_text, None, readiness)
 
     with gr.Tabs(selected="qa") as top_tabs:
         with gr.Tab("问答系统", id="qa"):
@@ -460,22 +569,43 @@ with gr.Blocks(title="水声工程智能问答系统") as demo:
             gr.Markdown("## 📚 知识库管理")
             with gr.Tabs():
                 with gr.Tab("上传文档"):
-                    kb_f_in = gr.File(label="上传文件")
+                    kb_f_in = gr.File(label="上传文件 (可多选)", file_count="multiple")
                     kb_t_in = gr.Radio(["core", "supplement"], value="core", label="类型")
                     kb_u_btn = gr.Button("上传并入库", variant="primary")
                     kb_u_out = gr.Textbox(label="结果")
-                    kb_u_btn.click(upload_and_process, [kb_f_in, kb_t_in], kb_u_out)
+                    kb_batch_id = gr.State(None)
+                    kb_batch_out = gr.Textbox(label="本批次结果", lines=6)
+                    kb_u_btn.click(upload_and_process, [kb_f_in, kb_t_in], [kb_u_out, kb_batch_id])
+                    gr.Markdown("#### 入库任务")
+                    kb_jobs = gr.Dataframe(headers=["任务ID", "文件", "状态", "进度", "片段数", "信息"], datatype=["str", "str", "str", "str", "number", "str"], interactive=False)
+                    with gr.Row():
+                        kb_job_id = gr.Textbox(label="任务 ID", scale=3)
+                        kb_cancel_btn = gr.Button("取消任务", scale=1)
+                    kb_cancel_out = gr.Textbox(label="取消结果")
+                    kb_cancel_btn.click(cancel_ingest_job, [kb_job_id], kb_cancel_out)
+                    # Poll the background queue for progress
+                    kb_jobs_timer = gr.Timer(2.0)
+                    kb_jobs_timer.tick(list_ingest_jobs, None, kb_jobs)
+                    kb_jobs_timer.tick(batch_report_text, kb_batch_id, kb_batch_out)
                 with gr.Tab("同步 Data 目录"):
                     kb_s_btn = gr.Button("扫描并同步", variant="primary")
                     kb_s_out = gr.Textbox(label="结果")
                     kb_s_btn.click(sync_data_folder_ui, None, kb_s_out)
+                    kb_watch_status = gr.Markdown()
+                    kb_watch_timer = gr.Timer(5.0)
+                    kb_watch_timer.tick(data_watcher_status, None, kb_watch_status)
                 with gr.Tab("统计与热词"):
                     kb_refresh_btn = gr.Button("刷新统计", variant="primary")
                     kb_stat_output = gr.JSON(label="知识库规模")
                     kb_keywords = gr.Dataframe(headers=["术语", "频次"], datatype=["str", "number"], row_count=5, column_count=(2, "fixed"))
                     kb_chart_image = gr.HTML(visible=False)
                     kb_list_btn = gr.Button("列出已入库文件")
-                    kb_files_out = gr.Textbox(label="已入库文件", lines=10)
+                    kb_files_out = gr.Dataframe(headers=["文件", "类型", "片段数", "超长片段", "页数", "入库时间"], datatype=["str", "str", "number", "number", "number", "str"], interactive=False)
+                    kb_files_page = gr.State(0)
+                    with gr.Row():
+                        kb_prev_btn = gr.Button("上一页", size="sm")
+                        kb_files_info = gr.Markdown()
+                        kb_next_btn = gr.Button("下一页", size="sm")
 
                     def refresh_kb_stats():
                         stats, keywords, chart_path = get_knowledge_stats()
@@ -492,13 +622,10 @@ with gr.Blocks(title="水声工程智能问答系统") as demo:
                                 chart_update = gr.update(visible=False)
                         return stats, df, chart_update
 
-                    def list_indexed_files():
-                        files = vector_store.get_indexed_files()
-                        files = sorted(files)
-                        return "\n".join(files) if files else "暂无已入库文件。"
-
                     kb_refresh_btn.click(refresh_kb_stats, inputs=[], outputs=[kb_stat_output, kb_keywords, kb_chart_image])
-                    kb_list_btn.click(list_indexed_files, inputs=[], outputs=[kb_files_out])
+                    kb_list_btn.click(lambda: list_indexed_files_page(0), inputs=[], outputs=[kb_files_out, kb_files_info, kb_files_page])
+                    kb_prev_btn.click(lambda p: list_indexed_files_page(p - 1), inputs=[kb_files_page], outputs=[kb_files_out, kb_files_info, kb_files_page])
+                    kb_next_btn.click(lambda p: list_indexed_files_page(p + 1), inputs=[kb_files_page], outputs=[kb_files_out, kb_files_info, kb_files_page])
 
     def go_to_kb():
         return gr.update(selected="kb")
@@ -538,9 +665,14 @@ with gr.Blocks(title="水声工程智能问答系统") as demo:
     q_btn3.click(click_question, q_btn3, msg)
 
 if __name__ == "__main__":
-    # Auto-sync
-    print("Startup: Scanning 'data' folder...")
-    vector_store.scan_and_ingest("data")
+    # Load the models in the main process only (pool workers re-import this module under spawn)
+    get_qa_chain()
+    # Auto-sync in the background: the UI is served right away from the existing index
+    print("Startup: Syncing 'data' folder in the background...")
+    # Upload jobs (and those interrupted by the last shutdown) run once the index backfill is done;
+    # changes from then on are picked up by the watcher without a rescan
+    initial_sync.start("data", workers=BULK_INGEST_WORKERS, on_ready=ingest_queue.start,
+                       on_done=data_watcher.start if WATCH_DATA_FOLDER else None)
     
     # Try to launch on 7860, but if occupied, gradio will automatically find another port if we remove server_port constraint
     # Or we can specify a starting port and let it auto-increment, but gradio does this by default if server_port is None.
@@ -0,0 +1,70 @@
+"""
+分块长度统计：旧的 800 字符切分 vs. 按嵌入模型 token 预算切分
+
+统计每种切分方式下的片段数、超过模型长度上限 (会在嵌入时被截断) 的片段数、
+被截断丢弃的 token 总数和平均 token 数。
+
+用法:
+    python scripts/bench_chunking.py data/some_book.txt data/other.docx
+    python scripts/bench_chunking.py --model-path /path/to/bge-small-zh-v1.5
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Add project root to sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.document_processing import DocumentProcessor
+from src.embedding_tokens import EMBEDDING_MODEL_PATH, MODEL_MAX_TOKENS, SPECIAL_TOKENS, EmbeddingTokenCounter
+
+def report(name, chunks, counter, seconds):
+    limit = MODEL_MAX_TOKENS - SPECIAL_TOKENS
+    lengths = [counter.count(c) for c in chunks]
+    over = [n for n in lengths if n > limit]
+    truncated = sum(n - limit for n in over)
+    mean = sum(lengths) / len(lengths) if lengths else 0
+    print(f"{name:<14}{len(chunks):>8}{len(over):>12}{truncated:>16}{mean:>12.1f}{max(lengths, default=0):>10}{seconds:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk length vs. embedding model window")
+    parser.add_argument("files", nargs="*", help="txt/docx/pdf 文件 (默认: 项目根目录和 data 下的 txt 文件)")
+    parser.add_argument("--model-path", default=EMBEDDING_MODEL_PATH, help="包含 tokenizer.json 的模型目录")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, "*.txt")) + glob.glob(os.path.join(ROOT, "data", "**", "*.txt"), recursive=True))
+    counter = EmbeddingTokenCounter(args.model_path)
+    print(f"Token 计数: {counter.name}, 模型上限 {MODEL_MAX_TOKENS} (含 {SPECIAL_TOKENS} 个特殊 token)")
+
+    # Before: the former character-based splitter on the same cleaned sections
+    processor = DocumentProcessor(ocr_workers=1, cache=None)
+    processor.token_counter = counter
+    char_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800, chunk_overlap=150, separators=processor.text_splitter._separators
+    )
+    token_splitter = processor.text_splitter
+
+    results = {"chars (800)": ([], 0.0), f"tokens ({processor.chunk_token_budget})": ([], 0.0)}
+    for path in files:
+        # Split the cleaned heading sections with each splitter
+        processor.text_splitter = char_splitter
+        start = time.perf_counter()
+        before = processor.process(path)
+        results["chars (800)"] = (results["chars (800)"][0] + [d.page_content for d in before],
+                                  results["chars (800)"][1] + time.perf_counter() - start)
+        processor.text_splitter = token_splitter
+        key = f"tokens ({processor.chunk_token_budget})"
+        start = time.perf_counter()
+        after = processor.process(path)
+        results[key] = (results[key][0] + [d.page_content for d in after], results[key][1] + time.perf_counter() - start)
+
+    print(f"{'splitter':<14}{'chunks':>8}{'over limit':>12}{'truncated tok':>16}{'mean tok':>12}{'max tok':>10}{'time s':>10}")
+    for name, (chunks, seconds) in results.items():
+        report(name, chunks, counter, seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+DOCX 解析基准：python-docx 整体加载 vs. 流式读取 word/document.xml
+
+生成 (或指定) 一个带大量内嵌图片的大 Word 文件，分别在独立子进程中用两种方式
+切分，比较首个片段产出时间、总耗时和进程峰值内存 (ru_maxrss)，并校验两者切分结果一致。
+
+用法:
+    python scripts/bench_docx_stream.py
+    python scripts/bench_docx_stream.py path/to/large.docx
+    python scripts/bench_docx_stream.py --paragraphs 50000 --images 40
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add project root to sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+def make_large_docx(path: str, num_paragraphs: int, num_images: int) -> None:
+    import docx
+    import numpy as np
+    import fitz  # PyMuPDF
+    doc = docx.Document()
+    rng = np.random.default_rng(0)
+    img_path = os.path.join(os.path.dirname(path), "bench_noise.png")
+    for i in range(num_paragraphs):
+        if i % 200 == 0:
+            doc.add_paragraph(f"{i // 200 + 1}.1 声传播与混响")
+        doc.add_paragraph(f"第{i}段：浅海信道中多途效应导致时延扩展，传播损失随距离按 20logR 增加，海底反射损失与掠射角有关。")
+        if num_images and i % max(1, num_paragraphs // num_images) == 0:
+            # Incompressible noise image, ~1.5 MB each
+            pix = fitz.Pixmap(fitz.csRGB, 700, 700, rng.integers(0, 255, 700 * 700 * 3, dtype=np.uint8).tobytes(), False)
+            pix.save(img_path)
+            doc.add_picture(img_path)
+    doc.save(path)
+    os.remove(img_path)
+
+
+def run_mode(mode: str, path: str) -> None:
+    """Child process: split the file with one reader, print JSON stats"""
+    from src.document_processing import DocumentProcessor
+    processor = DocumentProcessor(ocr_workers=1, cache=None)
+    start = time.perf_counter()
+    first = None
+    if mode == "python-docx":
+        import docx
+        doc = docx.Document(path)
+        lines = (line for para in doc.paragraphs for line in (para.text.splitlines() or [""]))
+        chunks = processor.iter_heading_chunks(lines)
+    else:
+        chunks = (d.page_content for d in processor.iter_docx(path, os.path.basename(path)))
+    digest = 0
+    count = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        digest = hash((digest, chunk))
+        count += 1
+    total = time.perf_counter() - start
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024 / 1024
+    print(json.dumps({"first_s": first, "total_s": total, "rss_mb": rss_mb, "chunks": count, "digest": digest}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming DOCX parsing")
+    parser.add_argument("file", nargs="?", help="docx 文件 (默认生成一个)")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.file)
+        return
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), "bench_large.docx")
+        print(f"生成测试文件 {path} ...")
+        make_large_docx(path, args.paragraphs, args.images)
+    print(f"文件大小: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+    results = {}
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    for mode in ("python-docx", "streaming"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), path, "--mode", mode],
+            capture_output=True, text=True, check=True, env=env
+        ).stdout.strip().splitlines()[-1]
+        results[mode] = json.loads(out)
+        r = results[mode]
+        print(f"{mode:<12} 首个片段 {r['first_s']:.2f}s  总耗时 {r['total_s']:.2f}s  峰值内存 {r['rss_mb']:.0f} MB  片段数 {r['chunks']}")
+    same = results["python-docx"]["digest"] == results["streaming"]["digest"]
+    print(f"切分结果一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
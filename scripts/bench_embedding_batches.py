@@ -0,0 +1,91 @@
+"""
+嵌入批处理基准：按入库顺序定长分批 vs. 长度分桶 + token 预算分批 (+ 多进程)
+
+对指定文件 (默认: 项目根目录和 data 下的 txt 文件) 按入库流程切分，然后
+  1. baseline: 按入库顺序每 64 个片段调用一次后端 embed_documents (原入库路径)
+  2. bucketed: BatchEmbedder，每次 256 个片段 (ingest_batch_size)，进程内嵌入
+  3. pool:     同上，--workers 个进程 (每个进程加载一份模型，线程数平分 CPU)
+输出 chunks/s、padding 效率 (真实 token / 计算的 token 位置)，并校验三种方式的向量一致。
+模型加载时间不计入；pool 先预热一次以启动进程。
+
+用法:
+    python scripts/bench_embedding_batches.py
+    python scripts/bench_embedding_batches.py data/some_book.pdf --backend onnx --workers 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Add project root to sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+from src.batch_embedder import BatchEmbedder, load_embedding_backend
+from src.document_processing import DocumentProcessor
+from src.embedding_tokens import EMBEDDING_BACKEND, EMBEDDING_MODEL_PATH, MODEL_MAX_TOKENS, ONNX_EMBEDDING_FILE, SPECIAL_TOKENS
+
+
+def run(embed, chunks, step):
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(chunks), step):
+        vectors.extend(embed(chunks[i:i + step]))
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion embedding batches")
+    parser.add_argument("files", nargs="*", help="txt/docx/pdf 文件")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND, choices=["torch", "onnx"])
+    parser.add_argument("--model-path", default=EMBEDDING_MODEL_PATH)
+    parser.add_argument("--onnx-file", default=ONNX_EMBEDDING_FILE)
+    parser.add_argument("--workers", type=int, default=max(2, (os.cpu_count() or 2) // 4), help="pool 进程数")
+    parser.add_argument("--token-budget", type=int, default=8192)
+    parser.add_argument("--limit", type=int, default=2000, help="最多使用的片段数")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, "*.txt")) + glob.glob(os.path.join(ROOT, "data", "**", "*.txt"), recursive=True))
+    processor = DocumentProcessor(ocr_workers=1, cache=None)
+    chunks = []
+    for path in files:
+        chunks.extend(d.page_content for d in processor.iter_documents(path))
+        if len(chunks) >= args.limit:
+            break
+    chunks = chunks[:args.limit]
+    if not chunks:
+        print("没有片段，请指定文档。")
+        sys.exit(2)
+    counter = processor.token_counter
+    lengths = [min(counter.count(c) + SPECIAL_TOKENS, MODEL_MAX_TOKENS) for c in chunks]
+    print(f"片段 {len(chunks)} 个, token 长度 min {min(lengths)} / 中位 {int(np.median(lengths))} / max {max(lengths)}")
+
+    backend = load_embedding_backend(args.backend, args.model_path, args.onnx_file)
+    backend.embed_documents(chunks[:8])  # warm-up
+
+    # Fixed batches in ingest order pad every chunk to the longest of its batch
+    padded = sum(len(lengths[i:i + 64]) * max(lengths[i:i + 64]) for i in range(0, len(lengths), 64))
+    reference, seconds = run(backend.embed_documents, chunks, 64)
+    print(f"{'mode':<12}{'seconds':>10}{'chunks/s':>11}{'padding eff':>13}{'max |diff|':>12}")
+    print(f"{'baseline':<12}{seconds:>10.2f}{len(chunks) / seconds:>11.1f}{sum(lengths) / padded:>13.3f}{0.0:>12.1e}")
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    modes = [("bucketed", 1), (f"pool x{args.workers}", args.workers)]
+    for name, workers in modes:
+        embedder = BatchEmbedder(
+            backend, counter, token_budget=args.token_budget, workers=workers,
+            backend_args=(args.backend, args.model_path, args.onnx_file, threads)
+        )
+        if workers > 1:
+            embedder.embed_documents(chunks[:256])  # start the worker processes
+        vectors, seconds = run(embedder.embed_documents, chunks, 256)
+        stats = embedder.stats()
+        embedder.close()
+        diff = float(np.abs(vectors - reference).max())
+        print(f"{name:<12}{seconds:>10.2f}{len(chunks) / seconds:>11.1f}{stats['padding_efficiency']:>13.3f}{diff:>12.1e}")
+
+
+if __name__ == "__main__":
+    main()
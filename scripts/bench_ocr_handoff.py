@@ -0,0 +1,182 @@
+"""
+OCR 图像传递基准测试：PNG 编解码 vs. Pixmap ndarray 视图
+
+对比扫描版 PDF 每页渲染后交给 RapidOCR 的两种方式：
+  1. 旧路径: pix.tobytes("png") -> RapidOCR 内部 PIL 解码回像素
+  2. 新路径: pixmap_to_ndarray(pix) 直接传 numpy 视图 (零拷贝)
+
+只测量"渲染之后、检测之前"的传递开销 (编码 + 解码 + 通道转换)，
+不包含检测/识别本身，因此可以在几百页的扫描件上快速跑完。
+内存按进程峰值 RSS 计 (PNG 缓冲和 PIL 解码出的像素在 C 层分配，tracemalloc 看不到)：
+每种方式在单独的子进程中逐页渲染 + 传递，与只渲染不传递的子进程相比得出额外峰值。
+Linux 上导入完成后通过 /proc/self/clear_refs 重置峰值，避免 onnxruntime 等导入开销盖过传递开销。
+峰值 RSS 用 resource.getrusage (Linux/macOS)，Windows 上用 psutil (需要安装)。
+加 --full-ocr 可额外对前几页跑完整 OCR 并比对识别结果是否一致。
+
+用法:
+    python scripts/bench_ocr_handoff.py path/to/scan.pdf
+    python scripts/bench_ocr_handoff.py --synthetic 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from rapidocr_onnxruntime.utils.load_image import LoadImage
+
+from src.document_processing import OCR_ZOOM, pixmap_to_ndarray
+
+
+def make_synthetic_scan(num_pages: int, out_path: str) -> str:
+    """生成一个纯图片的"扫描版" PDF (每页一张位图，无文本层)"""
+    src = fitz.open()
+    for i in range(num_pages):
+        page = src.new_page()
+        page.insert_text((72, 72), f"Chapter {i + 1} Transmission loss", fontsize=16)
+        for j in range(30):
+            page.insert_text((72, 110 + j * 22), f"Line {j}: TL = 20 log r + alpha r, r = {i * j} m", fontsize=11)
+    scan = fitz.open()
+    for page in src:
+        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+        new_page = scan.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(new_page.rect, pixmap=pix)
+    scan.save(out_path)
+    return out_path
+
+
+def measure(fn, pix):
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    img = fn(pix)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    return img, wall, cpu
+
+
+def handoff_paths():
+    loader = LoadImage()
+    return {
+        "none": None,
+        "png": lambda pix: loader(pix.tobytes("png")),
+        "view": lambda pix: loader(pixmap_to_ndarray(pix)),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+
+
+def reset_peak_rss() -> None:
+    """Drop the import-time high-water mark so only the page loop is measured (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def run_rss_variant(pdf_path: str, variant: str) -> None:
+    """Child process: render every page and hand it off one way, print the peak RSS"""
+    fn = handoff_paths()[variant]
+    mat = fitz.Matrix(OCR_ZOOM, OCR_ZOOM)
+    with fitz.open(pdf_path) as doc:
+        reset_peak_rss()
+        for page in doc:
+            pix = page.get_pixmap(matrix=mat, alpha=False)
+            if fn is not None:
+                img = fn(pix)
+                del img
+            del pix
+    print("rss:" + json.dumps({"variant": variant, "peak_mb": peak_rss_mb()}))
+
+
+def measure_peak_rss(pdf_path: str) -> dict:
+    """Peak RSS (MB) of one subprocess per variant"""
+    peaks = {}
+    for variant in ("none", "png", "view"):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), pdf_path, "--rss-variant", variant],
+            capture_output=True, text=True, check=True
+        )
+        line = [l for l in result.stdout.splitlines() if l.startswith("rss:")][-1]
+        peaks[variant] = json.loads(line[len("rss:"):])["peak_mb"]
+    return peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PNG round-trip vs ndarray handoff to RapidOCR")
+    parser.add_argument("pdf", nargs="?", help="扫描版 PDF 路径")
+    parser.add_argument("--synthetic", type=int, default=300, help="未提供 PDF 时生成的合成页数")
+    parser.add_argument("--full-ocr", type=int, default=0, help="对前 N 页跑完整 OCR 并比对结果")
+    parser.add_argument("--rss-variant", choices=["none", "png", "view"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_variant:
+        run_rss_variant(args.pdf, args.rss_variant)
+        return
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.gettempdir(), f"bench_scan_{args.synthetic}.pdf")
+        if not os.path.exists(pdf_path):
+            print(f"生成合成扫描件: {pdf_path} ({args.synthetic} 页)...", flush=True)
+            make_synthetic_scan(args.synthetic, pdf_path)
+
+    paths = handoff_paths()
+    totals = {"png": [0.0, 0.0], "view": [0.0, 0.0]}
+    mat = fitz.Matrix(OCR_ZOOM, OCR_ZOOM)
+    with fitz.open(pdf_path) as doc:
+        num_pages = len(doc)
+        print(f"PDF: {pdf_path} ({num_pages} 页, zoom={OCR_ZOOM})", flush=True)
+        for page in doc:
+            pix = page.get_pixmap(matrix=mat, alpha=False)
+            for name in totals:
+                _, wall, cpu = measure(paths[name], pix)
+                totals[name][0] += wall
+                totals[name][1] += cpu
+
+        print("\n--- 每页传递开销 (平均) ---")
+        print(f"{'路径':<8}{'wall ms':>10}{'cpu ms':>10}")
+        for name, (wall, cpu) in totals.items():
+            print(f"{name:<8}{wall / num_pages * 1000:>10.2f}{cpu / num_pages * 1000:>10.2f}")
+        saved_cpu = (totals["png"][1] - totals["view"][1]) / num_pages * 1000
+        print(f"\n每页节省 CPU: {saved_cpu:.2f} ms")
+        print(f"按 {num_pages} 页计，总计节省 CPU: {saved_cpu * num_pages / 1000:.1f} s")
+
+        print("\n--- 峰值 RSS (每种方式一个子进程) ---", flush=True)
+        peaks = measure_peak_rss(pdf_path)
+        print(f"{'路径':<8}{'峰值 MB':>10}{'传递额外 MB':>14}")
+        for name in ("none", "png", "view"):
+            print(f"{name:<8}{peaks[name]:>10.1f}{peaks[name] - peaks['none']:>14.1f}")
+        print(f"\nndarray 传递比 PNG 少用峰值内存: {peaks['png'] - peaks['view']:.1f} MB")
+
+        if args.full_ocr:
+            from rapidocr_onnxruntime import RapidOCR
+            ocr = RapidOCR()
+            same = 0
+            n = min(args.full_ocr, num_pages)
+            for i in range(n):
+                pix = doc[i].get_pixmap(matrix=mat, alpha=False)
+                r1, _ = ocr(pix.tobytes("png"))
+                r2, _ = ocr(pixmap_to_ndarray(pix))
+                same += [l[1] for l in (r1 or [])] == [l[1] for l in (r2 or [])]
+            print(f"\n完整 OCR 结果一致: {same}/{n} 页")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+PDF 文本抽取后端对比：pypdf vs. PyMuPDF
+
+对同一批 PDF 分别用两种后端跑 DocumentProcessor.process_pdf (关闭缓存)，
+输出每个文件的页数、耗时、pages/sec 和片段数，以及被当作无文本层而走 OCR 的页数。
+扫描页会触发 OCR，会掩盖抽取速度差异，建议只用文本版 PDF 测试；
+加 --extract-only 则只计时纯文本层抽取，不做清洗/切分/OCR。
+
+用法:
+    python scripts/bench_pdf_backends.py data/book1.pdf data/book2.pdf
+    python scripts/bench_pdf_backends.py --extract-only data/*.pdf
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from pypdf import PdfReader
+
+from src.document_processing import DocumentProcessor, PDF_BACKENDS
+
+
+def extract_only(processor: DocumentProcessor, path: str):
+    if processor.pdf_backend == "pymupdf":
+        pages = processor.extract_pages_pymupdf(path)
+    else:
+        pages = [page.extract_text() or "" for page in PdfReader(path).pages]
+    return len(pages), sum(not processor.has_text_layer(p) for p in pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pypdf and PyMuPDF text extraction backends")
+    parser.add_argument("pdfs", nargs="+", help="PDF 文件路径")
+    parser.add_argument("--extract-only", action="store_true", help="只计时文本层抽取")
+    args = parser.parse_args()
+
+    processors = {b: DocumentProcessor(ocr_workers=1, cache=None, pdf_backend=b) for b in PDF_BACKENDS}
+    totals = {b: [0, 0.0] for b in PDF_BACKENDS}
+
+    print(f"{'文件':<40}{'后端':<10}{'页数':>6}{'耗时 s':>10}{'pages/s':>10}{'片段/无文本层页':>16}")
+    for path in args.pdfs:
+        with fitz.open(path) as doc:
+            num_pages = len(doc)
+        name = os.path.basename(path)
+        for backend, processor in processors.items():
+            start = time.perf_counter()
+            if args.extract_only:
+                _, extra = extract_only(processor, path)
+            else:
+                extra = len(processor.process_pdf(path, name))
+            elapsed = time.perf_counter() - start
+            totals[backend][0] += num_pages
+            totals[backend][1] += elapsed
+            print(f"{name[:38]:<40}{backend:<10}{num_pages:>6}{elapsed:>10.2f}{num_pages / max(elapsed, 1e-6):>10.1f}{extra:>16}", flush=True)
+
+    print("\n--- 汇总 ---")
+    for backend, (pages, elapsed) in totals.items():
+        print(f"{backend:<10} {pages} 页, {elapsed:.2f} s, {pages / max(elapsed, 1e-6):.1f} pages/s")
+    if totals["pymupdf"][1] > 0:
+        print(f"PyMuPDF 相对 pypdf 加速: {totals['pypdf'][1] / totals['pymupdf'][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+检索评测：纯向量检索 vs. 混合检索 (BM25 + 向量，RRF 融合) 在标准问题集上的召回率
+
+对 golden 问题集 (默认: scripts/golden_questions.jsonl，每行 {"question", "relevant"}) 中的
+每个问题，分别取两种检索的前 k 个片段；片段的 (文件名, 页码) 在人工标注的 relevant
+列表 (如 [["声纳原理.pdf", 12], ["声纳原理.pdf", 13]]) 中即算命中，文件名也可以写
+source_path。输出各 k 的召回率 (至少命中一个的问题比例) 和 MRR，并给出混合检索达到
+纯向量检索 recall@--baseline-k 所需的最小 k，即送入 CrossEncoder 重排的候选数
+(src/qa_chain.py 中的 initial_k) 可以减到多少。relevant 为空的问题不参与评测。
+需要已建好的知识库和嵌入模型。
+
+标注: --label 对每个未标注的问题列出两种检索前 --label-k 个候选片段的 (文件名, 页码)
+和开头文字，人工确认后把相关的页写进 relevant。知识库换了文档后需要重新标注。
+
+用法:
+    python scripts/eval_retrieval.py
+    python scripts/eval_retrieval.py my_questions.jsonl --baseline-k 10
+    python scripts/eval_retrieval.py --label
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add project root to sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from src.vector_store import vector_store
+
+K_VALUES = (1, 3, 5, 8, 10, 15, 20)
+
+
+def is_relevant(meta, relevant):
+    """Chunk metadata matches a labelled (source, page) pair"""
+    page = meta.get("page")
+    return any(p == page and s in (meta.get("source"), meta.get("source_path")) for s, p in relevant)
+
+
+def first_hit(metadatas, relevant):
+    """Rank (1-based) of the first relevant chunk, None if there is none"""
+    for rank, meta in enumerate(metadatas, 1):
+        if is_relevant(meta, relevant):
+            return rank
+    return None
+
+
+def print_candidates(golden, k):
+    """Pooled dense and hybrid candidates of the unlabelled questions, for labelling"""
+    for item in golden:
+        if item.get("relevant"):
+            continue
+        dense_ids, docs = vector_store.dense_ranking(item["question"], k)
+        pooled = {}
+        for doc in [docs[cid] for cid in dense_ids] + vector_store.hybrid_search(item["question"], k=k):
+            key = (doc.metadata.get("source"), doc.metadata.get("page"))
+            pooled.setdefault(key, doc.page_content)
+        print(f"\n{item['question']}")
+        for (source, page), text in pooled.items():
+            snippet = " ".join(text.split())[:60]
+            print(f"  {json.dumps([source, page], ensure_ascii=False)}  {snippet}")
+
+
+def summarize(ranks, k_values):
+    n = len(ranks)
+    recall = {k: sum(1 for r in ranks if r is not None and r <= k) / n for k in k_values}
+    mrr = sum(1.0 / r for r in ranks if r is not None) / n
+    return recall, mrr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate dense vs hybrid retrieval on golden questions")
+    parser.add_argument("golden", nargs="?", default=os.path.join(ROOT, "scripts", "golden_questions.jsonl"))
+    parser.add_argument("--baseline-k", type=int, default=10, help="纯向量检索当前送入重排的候选数")
+    parser.add_argument("--label", action="store_true", help="列出未标注问题的候选片段，不做评测")
+    parser.add_argument("--label-k", type=int, default=5, help="--label 时每种检索列出的候选数")
+    args = parser.parse_args()
+
+    with open(args.golden, 'r', encoding='utf-8') as f:
+        golden = [json.loads(line) for line in f if line.strip()]
+    # Normally done by the app's startup sync
+    vector_store.ensure_bm25()
+    if args.label:
+        print_candidates(golden, args.label_k)
+        return
+
+    unlabelled = sum(1 for item in golden if not item.get("relevant"))
+    golden = [item for item in golden if item.get("relevant")]
+    if not golden:
+        print(f"{args.golden} 中没有标注 relevant 的问题，先用 --label 列出候选片段再标注")
+        return
+    max_k = max(K_VALUES)
+    print(f"问题 {len(golden)} 个 (未标注 {unlabelled} 个跳过), 片段 {vector_store.vectordb._collection.count()} 个, "
+          f"BM25 {vector_store.bm25.stats()}")
+
+    dense_ranks, hybrid_ranks = [], []
+    dense_s = hybrid_s = 0.0
+    for item in golden:
+        start = time.perf_counter()
+        dense_ids, docs = vector_store.dense_ranking(item["question"], max_k)
+        dense_s += time.perf_counter() - start
+        start = time.perf_counter()
+        hybrid = vector_store.hybrid_search(item["question"], k=max_k)
+        hybrid_s += time.perf_counter() - start
+        dense_ranks.append(first_hit([docs[cid].metadata for cid in dense_ids], item["relevant"]))
+        hybrid_ranks.append(first_hit([d.metadata for d in hybrid], item["relevant"]))
+
+    dense_recall, dense_mrr = summarize(dense_ranks, K_VALUES)
+    hybrid_recall, hybrid_mrr = summarize(hybrid_ranks, K_VALUES)
+    print(f"{'':<10}" + "".join(f"{'R@' + str(k):>8}" for k in K_VALUES) + f"{'MRR':>8}{'ms/q':>8}")
+    print(f"{'dense':<10}" + "".join(f"{dense_recall[k]:>8.2f}" for k in K_VALUES)
+          + f"{dense_mrr:>8.3f}{dense_s * 1000 / len(golden):>8.1f}")
+    print(f"{'hybrid':<10}" + "".join(f"{hybrid_recall[k]:>8.2f}" for k in K_VALUES)
+          + f"{hybrid_mrr:>8.3f}{hybrid_s * 1000 / len(golden):>8.1f}")
+
+    target, _ = summarize(dense_ranks, [args.baseline_k])
+    needed = next((k for k in range(1, max_k + 1) if summarize(hybrid_ranks, [k])[0][k] >= target[args.baseline_k]), None)
+    if needed is None:
+        print(f"混合检索在 k <= {max_k} 内未达到纯向量 recall@{args.baseline_k} = {target[args.baseline_k]:.2f}")
+    else:
+        print(f"混合检索 recall@{needed} >= 纯向量 recall@{args.baseline_k} = {target[args.baseline_k]:.2f}"
+              f"，重排候选数可从 {args.baseline_k} 减到 {needed}")
+    for item, d, h in zip(golden, dense_ranks, hybrid_ranks):
+        if d != h:
+            print(f"  {item['question']}: dense {d or '-'} -> hybrid {h or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Ingestion-side embedding engine.
+
+Chunks are sorted by token length and cut into batches whose padded size
+(batch length x longest chunk) stays within a token budget, so short OCR
+fragments are not padded to the length of full paragraphs and long chunks do
+not form oversized batches. Batches can be fanned out to a process pool, each
+worker holding its own copy of the model. Vectors come back in input order.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from src.embedding_tokens import MODEL_MAX_TOKENS, SPECIAL_TOKENS, EmbeddingTokenCounter
+from src.utils import setup_logger
+
+logger = setup_logger('batch_embedder')
+
+def load_embedding_backend(backend: str, model_path: str, onnx_file: str,
+                           threads: Optional[int] = None) -> Embeddings:
+    """
+    "torch" (sentence-transformers through LangChain) or "onnx" (src.onnx_embeddings)
+    """
+    if backend == "onnx":
+        from src.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(model_path, onnx_file=onnx_file, threads=threads)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=model_path,
+        model_kwargs={'device': 'cpu'},
+        # Batches are already formed by BatchEmbedder: one encode batch per call
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 256},
+        show_progress=False
+    )
+
+# Model of a pool worker process, loaded once by the initializer
+_worker_backend: Optional[Embeddings] = None
+
+def _init_embed_worker(backend_args: Tuple) -> None:
+    global _worker_backend
+    _worker_backend = load_embedding_backend(*backend_args)
+
+def _embed_batch_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_backend.embed_documents(texts)
+
+def plan_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Indices grouped into length-sorted batches with
+    len(batch) * max(length in batch) <= token_budget (at least one chunk per batch)
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        # Sorted ascending: the new chunk is the longest of the batch
+        if batch and ((len(batch) + 1) * lengths[i] > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+class BatchEmbedder(Embeddings):
+    def __init__(self, embeddings: Embeddings, token_counter: EmbeddingTokenCounter,
+                 token_budget: int = 8192, max_batch_size: int = 128, workers: int = 1,
+                 backend_args: Optional[Tuple] = None):
+        """
+        Args:
+            embeddings: In-process backend, also used for queries
+            token_counter: Counts chunk length in the model's tokens
+            token_budget: Padded tokens per batch (batch size x longest chunk)
+            max_batch_size: Upper bound on chunks per batch (for very short chunks)
+            workers: Embedding processes; 1 = embed in this process
+            backend_args: (backend, model_path, onnx_file, threads) for load_embedding_backend
+                in pool workers, required when workers > 1
+        """
+        self.embeddings = embeddings
+        self.token_counter = token_counter
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.workers = workers
+        self.backend_args = backend_args
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self.seconds = 0.0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 1 or self.backend_args is None:
+            return None
+        with self._lock:
+            if self._pool is None:
+                logger.info(f"Starting {self.workers} embedding worker processes")
+                # Each worker loads the model once in _init_embed_worker; the main script
+                # must not load it again at import time (spawn on Windows, see app.py)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_embed_worker, initargs=(self.backend_args,)
+                )
+            return self._pool
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        start = time.perf_counter()
+        limit = MODEL_MAX_TOKENS
+        lengths = [min(self.token_counter.count(t) + SPECIAL_TOKENS, limit) for t in texts]
+        batches = plan_batches(lengths, self.token_budget, self.max_batch_size)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+        results = None
+        pool = self._get_pool() if len(batches) > 1 else None
+        if pool is not None:
+            try:
+                results = list(pool.map(_embed_batch_worker, batch_texts))
+            except Exception as e:
+                logger.error(f"Embedding pool failed, embedding in process: {e}")
+                with self._lock:
+                    self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+        if results is None:
+            results = [self.embeddings.embed_documents(bt) for bt in batch_texts]
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.chunks += len(texts)
+            self.seconds += seconds
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += sum(len(b) * max(lengths[i] for i in b) for b in batches)
+        logger.debug(f"Embedded {len(texts)} chunks in {len(batches)} batches, {len(texts) / seconds:.1f} chunks/s")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "chunks": self.chunks,
+                "seconds": round(self.seconds, 2),
+                "chunks_per_s": round(self.chunks / self.seconds, 1) if self.seconds else 0.0,
+                # Share of computed token positions that are real tokens, not padding
+                "padding_efficiency": round(self.real_tokens / self.padded_tokens, 3) if self.padded_tokens else 0.0,
+                "workers": self.workers
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
@@ -0,0 +1,137 @@
+"""
+Persistent BM25 inverted index over the indexed chunks.
+
+Chunks are tokenized with jieba's search mode (words plus their sub-words),
+lowercased, with latin/number runs split out of mixed tokens so that exact
+terms and symbols (TL, DI, Wenz, SOFAR, variable names) match on their own.
+Postings live in SQLite next to the collection and are updated with the same
+chunk IDs as the chunks are added or deleted. Dense and lexical rankings are
+combined with reciprocal rank fusion.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+import jieba
+from src.utils import SQLiteStore, add_acoustic_terms, setup_logger
+
+logger = setup_logger('bm25_index')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal rank fusion constant: score = sum of 1 / (RRF_K + rank) over the rankings
+RRF_K = 60
+
+_WORD_RE = re.compile(r'[0-9a-z\u4e00-\u9fff]')
+_RUN_RE = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]+')
+_STOPWORDS = {"的", "了", "是", "在", "和", "与", "及", "或", "等", "中", "对", "为", "其", "这", "那", "有", "也", "就", "都", "而"}
+
+def tokenize(text: str) -> List[str]:
+    """
+    BM25 terms of a text (same for chunks and queries)
+    """
+    add_acoustic_terms()
+    terms = []
+    for token in jieba.cut_for_search(text):
+        token = token.strip().lower()
+        if not token or token in _STOPWORDS or not _WORD_RE.search(token):
+            continue
+        terms.append(token)
+        runs = _RUN_RE.findall(token)
+        if len(runs) > 1:
+            # "wenz曲线" also matches a query for "wenz" (CJK sub-words come from search mode)
+            terms.extend(run for run in runs if run.isascii())
+    return terms
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """
+    IDs ordered by fused score over several rankings (best first)
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, 1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda cid: scores[cid], reverse=True)
+
+class BM25Index(SQLiteStore):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (chunk_id TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id)")
+        self._conn.commit()
+        # Corpus size and total length for idf and length normalization
+        self._num_docs, self._total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs"
+        ).fetchone()
+
+    def add_chunks(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Index new chunks. Chunks already indexed under the same ID are skipped
+        """
+        tokenized = [(cid, Counter(tokenize(text))) for cid, text in zip(ids, texts)]
+        with self._lock, self._conn:
+            for cid, tfs in tokenized:
+                length = sum(tfs.values())
+                cursor = self._conn.execute("INSERT OR IGNORE INTO docs VALUES (?, ?)", (cid, length))
+                if not cursor.rowcount:
+                    continue
+                self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                       [(term, cid, tf) for term, tf in tfs.items()])
+                self._num_docs += 1
+                self._total_length += length
+
+    def remove_chunks(self, ids: List[str]) -> None:
+        with self._lock, self._conn:
+            for part, placeholders in self.in_chunks(ids):
+                num_docs, length = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE chunk_id IN ({placeholders})", part
+                ).fetchone()
+                self._conn.execute(f"DELETE FROM docs WHERE chunk_id IN ({placeholders})", part)
+                self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", part)
+                self._num_docs -= num_docs
+                self._total_length -= length
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        """
+        Top-k (chunk ID, BM25 score) for a query
+        """
+        terms = Counter(tokenize(query))
+        scores: Dict[str, float] = {}
+        with self._lock:
+            if not self._num_docs:
+                return []
+            avg_length = self._total_length / self._num_docs
+            for term, query_tf in terms.items():
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, d.length FROM postings p JOIN docs d ON d.chunk_id = p.chunk_id "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (self._num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                for cid, tf, length in rows:
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[cid] = scores.get(cid, 0.0) + query_tf * idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def rebuild(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Re-index from scratch (collection built before the BM25 index existed)
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM postings")
+            self._num_docs = 0
+            self._total_length = 0
+        self.add_chunks(ids, texts)
+        self.mark_built()
+        logger.info(f"BM25 index rebuilt from {len(ids)} chunks")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            terms = self._conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+            return {"chunks": self._num_docs, "terms": terms}
@@ -0,0 +1,142 @@
+"""
+Multi-process bulk ingestion for the data folder.
+
+Parsing/OCR runs in a process pool, one file per task; parsed chunks are
+funnelled back to a single writer (the calling process) that does the
+batched embedding + upserts through VectorStoreHandler, so the Chroma
+collection and the embedding model are only ever touched by one process.
+
+Headless usage:
+    python -m src.bulk_ingest data --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+# Only the parser is imported here: pool workers import this module and must
+# not load the embedding model (src.vector_store is imported lazily in main)
+from src.document_processing import doc_processor
+from src.ingest_manifest import manifest_key
+from src.parse_cache import KIND_CHUNKS
+from src.utils import setup_logger
+
+logger = setup_logger('bulk_ingest')
+
+def _init_parse_worker():
+    # Files are already spread across processes, no nested OCR pool per file
+    doc_processor.ocr_workers = 1
+
+def _cache_counts_since(before: Optional[Tuple[Dict, Dict]]) -> Tuple[Dict, Dict]:
+    if before is None:
+        return {}, {}
+    after = doc_processor.cache.counts()
+    return tuple({kind: n - old.get(kind, 0) for kind, n in new.items()} for new, old in zip(after, before))
+
+def _parse_file(file_path: str) -> Tuple[List[Document], float, Optional[str], Tuple[Dict, Dict]]:
+    """
+    Pool task: parse one file.
+    Returns (documents, parse_seconds, error, (parse cache hits, misses) of this file)
+    """
+    start = time.perf_counter()
+    before = doc_processor.cache.counts() if doc_processor.cache is not None else None
+    try:
+        documents = doc_processor.process(file_path)
+        return documents, time.perf_counter() - start, None, _cache_counts_since(before)
+    except Exception as e:
+        return [], time.perf_counter() - start, str(e), _cache_counts_since(before)
+
+def bulk_ingest(handler, changes: List[Tuple[str, str]], workers: Optional[int] = None,
+                doc_type: str = 'core', on_file: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Parse files in a process pool and index them through a single writer.
+    Args:
+        handler: VectorStoreHandler doing embedding, upserts and manifest updates
+        changes: [(file_path, 'added'|'updated'), ...] as from plan_folder_sync
+        workers: Parse processes, None = one per CPU core (minus one)
+        doc_type: 'core' or 'supplement'
+        on_file: Called with each file's report entry as soon as it is indexed
+    Returns:
+        {'files': [{'key', 'status', 'chunks', 'parse_s', 'write_s', 'cached'}, ...],
+         'total_s': float, 'files_per_min': float, 'chunks': int, 'cached_files': int}
+        'cached' marks files whose chunks came from the parse cache; the workers' cache
+        lookups are added to the parse cache counters of this process
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    report = {"files": [], "total_s": 0.0, "files_per_min": 0.0, "chunks": 0, "cached_files": 0}
+    if not changes:
+        return report
+
+    start = time.perf_counter()
+    pending = list(changes)
+    in_flight = {}
+    # Bound parsed-but-unwritten files so a slow writer doesn't pile up chunks in memory
+    max_in_flight = workers * 2
+    logger.info(f"Bulk ingest: {len(changes)} files with {workers} parse workers")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                file_path, status = pending.pop(0)
+                in_flight[executor.submit(_parse_file, file_path)] = (file_path, status)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, status = in_flight.pop(future)
+                key = manifest_key(file_path)
+                try:
+                    documents, parse_s, error, (hits, misses) = future.result()
+                except Exception as e:
+                    documents, parse_s, error, (hits, misses) = [], 0.0, str(e), ({}, {})
+                if doc_processor.cache is not None:
+                    doc_processor.cache.add_counts(hits, misses)
+                cached = hits.get(KIND_CHUNKS, 0) > 0
+                report["cached_files"] += cached
+                write_start = time.perf_counter()
+                if error is not None:
+                    # Nothing is written: the indexed version of the file stays as it is
+                    logger.error(f"Error parsing {key}: {error}")
+                    final_status = 'failed'
+                else:
+                    final_status = handler.reindex_file(file_path, status, documents, doc_type=doc_type)
+                write_s = time.perf_counter() - write_start
+                entry = handler.manifest.get(key) if final_status != 'failed' else None
+                num_chunks = entry["chunks"] if entry else 0
+                report["chunks"] += num_chunks
+                report["files"].append({
+                    "key": key,
+                    "status": final_status,
+                    "chunks": num_chunks,
+                    "parse_s": round(parse_s, 2),
+                    "write_s": round(write_s, 2),
+                    "cached": cached
+                })
+                logger.info(
+                    f"[{len(report['files'])}/{len(changes)}] {key}: {final_status}, {num_chunks} chunks, "
+                    f"parse {parse_s:.1f}s{' (cached)' if cached else ''}, write {write_s:.1f}s"
+                )
+                if on_file is not None:
+                    on_file(report["files"][-1])
+
+    report["total_s"] = round(time.perf_counter() - start, 2)
+    report["files_per_min"] = round(len(changes) / max(report["total_s"], 1e-6) * 60, 2)
+    logger.info(
+        f"Bulk ingest finished: {len(changes)} files, {report['chunks']} chunks in {report['total_s']:.1f}s "
+        f"({report['files_per_min']:.1f} files/min, {report['cached_files']} from the parse cache)"
+    )
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel bulk ingestion of a data folder")
+    parser.add_argument("folder", nargs="?", default="data", help="folder to sync (default: data)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) - 1),
+                        help="parse worker processes")
+    args = parser.parse_args()
+
+    from src.vector_store import vector_store
+    result = vector_store.sync_folder(args.folder, workers=args.workers)
+    for status, keys in result.items():
+        print(f"{status}: {len(keys)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import hashlib
+from collections import Counter
+from typing import Optional
+
+def content_hash(text: str) -> str:
+    """
+    Hash of the exact text that gets embedded: any edit gives a new chunk ID
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+def chunk_id(source_path: str, page: Optional[int], text: str, occurrence: int = 0) -> str:
+    """
+    Deterministic chunk ID from (source, page, content hash), e.g.
+    "9b1c0e6f2a7d4c31-p12-<content hash>". occurrence numbers identical chunks
+    on the same page so that their IDs stay distinct
+    """
+    source = hashlib.blake2b(source_path.encode('utf-8'), digest_size=8).hexdigest()
+    cid = f"{source}-p{page or 0}-{content_hash(text)}"
+    return f"{cid}-{occurrence}" if occurrence else cid
+
+class ChunkIdAssigner:
+    """
+    Assigns chunk IDs to the chunks of one source, in document order
+    """
+    def __init__(self, source_path: str):
+        self.source_path = source_path
+        self._seen = Counter()
+
+    def assign(self, page: Optional[int], text: str) -> str:
+        key = (page, content_hash(text))
+        occurrence = self._seen[key]
+        self._seen[key] += 1
+        return chunk_id(self.source_path, page, text, occurrence)
@@ -0,0 +1,202 @@
+"""
+Content-based scene tagging of chunks.
+
+All terms of the scene vocabulary are compiled into one Aho-Corasick automaton,
+so each chunk is scanned once regardless of the vocabulary size. A field (env,
+device, ...) is tagged with the value whose terms are dense enough in the chunk
+and clearly dominate the other values of that field.
+"""
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Tuple
+
+# field -> value -> terms. Values are the same as the file-name tags and the scene
+# settings of the chat UI. Latin terms are matched case-insensitively on word boundaries
+SCENE_VOCABULARY: Dict[str, Dict[str, List[str]]] = {
+    "env": {
+        "深海": ["深海", "深水", "大洋", "deep water", "deep sea", "deep ocean"],
+        "浅海": ["浅海", "浅水", "大陆架", "shallow water"],
+        "港湾": ["港湾", "港口", "近岸", "海湾", "harbor", "harbour", "coastal"],
+        "冰下": ["冰下", "冰层", "海冰", "极地", "under-ice", "sea ice", "arctic"],
+    },
+    "device": {
+        "主动": ["主动声纳", "主动声呐", "主动探测", "回波", "发射机", "目标强度", "active sonar", "echo"],
+        "被动": ["被动声纳", "被动声呐", "被动探测", "辐射噪声", "检测阈", "passive sonar", "radiated noise"],
+    },
+    "band": {
+        "低频": ["低频", "甚低频", "low frequency", "low-frequency", "lf"],
+        "中频": ["中频", "mid frequency", "mid-frequency"],
+        "高频": ["高频", "超高频", "high frequency", "high-frequency", "hf"],
+    },
+    "ssp_type": {
+        "汇聚区": ["汇聚区", "会聚区", "深海声道", "声道轴", "sofar", "convergence zone"],
+        "表面声道": ["表面声道", "混合层", "surface duct", "mixed layer"],
+        "中层极小": ["中层极小", "声速极小", "sound speed minimum"],
+    },
+    "bottom_type": {
+        "泥": ["泥底", "淤泥", "泥质", "粘土", "mud", "clay", "silt"],
+        "砂": ["砂底", "沙底", "砂质", "沙质", "sand", "sandy"],
+        "岩": ["岩底", "岩石", "基岩", "rock", "bedrock"],
+    },
+    "task": {
+        "侦察": ["侦察", "警戒", "搜索", "reconnaissance", "surveillance"],
+        "跟踪": ["跟踪", "航迹", "tracking", "tracker"],
+        "定位": ["定位", "测向", "方位估计", "localization", "localisation", "bearing estimation"],
+        "通信": ["通信", "通讯", "调制", "信道编码", "communication", "modem"],
+    },
+    "array_type": {
+        "线阵": ["线阵", "线列阵", "line array", "linear array"],
+        "面阵": ["面阵", "平面阵", "planar array"],
+        "拖曳阵": ["拖曳阵", "拖曳线列阵", "拖线阵", "towed array"],
+    },
+}
+
+# A value needs at least this many term hits, and at least this many hits per
+# 1000 characters of the chunk ...
+TAG_MIN_HITS = 2
+TAG_MIN_DENSITY = 2.0
+# ... and this share of all hits of its field (a chunk comparing shallow and deep
+# water gets no env tag)
+TAG_MIN_SHARE = 0.6
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: goto/fail/output tables over characters, built once.
+    Patterns are lowercased; matches are reported on the lowercased text
+    """
+    def __init__(self, patterns: Dict[str, object]):
+        """
+        Args:
+            patterns: pattern -> payload returned with each match
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: [(pattern length, payload, latin), ...] of the patterns ending there
+        self._out: List[List[Tuple[int, object, bool]]] = [[]]
+        for pattern, payload in patterns.items():
+            pattern = pattern.lower()
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            # Latin patterns must not match inside a longer word ("ice" in "device")
+            latin = _is_word_char(pattern[0]) or _is_word_char(pattern[-1])
+            self._out[state].append((len(pattern), payload, latin))
+
+        self._start_re = re.compile('[' + ''.join(re.escape(ch) for ch in sorted(self._goto[0])) + ']')
+
+        # Breadth-first fail links; outputs of the fail state are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str):
+        """
+        Yields (end index, pattern length, payload, latin) of every match in text.lower()
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        root = goto[0]
+        # From the root, jump straight to the next character that starts a pattern
+        # (in C): most characters of a chunk do not start any term
+        next_start = self._start_re.search
+        lower = text.lower()
+        n = len(lower)
+        state = 0
+        i = 0
+        while i < n:
+            if state == 0:
+                m = next_start(lower, i)
+                if m is None:
+                    return
+                i = m.start()
+                state = root[lower[i]]
+            else:
+                ch = lower[i]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            if out[state]:
+                for length, payload, latin in out[state]:
+                    yield i, length, payload, latin
+            i += 1
+
+class ContentTagger:
+    """
+    Tags a chunk's scene fields from term density in its text, see module docstring
+    """
+    def __init__(self, vocabulary: Dict[str, Dict[str, List[str]]] = SCENE_VOCABULARY):
+        patterns = {}
+        for field, values in vocabulary.items():
+            for value, terms in values.items():
+                for term in terms:
+                    patterns[term] = (field, value)
+        self.automaton = AhoCorasick(patterns)
+        self.fields = list(vocabulary)
+        self.chunks_seen = 0
+        self.chunks_tagged = 0
+        self._lock = threading.Lock()
+
+    def count_terms(self, text: str) -> Counter:
+        """
+        (field, value) -> number of term hits in text
+        """
+        hits = Counter()
+        lower = None
+        for end, length, payload, latin in self.automaton.iter_matches(text):
+            if latin:
+                if lower is None:
+                    lower = text.lower()
+                start = end - length + 1
+                if (start > 0 and _is_word_char(lower[start - 1])) or \
+                        (end + 1 < len(lower) and _is_word_char(lower[end + 1])):
+                    continue
+            hits[payload] += 1
+        return hits
+
+    def tag(self, text: str) -> Dict[str, str]:
+        """
+        Scene tags of one chunk, e.g. {"env": "浅海", "band": "低频"}; fields without a
+        dominant, dense enough value are left out
+        """
+        tags = {}
+        if text:
+            hits = self.count_terms(text)
+            field_totals = Counter()
+            for (field, _), n in hits.items():
+                field_totals[field] += n
+            for (field, value), n in hits.most_common():
+                if field in tags:
+                    continue
+                if n >= TAG_MIN_HITS and n * 1000 / len(text) >= TAG_MIN_DENSITY \
+                        and n / field_totals[field] >= TAG_MIN_SHARE:
+                    tags[field] = value
+        with self._lock:
+            self.chunks_seen += 1
+            self.chunks_tagged += bool(tags)
+        return tags
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"chunks_seen": self.chunks_seen, "chunks_tagged": self.chunks_tagged}
+
+# Singleton
+content_tagger = ContentTagger()
@@ -0,0 +1,314 @@
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.utils import SQLiteStore, setup_logger
+
+logger = setup_logger('dedup')
+
+SIMHASH_BITS = 64
+# Character shingles work for Chinese and English text alike, no tokenizer needed
+SHINGLE_SIZE = 3
+# Fingerprints of very short chunks (headings, list items) are too coarse to compare
+MIN_CHARS = 30
+
+def _shingles(text: str) -> Counter:
+    norm = ''.join(text.lower().split())
+    if len(norm) <= SHINGLE_SIZE:
+        return Counter([norm]) if norm else Counter()
+    return Counter(norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1))
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash of the character shingles of `text` (whitespace and case insensitive).
+    Similar texts get fingerprints with a small Hamming distance
+    """
+    features = _shingles(text)
+    if not features:
+        return 0
+    # Stable across processes and runs, unlike hash()
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'little') for f in features),
+        dtype='<u8', count=len(features)
+    )
+    weights = np.fromiter(features.values(), dtype=np.int64, count=len(features))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    scores = weights @ (2 * bits.astype(np.int64) - 1)
+    return int(np.packbits(scores > 0, bitorder='little').view('<u8')[0])
+
+def similarity(fp_a: int, fp_b: int) -> float:
+    """
+    Fraction of equal bits of two fingerprints
+    """
+    return 1.0 - bin(fp_a ^ fp_b).count('1') / SIMHASH_BITS
+
+# Columns of a suppression record, in table order
+_RECORD_COLUMNS = ("page", "ordinal", "similarity", "matched_source", "matched_page",
+                   "matched_ordinal", "matched_chunk", "preview")
+
+class NearDuplicateIndex(SQLiteStore):
+    """
+    SimHash fingerprints of every indexed chunk, used to suppress near-duplicate
+    chunks at ingestion time, plus a provenance record of what was suppressed and
+    which indexed chunk it matched. Stored in SQLite next to the vector store:
+    changes are written as they happen and committed by save(), so the cost of a
+    file does not grow with the size of the corpus.
+
+    Candidates are found by banding: with a maximum Hamming distance d, the 64 bits
+    are split into d + 1 bands, so a near-duplicate shares at least one band exactly.
+    The band keys of an entry follow from its fingerprint, so removing it touches
+    only its own buckets.
+    """
+    def __init__(self, path: str, threshold: float = 0.9):
+        super().__init__(path)
+        # admit looks up (find) and registers under the same lock
+        self._lock = threading.RLock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (source_path TEXT NOT NULL, fp TEXT NOT NULL, "
+            "page INTEGER, ordinal INTEGER, chunk_id TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS fingerprints_source ON fingerprints (source_path)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS suppressed (source_path TEXT NOT NULL, page INTEGER, ordinal INTEGER, "
+            "similarity REAL, matched_source TEXT, matched_page INTEGER, matched_ordinal INTEGER, "
+            "matched_chunk TEXT, preview TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS suppressed_source ON suppressed (source_path)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS suppressed_matched ON suppressed (matched_source)")
+        self._conn.commit()
+        self._import_json(os.path.splitext(path)[0] + ".json")
+        self.set_threshold(threshold)
+
+    def _import_json(self, json_path: str) -> None:
+        """
+        Index written as one JSON file by earlier versions: moved into the tables once
+        """
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock, self._conn:
+                for source_path, entries in data.get("chunks", {}).items():
+                    for entry in entries:
+                        self._insert(source_path, entry, index=False)
+                for source_path, records in data.get("suppressed", {}).items():
+                    for record in records:
+                        self._insert_record(source_path, record)
+            os.replace(json_path, json_path + ".bak")
+            logger.info(f"Near-duplicate index moved from {json_path} to {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to import near-duplicate index {json_path}: {e}")
+
+    def set_threshold(self, threshold: float) -> None:
+        """
+        Minimum SimHash similarity (0-1) for a chunk to count as a near-duplicate.
+        Rebuilds the in-memory band buckets
+        """
+        with self._lock:
+            self.threshold = threshold
+            self.max_distance = max(0, int((1.0 - threshold) * SIMHASH_BITS + 1e-9))
+            num_bands = min(SIMHASH_BITS, self.max_distance + 1)
+            bounds = [round(i * SIMHASH_BITS / num_bands) for i in range(num_bands + 1)]
+            self._bands = [(bounds[i], (1 << (bounds[i + 1] - bounds[i])) - 1) for i in range(num_bands)]
+            # band key -> {(source_path, page, ordinal): (fp, source_path, page, ordinal, chunk ID)}
+            self._buckets: Dict[Tuple[int, int], Dict[Tuple, Tuple]] = {}
+            for source_path, fp, page, ordinal, chunk_id in self._conn.execute(
+                "SELECT source_path, fp, page, ordinal, chunk_id FROM fingerprints"
+            ):
+                self._index(source_path, [fp, page, ordinal, chunk_id])
+
+    def _band_keys(self, fp: int):
+        return [(i, (fp >> shift) & mask) for i, (shift, mask) in enumerate(self._bands)]
+
+    def _index(self, source_path: str, entry: List) -> None:
+        fp = int(entry[0], 16)
+        # Entries written before chunk IDs were recorded have none
+        item = (fp, source_path, entry[1], entry[2], entry[3] if len(entry) > 3 else None)
+        for key in self._band_keys(fp):
+            self._buckets.setdefault(key, {})[item[1:4]] = item
+
+    def _unindex(self, source_path: str, entries: List[List]) -> None:
+        for entry in entries:
+            for key in self._band_keys(int(entry[0], 16)):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.pop((source_path, entry[1], entry[2]), None)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _insert(self, source_path: str, entry: List, index: bool = True) -> None:
+        self._conn.execute(
+            "INSERT INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+            (source_path, entry[0], entry[1], entry[2], entry[3] if len(entry) > 3 else None)
+        )
+        if index:
+            self._index(source_path, entry)
+
+    def _insert_record(self, source_path: str, record: Dict) -> None:
+        self._conn.execute(
+            "INSERT INTO suppressed VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (source_path,) + tuple(record.get(column) for column in _RECORD_COLUMNS)
+        )
+
+    def find(self, fp: int) -> Optional[Tuple[float, str, int, int, Optional[str]]]:
+        """
+        Most similar indexed chunk within the threshold:
+        (similarity, source_path, page, ordinal, chunk ID) or None
+        """
+        best = None
+        best_distance = self.max_distance + 1
+        with self._lock:
+            for key in self._band_keys(fp):
+                for other_fp, source_path, page, ordinal, chunk_id in self._buckets.get(key, {}).values():
+                    distance = bin(fp ^ other_fp).count('1')
+                    if distance < best_distance:
+                        best_distance = distance
+                        best = (source_path, page, ordinal, chunk_id)
+        if best is None:
+            return None
+        return (1.0 - best_distance / SIMHASH_BITS,) + best
+
+    def admit(self, text: str, source_path: str, page, ordinal: int,
+              chunk_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Check one chunk before it is indexed. A near-duplicate of an indexed chunk is
+        recorded as suppressed and its provenance record returned; otherwise the chunk
+        is registered under chunk_id and None returned
+        """
+        fp = simhash(text)
+        with self._lock:
+            match = self.find(fp) if len(text) >= MIN_CHARS else None
+            if match is not None:
+                sim, matched_source, matched_page, matched_ordinal, matched_chunk = match
+                record = {
+                    "page": page,
+                    "ordinal": ordinal,
+                    "similarity": round(sim, 4),
+                    "matched_source": matched_source,
+                    "matched_page": matched_page,
+                    "matched_ordinal": matched_ordinal,
+                    "matched_chunk": matched_chunk,
+                    "preview": text[:80]
+                }
+                self._insert_record(source_path, record)
+                return record
+            self._insert(source_path, [f"{fp:016x}", page, ordinal, chunk_id])
+            return None
+
+    def _split_source(self, source_path: str, after_page: Optional[int]) -> Tuple[List[List], List[Dict]]:
+        """
+        Take the entries and suppression records of one source (or of its pages > after_page)
+        out of the index and return them
+        """
+        where, params = "source_path = ?", (source_path,)
+        if after_page is not None:
+            where, params = where + " AND COALESCE(page, 0) > ?", params + (after_page,)
+        entries = [list(row) for row in self._conn.execute(
+            f"SELECT fp, page, ordinal, chunk_id FROM fingerprints WHERE {where}", params
+        )]
+        records = [dict(zip(_RECORD_COLUMNS, row)) for row in self._conn.execute(
+            f"SELECT {', '.join(_RECORD_COLUMNS)} FROM suppressed WHERE {where} ORDER BY rowid", params
+        )]
+        self._conn.execute(f"DELETE FROM fingerprints WHERE {where}", params)
+        self._conn.execute(f"DELETE FROM suppressed WHERE {where}", params)
+        self._unindex(source_path, entries)
+        return entries, records
+
+    def detach_source(self, source_path: str, after_page: Optional[int] = None) -> Tuple[List[List], List[Dict]]:
+        """
+        Set the fingerprints and suppression records of a source (or of its pages > after_page)
+        aside before it is re-ingested: otherwise every unchanged chunk would be a near-duplicate
+        of itself. The pass registers its chunks again; a failed pass hands the detached state
+        to restore_source
+        """
+        with self._lock:
+            return self._split_source(source_path, after_page)
+
+    def restore_source(self, source_path: str, detached: Tuple[List[List], List[Dict]],
+                       after_page: Optional[int] = None) -> None:
+        """
+        Undo detach_source: drop what a failed pass registered and put the detached state back
+        """
+        entries, records = detached
+        with self._lock:
+            self._split_source(source_path, after_page)
+            for entry in entries:
+                self._insert(source_path, entry)
+            for record in records:
+                self._insert_record(source_path, record)
+
+    def remove_chunks(self, source_path: str, chunk_ids: List[str]) -> List[str]:
+        """
+        Forget the fingerprints of deleted chunks of one source.
+        Returns the other sources with chunks suppressed as duplicates of them
+        """
+        with self._lock:
+            removed = []
+            for part, placeholders in self.in_chunks(list(chunk_ids)):
+                where = f"source_path = ? AND chunk_id IN ({placeholders})"
+                params = (source_path,) + tuple(part)
+                removed += [list(row) for row in self._conn.execute(
+                    f"SELECT fp, page, ordinal, chunk_id FROM fingerprints WHERE {where}", params
+                )]
+                self._conn.execute(f"DELETE FROM fingerprints WHERE {where}", params)
+            self._unindex(source_path, removed)
+            if removed:
+                self.save()
+        return self.dependents(source_path, chunk_ids)
+
+    def dependents(self, source_path: str, chunk_ids: List[str]) -> List[str]:
+        """
+        Other sources with chunks suppressed as duplicates of the given chunks of source_path
+        """
+        chunk_ids = set(chunk_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT source_path, matched_chunk FROM suppressed WHERE matched_source = ? AND source_path != ?",
+                (source_path, source_path)
+            ).fetchall()
+        # Records written before chunk IDs: any chunk of the source may be the match
+        return sorted({other for other, matched_chunk in rows if matched_chunk is None or matched_chunk in chunk_ids})
+
+    def remove_source(self, source_path: str, after_page: Optional[int] = None) -> List[str]:
+        """
+        Forget the fingerprints and suppression records of one source, or only
+        those of its pages > after_page (rolling back a partially ingested file).
+        Returns the other sources that had chunks suppressed as duplicates of the
+        removed chunks: those chunks are no longer represented in the index
+        """
+        with self._lock:
+            removed, removed_records = self._split_source(source_path, after_page)
+            orphaned = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT source_path FROM suppressed WHERE matched_source = ? AND source_path != ? "
+                "AND (? IS NULL OR COALESCE(matched_page, 0) > ?) ORDER BY source_path",
+                (source_path, source_path, after_page, after_page)
+            )]
+            if removed or removed_records:
+                self.save()
+            return orphaned
+
+    def suppressed_for(self, source_path: str) -> List[Dict]:
+        with self._lock:
+            return [dict(zip(_RECORD_COLUMNS, row)) for row in self._conn.execute(
+                f"SELECT {', '.join(_RECORD_COLUMNS)} FROM suppressed WHERE source_path = ? ORDER BY rowid",
+                (source_path,)
+            )]
+
+    def save(self) -> None:
+        """
+        Commit the changes made since the last save
+        """
+        with self._lock:
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "chunks": self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0],
+                "suppressed": self._conn.execute("SELECT COUNT(*) FROM suppressed").fetchone()[0]
+            }
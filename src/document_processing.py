@@ -1,64 +1,384 @@
 import os
 import re
-from typing import List
-import docx
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import fitz  # PyMuPDF
+import numpy as np
+from lxml import etree
 from pypdf import PdfReader
 from rapidocr_onnxruntime import RapidOCR
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from src.embedding_tokens import MODEL_MAX_TOKENS, SPECIAL_TOKENS, EmbeddingTokenCounter
+from src.parse_cache import ParseCache, parse_cache, file_digest, make_key
+from src.text_normalizer import RULE_EMPTY, TextNormalizer
 from src.utils import setup_logger
 
 logger = setup_logger('document_processing')
 
+# Render zoom used for OCR (zoom=2 for better quality)
+OCR_ZOOM = 2
+
+# OCR page triage (see triage_page): a grayscale render at TRIAGE_ZOOM decides whether a
+# scanned page is OCRed at all, and at which zoom
+TRIAGE_ZOOM = 1.0
+# Pixels darker than the paper level by this much count as ink
+INK_CONTRAST = 64
+# Fewer ink pixels than this fraction of the page: blank page
+BLANK_INK_RATIO = 0.0005
+# More non-paper pixels (darker than paper by FIGURE_TONE_DELTA) than this fraction: full-page figure
+FIGURE_TONE_DELTA = 48
+FIGURE_COVERAGE = 0.5
+# The recognizer works on 48 px high line crops, larger text gains nothing from a higher zoom
+OCR_TARGET_TEXT_PX = 48
+MIN_OCR_ZOOM = 1.0
+
+# Bump when cleaning/splitting/OCR logic changes, so cached artifacts are invalidated
+PARSER_VERSION = 2
+
+PDF_BACKENDS = ("pypdf", "pymupdf")
+
+# Running header/footer normalization: page numbers etc. vary between pages
+_DIGITS_RE = re.compile(r'\d+')
+_PAGE_NUMBER_RE = re.compile(r'^[\s\-—–·\.第页]*([0-9]+|[ivxlcdm]+)[\s\-—–·\.页]*$', re.IGNORECASE)
+
+# WordprocessingML
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W_BODY = f"{{{_W_NS}}}body"
+_W_P = f"{{{_W_NS}}}p"
+_W_R = f"{{{_W_NS}}}r"
+_W_HYPERLINK = f"{{{_W_NS}}}hyperlink"
+_W_BR = f"{{{_W_NS}}}br"
+_W_BR_TYPE = f"{{{_W_NS}}}type"
+# Text equivalents of run children, as python-docx's Run.text (w:br depends on its type)
+_W_RUN_TEXT = {
+    f"{{{_W_NS}}}t": None,
+    f"{{{_W_NS}}}tab": "\t",
+    f"{{{_W_NS}}}ptab": "\t",
+    f"{{{_W_NS}}}cr": "\n",
+    f"{{{_W_NS}}}noBreakHyphen": "-",
+    _W_BR: None,
+}
+_OFFICE_DOCUMENT_REL = "/officeDocument"
+
+# Per-process state for the OCR worker pool (see _init_ocr_worker)
+_worker_ocr = None
+_worker_triage = False
+_worker_doc = None
+_worker_doc_path = None
+
+def pixmap_to_ndarray(pix: "fitz.Pixmap") -> np.ndarray:
+    """
+    Zero-copy view of a pixmap's samples in the layout RapidOCR expects:
+    2-D for grayscale, H x W x 3 BGR for RGB (RapidOCR treats 3-channel
+    ndarrays as BGR, unlike PNG bytes which it converts from RGB itself)
+    """
+    img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    if pix.n == 1:
+        return img[:, :, 0]
+    if pix.n == 3:
+        # RGB -> BGR as a negative-stride view, no copy
+        return img[:, :, ::-1]
+    return img
+
+def triage_page(page) -> Tuple[str, float]:
+    """
+    Cheap pre-pass on a low-resolution grayscale render of a scanned page.
+    Returns (verdict, zoom): verdict is "blank", "figure" or "text", zoom is the OCR
+    render scale, lowered from OCR_ZOOM when the text lines are set in large type
+    """
+    pix = page.get_pixmap(matrix=fitz.Matrix(TRIAGE_ZOOM, TRIAGE_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+    img = pixmap_to_ndarray(pix)
+    hist = np.bincount(img.ravel(), minlength=256)
+    total = img.size
+    # Paper level: 95th percentile brightness, robust to yellowed or gray scans
+    paper = int(np.searchsorted(np.cumsum(hist), total * 0.95))
+    ink_level = max(0, paper - INK_CONTRAST)
+    if hist[:ink_level].sum() < total * BLANK_INK_RATIO:
+        return "blank", OCR_ZOOM
+    if hist[:max(0, paper - FIGURE_TONE_DELTA)].sum() > total * FIGURE_COVERAGE:
+        return "figure", OCR_ZOOM
+
+    # Text height from the row profile: runs of consecutive rows containing ink
+    ink_rows = np.concatenate(([False], (img < ink_level).sum(axis=1) >= 2, [False]))
+    edges = np.flatnonzero(np.diff(ink_rows.astype(np.int8)))
+    runs = edges[1::2] - edges[0::2]
+    if len(runs) < 3:
+        return "text", OCR_ZOOM
+    text_height = float(np.median(runs)) / TRIAGE_ZOOM
+    zoom = min(float(OCR_ZOOM), max(MIN_OCR_ZOOM, OCR_TARGET_TEXT_PX / text_height))
+    return "text", round(zoom, 2)
+
+def _extract_ocr_text(ocr, page, triage: bool = False) -> Tuple[str, Dict]:
+    """
+    Render one fitz page and return the raw OCR text, one recognized line per row,
+    and {"verdict", "zoom", "triage_s", "det_s"}. With triage, blank and full-page
+    figure pages are skipped and large type is rendered at a lower zoom (see triage_page)
+    """
+    start = time.perf_counter()
+    verdict, zoom = triage_page(page) if triage else ("text", OCR_ZOOM)
+    info = {"verdict": verdict, "zoom": zoom, "triage_s": time.perf_counter() - start, "det_s": 0.0}
+    if verdict != "text":
+        return "", info
+    mat = fitz.Matrix(zoom, zoom)
+    pix = page.get_pixmap(matrix=mat, alpha=False)
+
+    # Hand the rendered samples to RapidOCR as an ndarray view instead of a
+    # PNG encode/decode round-trip. `pix` must stay alive while `img` is used.
+    img = pixmap_to_ndarray(pix)
+
+    ocr_start = time.perf_counter()
+    result, elapse = ocr(img)
+    # elapse = [det, cls, rec] seconds; None when nothing was detected
+    info["det_s"] = elapse[0] if elapse else time.perf_counter() - ocr_start
+
+    page_text = ""
+    if result:
+        for line in result:
+            if line and len(line) >= 2:
+                page_text += line[1] + "\n"
+    return page_text, info
+
+def _init_ocr_worker(threads_per_worker: int, triage: bool = False):
+    """
+    Pool initializer: one RapidOCR engine per worker process, with a bounded
+    onnxruntime thread count so that workers do not oversubscribe the cores
+    """
+    global _worker_ocr, _worker_triage
+    _worker_ocr = RapidOCR(intra_op_num_threads=threads_per_worker, inter_op_num_threads=1)
+    _worker_triage = triage
+
+def _ocr_page_worker(task: Tuple[str, int]) -> Tuple[int, Optional[str], Optional[str], Optional[Dict]]:
+    """
+    Pool task: OCR a single page of a PDF.
+    Returns (page_num, page_text, error, page_info)
+    """
+    global _worker_doc, _worker_doc_path
+    file_path, page_num = task
+    try:
+        # Keep the document open across tasks of the same file
+        if _worker_doc_path != file_path:
+            if _worker_doc is not None:
+                _worker_doc.close()
+            _worker_doc = fitz.open(file_path)
+            _worker_doc_path = file_path
+        page_text, info = _extract_ocr_text(_worker_ocr, _worker_doc[page_num], triage=_worker_triage)
+        return page_num, page_text, None, info
+    except Exception as e:
+        return page_num, None, str(e), None
+
+def _docx_main_part(archive: zipfile.ZipFile) -> str:
+    """
+    Name of the main document part, from the package relationships
+    """
+    try:
+        rels = etree.fromstring(archive.read("_rels/.rels"))
+        for rel in rels:
+            if rel.get("Type", "").endswith(_OFFICE_DOCUMENT_REL):
+                return rel.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+def _docx_run_text(run) -> str:
+    parts = []
+    for child in run:
+        if child.tag not in _W_RUN_TEXT:
+            continue
+        text = _W_RUN_TEXT[child.tag]
+        if text is None:
+            if child.tag == _W_BR:
+                # Line breaks only, page and column breaks have no text
+                text = "\n" if child.get(_W_BR_TYPE, "textWrapping") == "textWrapping" else ""
+            else:
+                text = child.text or ""
+        parts.append(text)
+    return "".join(parts)
+
+def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
+    """
+    Stream the text of the body paragraphs of a .docx, same as
+    [p.text for p in docx.Document(file_path).paragraphs] (tables excluded), without
+    loading the package: only the main document XML is read, incrementally, and
+    media parts are never touched. Processed elements are freed as parsing goes
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(_docx_main_part(archive)) as stream:
+            for _, elem in etree.iterparse(stream, events=("end",), huge_tree=True):
+                parent = elem.getparent()
+                if parent is None or parent.tag != _W_BODY:
+                    continue
+                if elem.tag == _W_P:
+                    parts = []
+                    for child in elem:
+                        if child.tag == _W_R:
+                            parts.append(_docx_run_text(child))
+                        elif child.tag == _W_HYPERLINK:
+                            parts.extend(_docx_run_text(r) for r in child if r.tag == _W_R)
+                    yield "".join(parts)
+                # Drop the finished body-level element (paragraph, table, ...) and its predecessors
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
 class DocumentProcessor:
-    def __init__(self):
-        # Initialize RapidOCR
+    def __init__(self, ocr_workers: Optional[int] = None, ocr_threads_per_worker: int = 1,
+                 cache: Optional[ParseCache] = parse_cache, pdf_backend: str = "pypdf"):
+        """
+        Args:
+            pdf_backend: Text-layer extraction for PDFs, "pypdf" (default) or "pymupdf".
+                "pymupdf" is faster and drops running headers/footers by position.
+            ocr_workers: Number of OCR worker processes for scanned PDFs.
+                None = one per CPU core (minus one), 1 = sequential OCR in-process.
+            ocr_threads_per_worker: onnxruntime intra-op threads per OCR worker
+            cache: Parse/OCR artifact cache, None to disable
+        """
+        self.cache = cache
+        self.normalizer = TextNormalizer()
+        if pdf_backend not in PDF_BACKENDS:
+            raise ValueError(f"Unknown pdf_backend {pdf_backend!r}, expected one of {PDF_BACKENDS}")
+        self.pdf_backend = pdf_backend
+        # pymupdf backend: blocks inside the top/bottom margin band (fraction of page
+        # height) that repeat on at least min_pages_for_header pages are headers/footers
+        self.header_footer_margin = 0.08
+        self.min_pages_for_header = 3
+        # RapidOCR is created lazily, see the `ocr` property
         # It's lighter and doesn't have the dependency hell of PaddleOCR
-        self.ocr = RapidOCR()
+        self._ocr = None
+        if ocr_workers is None:
+            ocr_workers = max(1, (os.cpu_count() or 1) - 1)
+        self.ocr_workers = max(1, ocr_workers)
+        self.ocr_threads_per_worker = max(1, ocr_threads_per_worker)
+        # One OCR pool shared by the files being OCRed at the same time (ingest queue
+        # workers), so that there are never more than ocr_workers OCR processes.
+        # Shut down once no file uses it
+        self._ocr_pool: Optional[ProcessPoolExecutor] = None
+        self._ocr_pool_users: Dict[ProcessPoolExecutor, int] = {}
+        self._ocr_pool_lock = threading.Lock()
+        # Below this page count the pool start-up cost outweighs the gain
+        self.min_pages_for_parallel_ocr = 8
+        # Skip blank/figure pages and pick the OCR zoom per page from a low-res pre-pass
+        self.ocr_page_triage = True
+        # A PDF page whose text layer has fewer characters than this is OCRed
+        self.min_text_layer_chars = 10
+        # Upper bound on a heading-less section held in memory while streaming
+        self.max_section_chars = 200000
+        # Chunk length is measured in embedding-model tokens: chunks are packed up to
+        # chunk_token_budget, below the model window, so nothing is truncated at embed time
+        self.token_counter = EmbeddingTokenCounter()
+        self.chunk_token_budget = 480
+        self.chunk_token_overlap = 90
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,
-            chunk_overlap=150,
+            chunk_size=self.chunk_token_budget,
+            chunk_overlap=self.chunk_token_overlap,
+            length_function=lambda text: self.token_counter.count(text),
             separators=["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]
         )
+        # Chunks yielded so far vs. the model's length limit, see chunk_length_stats
+        self._chunk_stats = Counter()
+        # OCR page triage totals, see ocr_triage_stats
+        self._ocr_stats = Counter()
+        self._stats_lock = threading.Lock()
 
-    def clean_text(self, text: str) -> str:
-        lines = text.splitlines()
-        cleaned_lines = []
-        for line in lines:
-            raw = line.strip()
-            if not raw:
-                continue
-            lower = raw.lower()
-            if re.fullmatch(r'[0-9ivxlcdm\.]+', lower):
-                continue
-            if re.search(r'page\s*\d+', lower):
-                continue
-            if re.search(r'https?://', lower):
-                continue
-            if '@' in lower and ' ' not in lower:
-                continue
-            if len(raw) <= 3 and all(ch in '-_=·•—~*·. ' for ch in raw):
-                continue
-            
-           
-            special_chars = re.findall(r'[^\u4e00-\u9fa5a-zA-Z0-9\s\.\,\，\。\、\(\)（）]', raw)
-            if len(raw) > 5 and len(special_chars) / len(raw) > 0.4:
-                continue
-                
-            # Remove isolated single characters or very short meaningless lines
-            # But keep short headings like "1. 引言"
-            if len(raw) < 4 and not re.match(r'^\d', raw) and not re.match(r'^第', raw):
-                # Check if it's likely noise
-                if not re.search(r'[\u4e00-\u9fa5]', raw): # No Chinese characters
-                    continue
+    def ocr_cache_settings(self) -> Dict:
+        """
+        Settings that change the raw OCR text of a page
+        """
+        settings = {"version": PARSER_VERSION, "ocr_zoom": OCR_ZOOM, "ocr_triage": False}
+        if self.ocr_page_triage:
+            settings["ocr_triage"] = {
+                "zoom": TRIAGE_ZOOM, "ink_contrast": INK_CONTRAST, "blank_ink_ratio": BLANK_INK_RATIO,
+                "figure_tone_delta": FIGURE_TONE_DELTA, "figure_coverage": FIGURE_COVERAGE,
+                "target_text_px": OCR_TARGET_TEXT_PX, "min_zoom": MIN_OCR_ZOOM
+            }
+        return settings
 
-            cleaned_lines.append(raw)
-            
-        text = ' '.join(cleaned_lines)
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        return text
+    def chunk_cache_settings(self) -> Dict:
+        """
+        Settings that change the final chunks of a file
+        """
+        settings = self.ocr_cache_settings()
+        settings.update({
+            "pdf_backend": self.pdf_backend,
+            "header_footer_margin": self.header_footer_margin,
+            "min_pages_for_header": self.min_pages_for_header,
+            "min_text_layer_chars": self.min_text_layer_chars,
+            "chunk_size": self.text_splitter._chunk_size,
+            "chunk_overlap": self.text_splitter._chunk_overlap,
+            "chunk_length_unit": self.token_counter.name,
+            "max_section_chars": self.max_section_chars,
+            "separators": self.text_splitter._separators
+        })
+        return settings
+
+    def _count_chunk(self, stats: Counter, text: str) -> int:
+        tokens = self.token_counter.count(text)
+        stats["chunks"] += 1
+        stats["tokens"] += tokens
+        if tokens > MODEL_MAX_TOKENS - SPECIAL_TOKENS:
+            stats["over_limit"] += 1
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+        return tokens
+
+    def _finish_chunk_stats(self, file_name: str, stats: Counter, dropped: Optional[Counter] = None) -> None:
+        if not stats["chunks"]:
+            return
+        msg = (
+            f"{file_name}: {stats['chunks']} chunks, {stats['over_limit']} over the "
+            f"{MODEL_MAX_TOKENS}-token model limit (max {stats['max_tokens']} tokens)"
+        )
+        # Noise lines removed by clean_text, per filter rule
+        dropped = {rule: count for rule, count in (dropped or {}).items() if rule != RULE_EMPTY}
+        if dropped:
+            msg += (f", dropped {sum(dropped.values())} noise lines ("
+                    + ", ".join(f"{rule} {count}" for rule, count in sorted(dropped.items(), key=lambda x: -x[1])) + ")")
+        logger.info(msg)
+        with self._stats_lock:
+            max_tokens = max(self._chunk_stats["max_tokens"], stats.pop("max_tokens"))
+            self._chunk_stats.update(stats)
+            self._chunk_stats["max_tokens"] = max_tokens
+
+    def chunk_length_stats(self) -> Dict:
+        """
+        Token lengths of the chunks produced so far (in this process):
+        {'chunks', 'over_limit', 'mean_tokens', 'max_tokens', 'token_counter'}
+        """
+        with self._stats_lock:
+            chunks = self._chunk_stats["chunks"]
+            return {
+                "chunks": chunks,
+                "over_limit": self._chunk_stats["over_limit"],
+                "mean_tokens": round(self._chunk_stats["tokens"] / chunks, 1) if chunks else 0.0,
+                "max_tokens": self._chunk_stats["max_tokens"],
+                "token_counter": self.token_counter.name
+            }
+
+    def ocr_triage_stats(self) -> Dict:
+        """
+        OCR page triage totals (in this process): pages OCRed, skipped as blank or
+        figure, rendered below OCR_ZOOM, and the estimated OCR seconds saved
+        """
+        with self._stats_lock:
+            stats = {k: self._ocr_stats[k] for k in ("ocr", "blank", "figure", "reduced_zoom")}
+            stats["saved_s"] = round(self._ocr_stats["saved_s"], 1)
+            return stats
+
+    @property
+    def ocr(self) -> RapidOCR:
+        # Initialize RapidOCR on first use, so that text-only workloads (and
+        # OCR pool workers importing this module) don't pay for the models
+        if self._ocr is None:
+            self._ocr = RapidOCR()
+        return self._ocr
+
+    def clean_text(self, text: str) -> str:
+        # Line filters live in TextNormalizer (compiled once, per-rule hit counters)
+        return self.normalizer.normalize(text)
 
     def is_heading_line(self, line: str) -> bool:
         if not line:
@@ -73,195 +393,482 @@ class DocumentProcessor:
         return False
 
     def split_with_headings(self, text: str) -> List[str]:
-        lines = text.splitlines()
-        sections: List[str] = []
+        return list(self.iter_heading_chunks(text.splitlines()))
+
+    def iter_heading_chunks(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Streaming form of split_with_headings: consumes lines lazily and yields
+        the chunks of each heading-delimited section as soon as it is complete.
+        A section is also flushed once it exceeds max_section_chars, which bounds
+        memory on huge heading-less inputs
+        """
         current: List[str] = []
+        current_chars = 0
         for line in lines:
-            if self.is_heading_line(line) and current:
-                sections.append("\n".join(current))
-                current = [line]
-            else:
-                current.append(line)
+            if (self.is_heading_line(line) and current) or current_chars > self.max_section_chars:
+                yield from self._split_section("\n".join(current))
+                current = []
+                current_chars = 0
+            current.append(line)
+            current_chars += len(line) + 1
         if current:
-            sections.append("\n".join(current))
-        chunks: List[str] = []
-        for sec in sections:
-            cleaned = self.clean_text(sec)
-            if not cleaned:
-                continue
-            sec_chunks = self.text_splitter.split_text(cleaned)
-            chunks.extend(sec_chunks)
-        return chunks
+            yield from self._split_section("\n".join(current))
+
+    def _split_section(self, section: str) -> List[str]:
+        cleaned = self.clean_text(section)
+        if not cleaned:
+            return []
+        return self.text_splitter.split_text(cleaned)
 
     def process(self, file_path: str) -> List[Document]:
         """
         Main entry point for processing documents
         Returns list of Document objects with metadata
         """
+        return list(self.iter_documents(file_path))
+
+    def iter_documents(self, file_path: str, start_page: int = 1) -> Iterator[Document]:
+        """
+        Streaming entry point: yields Document objects (with source/page metadata)
+        page by page / section by section, in the same order as process().
+        With start_page > 1 (resuming an interrupted ingestion) only documents of
+        pages >= start_page are yielded, and PDF pages before it are not OCRed.
+        A parse error ends the stream with the exception, nothing is cached then
+        """
         if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
-            return []
+            return
             
         ext = os.path.splitext(file_path)[1].lower()
         file_name = os.path.basename(file_path)
+        if ext not in ['.docx', '.pdf', '.txt']:
+            logger.warning(f"Unsupported file type: {ext}")
+            return
         
-        try:
-            if ext == '.docx':
-                return self.process_docx(file_path, file_name)
-            elif ext == '.pdf':
-                return self.process_pdf(file_path, file_name)
-            elif ext == '.txt':
-                return self.process_txt(file_path, file_name)
-            else:
-                logger.warning(f"Unsupported file type: {ext}")
-                return []
-        except Exception as e:
-            logger.error(f"Error processing {file_path}: {e}")
-            return []
+        # Content-addressed cache: same bytes + same settings -> same chunks
+        file_hash = None
+        chunk_key = None
+        if self.cache is not None:
+            try:
+                file_hash = file_digest(file_path)
+                chunk_key = make_key(file_hash, self.chunk_cache_settings())
+                cached = self.cache.get_chunks(chunk_key)
+                if cached is not None:
+                    logger.info(f"Parse cache hit for {file_name}: {len(cached)} chunks")
+                    stats = Counter()
+                    for p, c in cached:
+                        if p < start_page:
+                            continue
+                        tokens = self._count_chunk(stats, c)
+                        yield Document(page_content=c, metadata={"source": file_name, "page": p, "tokens": tokens})
+                    self._finish_chunk_stats(file_name, stats)
+                    return
+            except Exception as e:
+                logger.warning(f"Parse cache lookup failed for {file_name}: {e}")
+        
+        # 0-based pages whose OCR failed in this run
+        failed_pages = []
+        self.normalizer.begin_file()
+        if ext == '.docx':
+            documents = self.iter_docx(file_path, file_name)
+        elif ext == '.pdf':
+            documents = self.iter_pdf(file_path, file_name, file_hash=file_hash, start_page=start_page,
+                                      failed_pages=failed_pages)
+        else:
+            documents = self.iter_txt(file_path, file_name)
+        
+        # Only (page, text) pairs are kept for the cache, not the Documents.
+        # A resumed (partial) pass is not cached
+        if start_page > 1:
+            chunk_key = None
+        chunks = []
+        stats = Counter()
+        for doc in documents:
+            if doc.metadata["page"] < start_page:
+                continue
+            # Kept with the chunk: the source registry counts the ones over the model limit
+            doc.metadata["tokens"] = self._count_chunk(stats, doc.page_content)
+            if chunk_key is not None:
+                chunks.append((doc.metadata["page"], doc.page_content))
+            yield doc
+        self._finish_chunk_stats(file_name, stats, dropped=self.normalizer.end_file())
+        
+        if failed_pages:
+            # The failed pages are OCRed again next time, their chunks must not be frozen as missing
+            logger.warning(f"Not caching chunks of {file_name}: OCR failed on {len(failed_pages)} pages")
+        elif chunks and chunk_key is not None:
+            self.cache.put_chunks(chunk_key, chunks)
 
     def process_docx(self, file_path: str, file_name: str) -> List[Document]:
         """
         Extract text from Word document
         """
+        return list(self.iter_docx(file_path, file_name))
+
+    def iter_docx(self, file_path: str, file_name: str) -> Iterator[Document]:
         try:
-            doc = docx.Document(file_path)
-            full_text = []
-            for para in doc.paragraphs:
-                full_text.append(para.text)
-            raw_text = '\n'.join(full_text)
-            chunks = self.split_with_headings(raw_text)
-            return [Document(page_content=c, metadata={"source": file_name, "page": 1}) for c in chunks]
+            # Streamed from word/document.xml: sections reach the splitter while
+            # the rest of the file is still being read
+            lines = (line for text in iter_docx_paragraphs(file_path) for line in (text.splitlines() or [""]))
+            for c in self.iter_heading_chunks(lines):
+                yield Document(page_content=c, metadata={"source": file_name, "page": 1})
         except Exception as e:
             logger.error(f"Error processing docx {file_path}: {e}")
-            return []
+            # A truncated stream must not pass for the whole file (cache, stale chunk deletion)
+            raise
 
     def process_txt(self, file_path: str, file_name: str) -> List[Document]:
+        return list(self.iter_txt(file_path, file_name))
+
+    def iter_txt(self, file_path: str, file_name: str) -> Iterator[Document]:
         try:
+            # Read line by line instead of the whole file
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                raw_text = f.read()
-            chunks = self.split_with_headings(raw_text)
-            return [Document(page_content=c, metadata={"source": file_name, "page": 1}) for c in chunks]
+                lines = (line.rstrip('\r\n') for line in f)
+                for c in self.iter_heading_chunks(lines):
+                    yield Document(page_content=c, metadata={"source": file_name, "page": 1})
         except Exception as e:
             logger.error(f"Error processing txt {file_path}: {e}")
-            return []
+            raise
 
-    def process_pdf(self, file_path: str, file_name: str) -> List[Document]:
+    def process_pdf(self, file_path: str, file_name: str, file_hash: Optional[str] = None) -> List[Document]:
         """
-        Extract text from PDF (Text-based or Scanned)
+        Extract text from PDF (Text-based, Scanned or Mixed)
+        """
+        return list(self.iter_pdf(file_path, file_name, file_hash=file_hash))
+
+    def iter_pdf(self, file_path: str, file_name: str, file_hash: Optional[str] = None,
+                 start_page: int = 1, failed_pages: Optional[List[int]] = None) -> Iterator[Document]:
+        """
+        Each page is routed on its own: pages with a usable text layer are
+        extracted directly, the rest are OCRed. Documents are yielded page by
+        page, OCR pages as soon as their OCR result is available.
+        Pages before start_page (1-based) are skipped and not OCRed.
+        0-based pages whose OCR failed are appended to failed_pages
         """
         try:
-            reader = PdfReader(file_path)
-            documents = []
-            is_scanned = True
-            
-            check_text = ""
-            for i in range(min(3, len(reader.pages))):
-                check_text += reader.pages[i].extract_text() or ""
+            # Extract every page exactly once, the result doubles as the text-layer probe
+            if self.pdf_backend == "pymupdf":
+                raw_pages = self.extract_pages_pymupdf(file_path)
+            else:
+                reader = PdfReader(file_path)
+                raw_pages = [page.extract_text() or "" for page in reader.pages]
+            ocr_page_nums = [i for i, text in enumerate(raw_pages) if not self.has_text_layer(text)]
+            if start_page > 1:
+                logger.info(f"Resuming {file_name} from page {start_page}")
             
-            if len(check_text.strip()) >= 10:
-                is_scanned = False
+            if not ocr_page_nums:
                 logger.info(f"PDF {file_name} identified as Text PDF.")
-            else:
+            elif len(ocr_page_nums) == len(raw_pages):
                 logger.info(f"PDF {file_name} identified as Scanned PDF. Using OCR.")
-                return self.process_scanned_pdf(file_path, file_name)
-
-            raw_pages = []
-            for page in reader.pages:
-                text = page.extract_text() or ""
-                raw_pages.append(text)
-
-            header_footer_candidates = {}
-            page_lines = []
-            for text in raw_pages:
-                lines = [l.strip() for l in text.splitlines()]
-                non_empty = [l for l in lines if l]
-                page_lines.append(non_empty)
-                candidates = []
-                if non_empty:
-                    candidates.append(non_empty[0])
-                if len(non_empty) >= 2:
-                    candidates.append(non_empty[1])
-                if len(non_empty) >= 3:
-                    candidates.append(non_empty[-1])
-                if len(non_empty) >= 4:
-                    candidates.append(non_empty[-2])
-                for c in candidates:
-                    header_footer_candidates[c] = header_footer_candidates.get(c, 0) + 1
-
-            repeated_lines = set()
-            min_pages_for_header = 3
-            for line, count in header_footer_candidates.items():
-                if count >= min_pages_for_header:
-                    repeated_lines.add(line)
-
-            for i, lines in enumerate(page_lines):
-                filtered = []
-                for l in lines:
-                    if l in repeated_lines:
-                        continue
-                    filtered.append(l)
-                page_text = '\n'.join(filtered)
-                if not page_text:
-                    continue
-                page_chunks = self.split_with_headings(page_text)
-                for chunk in page_chunks:
-                    documents.append(Document(
-                        page_content=chunk,
-                        metadata={"source": file_name, "page": i + 1}
-                    ))
-            return documents
+            else:
+                logger.info(
+                    f"PDF {file_name} identified as Mixed PDF: "
+                    f"{len(ocr_page_nums)}/{len(raw_pages)} pages without text layer, using OCR for those."
+                )
+            
+            ocr_set = set(ocr_page_nums)
+            text_pages = {i: text for i, text in enumerate(raw_pages) if i not in ocr_set}
+            # pymupdf pages come with headers/footers already removed by position
+            page_texts = self._filter_text_pages(text_pages, strip_repeated_lines=self.pdf_backend == "pypdf")
+            ocr_results = self._iter_ocr_pages(
+                file_path, file_name, [i for i in ocr_page_nums if i + 1 >= start_page], file_hash=file_hash,
+                failed_pages=failed_pages
+            )
+            
+            for page_num in range(start_page - 1, len(raw_pages)):
+                if page_num in ocr_set:
+                    ocr_page_num, ocr_text = next(ocr_results)
+                    yield from self._ocr_text_to_documents(ocr_text, file_name, ocr_page_num)
+                else:
+                    yield from self._text_page_to_documents(page_texts.get(page_num, ""), file_name, page_num)
+            # Let the OCR generator finish (logging, cache write)
+            for _ in ocr_results:
+                pass
 
         except Exception as e:
             logger.error(f"Error processing pdf {file_path}: {e}")
+            raise
+
+    def has_text_layer(self, page_text: str) -> bool:
+        return len(page_text.strip()) >= self.min_text_layer_chars
+
+    def extract_pages_pymupdf(self, file_path: str) -> List[str]:
+        """
+        Extract page texts from PyMuPDF text blocks in reading order.
+        Running headers/footers are dropped by position: a block inside the
+        top/bottom margin band is removed if it is a bare page number, or if
+        its digit-normalized text repeats in the band on >= min_pages_for_header pages
+        """
+        page_blocks = []
+        band_counts = {}
+        with fitz.open(file_path) as doc:
+            for page in doc:
+                height = page.rect.height
+                top = page.rect.y0 + height * self.header_footer_margin
+                bottom = page.rect.y1 - height * self.header_footer_margin
+                blocks = []
+                seen_keys = set()
+                # (x0, y0, x1, y1, text, block_no, block_type), block_type 0 = text
+                for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks", sort=True):
+                    if block_type != 0 or not text.strip():
+                        continue
+                    in_band = y1 <= top or y0 >= bottom
+                    key = None
+                    if in_band:
+                        key = _DIGITS_RE.sub('#', " ".join(text.split()))
+                        if key not in seen_keys:
+                            seen_keys.add(key)
+                            band_counts[key] = band_counts.get(key, 0) + 1
+                    blocks.append((text, key))
+                page_blocks.append(blocks)
+
+        pages = []
+        for blocks in page_blocks:
+            kept = []
+            for text, key in blocks:
+                if key is not None:
+                    if _PAGE_NUMBER_RE.match(text.strip()):
+                        continue
+                    if band_counts.get(key, 0) >= self.min_pages_for_header:
+                        continue
+                kept.append(text.strip())
+            pages.append('\n'.join(kept))
+        return pages
+
+    def _filter_text_pages(self, text_pages: Dict[int, str], strip_repeated_lines: bool = True) -> Dict[int, str]:
+        """
+        Header/footer removal for pages with a text layer: lines among the first/last
+        two of a page that repeat on >= min_pages_for_header pages are dropped.
+        Returns {page_num: filtered_text}
+        """
+        header_footer_candidates = {}
+        page_lines = {}
+        for page_num, text in text_pages.items():
+            lines = [l.strip() for l in text.splitlines()]
+            non_empty = [l for l in lines if l]
+            page_lines[page_num] = non_empty
+            if not strip_repeated_lines:
+                continue
+            candidates = []
+            if non_empty:
+                candidates.append(non_empty[0])
+            if len(non_empty) >= 2:
+                candidates.append(non_empty[1])
+            if len(non_empty) >= 3:
+                candidates.append(non_empty[-1])
+            if len(non_empty) >= 4:
+                candidates.append(non_empty[-2])
+            for c in candidates:
+                header_footer_candidates[c] = header_footer_candidates.get(c, 0) + 1
+
+        repeated_lines = set()
+        for line, count in header_footer_candidates.items():
+            if count >= self.min_pages_for_header:
+                repeated_lines.add(line)
+
+        filtered_pages = {}
+        for page_num, lines in page_lines.items():
+            filtered = []
+            for l in lines:
+                if l in repeated_lines:
+                    continue
+                filtered.append(l)
+            filtered_pages[page_num] = '\n'.join(filtered)
+        return filtered_pages
+
+    def _text_page_to_documents(self, page_text: str, file_name: str, page_num: int) -> List[Document]:
+        if not page_text:
             return []
+        return [
+            Document(page_content=chunk, metadata={"source": file_name, "page": page_num + 1})
+            for chunk in self.split_with_headings(page_text)
+        ]
 
-    def process_scanned_pdf(self, file_path: str, file_name: str) -> List[Document]:
+    def process_scanned_pdf(self, file_path: str, file_name: str, file_hash: Optional[str] = None) -> List[Document]:
         """
-        Use RapidOCR + PyMuPDF to extract text from scanned PDF
+        Use RapidOCR + PyMuPDF to extract text from scanned PDF (all pages OCRed)
         """
         try:
-            doc = fitz.open(file_path)
+            with fitz.open(file_path) as doc:
+                num_pages = len(doc)
             documents = []
-            
-            for page_num in range(len(doc)):
-                try:
-                    page = doc[page_num]
-                    # Render page to image (zoom=2 for better quality)
-                    mat = fitz.Matrix(2, 2)
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # RapidOCR accepts bytes directly
-                    img_bytes = pix.tobytes("png")
-                    
-                    result, _ = self.ocr(img_bytes)
-                    
-                    page_text = ""
-                    if result:
-                        for line in result:
-                            if line and len(line) >= 2:
-                                 page_text += line[1] + "\n"
-                    
-                    if page_text:
-                        clean_text = self.clean_text(page_text)
-                        if not clean_text:
-                            continue
-                        page_chunks = self.text_splitter.split_text(clean_text)
-                        for chunk in page_chunks:
-                            if not chunk.strip():
-                                continue
-                            documents.append(Document(
-                                page_content=chunk, 
-                                metadata={"source": file_name, "page": page_num + 1}
-                            ))
-                except Exception as e:
-                    logger.warning(f"Error processing page {page_num+1} of {file_name}: {e}")
-                    continue
-            
+            for page_num, page_text in self._iter_ocr_pages(file_path, file_name, list(range(num_pages)), file_hash=file_hash):
+                documents.extend(self._ocr_text_to_documents(page_text, file_name, page_num))
             return documents
             
         except Exception as e:
             logger.error(f"Error processing scanned pdf {file_path}: {e}")
             return []
+
+    def _iter_ocr_pages(self, file_path: str, file_name: str, page_nums: List[int],
+                        file_hash: Optional[str] = None,
+                        failed_pages: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        OCR the given 0-based pages, reusing cached page texts where available.
+        Pages are OCRed in a process pool when ocr_workers > 1
+        Yields (page_num, raw_ocr_text) in page_nums order, as results arrive.
+        Pages whose OCR failed (yielded with empty text) are appended to failed_pages
+        """
+        ocr_texts = {}
+        ocr_key = None
+        if page_nums and self.cache is not None:
+            if file_hash is None:
+                file_hash = file_digest(file_path)
+            ocr_key = make_key(file_hash, self.ocr_cache_settings())
+            cached = self.cache.get_ocr_pages(ocr_key) or {}
+            ocr_texts = {int(k): v for k, v in cached.items()}
+        
+        missing = [p for p in page_nums if p not in ocr_texts]
+        if page_nums and not missing:
+            logger.info(f"OCR cache hit for {file_name}: {len(page_nums)} pages")
+        
+        start = time.perf_counter()
+        workers = min(self.ocr_workers, len(missing))
+        if workers > 1 and len(missing) >= self.min_pages_for_parallel_ocr:
+            new_texts = self._iter_ocr_pages_parallel(file_path, file_name, missing, workers)
+        else:
+            workers = 1
+            new_texts = self._iter_ocr_pages_sequential(file_path, file_name, missing)
+        
+        failed = 0
+        page_infos = []
+        for page_num in page_nums:
+            if page_num not in ocr_texts:
+                ocr_page_num, page_text, ok, info = next(new_texts)
+                # Don't freeze transient page failures into the cache
+                if ok:
+                    ocr_texts[ocr_page_num] = page_text
+                    page_infos.append(info)
+                else:
+                    failed += 1
+                    if failed_pages is not None:
+                        failed_pages.append(ocr_page_num)
+                yield ocr_page_num, page_text
+            else:
+                yield page_num, ocr_texts[page_num]
+        
+        if missing:
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"OCR finished for {file_name}: {len(missing)} pages in {elapsed:.1f}s "
+                f"({len(missing) / max(elapsed, 1e-6):.2f} pages/s, workers={workers})"
+            )
+            if self.ocr_page_triage:
+                self._report_ocr_triage(file_name, page_infos)
+            if ocr_key is not None and failed < len(missing):
+                self.cache.put_ocr_pages(ocr_key, {str(k): v for k, v in ocr_texts.items()})
+
+    def _report_ocr_triage(self, file_name: str, page_infos: List[Dict]) -> None:
+        """
+        Log pages skipped by triage and the OCR time saved. A skipped page saves at
+        least the text detection pass over a full-zoom render, a lower-zoom page the
+        difference in detection time (recognition works on fixed-height line crops).
+        The reference is the mean detection time of this document's full-zoom pages,
+        the cost of the pre-pass itself is subtracted
+        """
+        full_det = [i["det_s"] for i in page_infos if i["verdict"] == "text" and i["zoom"] >= OCR_ZOOM]
+        full_det_s = sum(full_det) / len(full_det) if full_det else 0.0
+        stats = Counter()
+        for info in page_infos:
+            stats["saved_s"] -= info["triage_s"]
+            if info["verdict"] == "text":
+                stats["ocr"] += 1
+                if info["zoom"] < OCR_ZOOM:
+                    stats["reduced_zoom"] += 1
+                    stats["saved_s"] += max(0.0, full_det_s - info["det_s"])
+            else:
+                stats[info["verdict"]] += 1
+                stats["saved_s"] += full_det_s
+        if stats["blank"] or stats["figure"] or stats["reduced_zoom"]:
+            logger.info(
+                f"OCR triage for {file_name}: skipped {stats['blank']} blank and {stats['figure']} figure pages, "
+                f"{stats['reduced_zoom']} pages rendered below zoom {OCR_ZOOM}, "
+                f"~{stats['saved_s']:.1f}s OCR time saved"
+            )
+        with self._stats_lock:
+            self._ocr_stats.update(stats)
+
+    def _iter_ocr_pages_sequential(self, file_path: str, file_name: str,
+                                   page_nums: List[int]) -> Iterator[Tuple[int, str, bool, Optional[Dict]]]:
+        if not page_nums:
+            return
+        with fitz.open(file_path) as doc:
+            for page_num in page_nums:
+                try:
+                    page_text, info = _extract_ocr_text(self.ocr, doc[page_num], triage=self.ocr_page_triage)
+                    yield page_num, page_text, True, info
+                except Exception as e:
+                    logger.warning(f"Error processing page {page_num+1} of {file_name}: {e}")
+                    yield page_num, "", False, None
+
+    def _acquire_ocr_pool(self) -> ProcessPoolExecutor:
+        with self._ocr_pool_lock:
+            if self._ocr_pool is None:
+                # Workers import only this module and the main script: neither may load the
+                # embedding model at import time (spawn on Windows, see app.py)
+                self._ocr_pool = ProcessPoolExecutor(
+                    max_workers=self.ocr_workers,
+                    initializer=_init_ocr_worker,
+                    initargs=(self.ocr_threads_per_worker, self.ocr_page_triage)
+                )
+                self._ocr_pool_users[self._ocr_pool] = 0
+            self._ocr_pool_users[self._ocr_pool] += 1
+            return self._ocr_pool
+
+    def _release_ocr_pool(self, pool: ProcessPoolExecutor, broken: bool = False) -> None:
+        with self._ocr_pool_lock:
+            if broken and self._ocr_pool is pool:
+                # The next file starts a fresh pool
+                self._ocr_pool = None
+            self._ocr_pool_users[pool] -= 1
+            idle = self._ocr_pool_users[pool] == 0
+            if idle:
+                del self._ocr_pool_users[pool]
+                if self._ocr_pool is pool:
+                    self._ocr_pool = None
+        if idle:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_ocr_pages_parallel(self, file_path: str, file_name: str, page_nums: List[int],
+                                 workers: int) -> Iterator[Tuple[int, str, bool, Optional[Dict]]]:
+        tasks = [(file_path, page_num) for page_num in page_nums]
+        # Contiguous page runs per task batch keep each worker on one open document
+        chunksize = max(1, len(tasks) // (workers * 4))
+        pool = self._acquire_ocr_pool()
+        broken = False
+        # map() yields results in submission order
+        results = pool.map(_ocr_page_worker, tasks, chunksize=chunksize)
+        try:
+            for page_num, page_text, error, info in results:
+                if error is not None:
+                    logger.warning(f"Error processing page {page_num+1} of {file_name}: {error}")
+                    yield page_num, "", False, None
+                    continue
+                yield page_num, page_text, True, info
+        except BrokenProcessPool:
+            broken = True
+            raise
+        finally:
+            # Consumer may stop early: drop this file's pages not started yet
+            results.close()
+            self._release_ocr_pool(pool, broken=broken)
+
+    def _ocr_text_to_documents(self, page_text: str, file_name: str, page_num: int) -> List[Document]:
+        documents = []
+        if page_text:
+            clean_text = self.clean_text(page_text)
+            if not clean_text:
+                return documents
+            page_chunks = self.text_splitter.split_text(clean_text)
+            for chunk in page_chunks:
+                if not chunk.strip():
+                    continue
+                documents.append(Document(
+                    page_content=chunk, 
+                    metadata={"source": file_name, "page": page_num + 1}
+                ))
+        return documents
             
     # Deprecated legacy method
     def get_chunks(self, file_path: str) -> List[str]:
@@ -0,0 +1,167 @@
+"""
+Persistent embedding cache.
+
+Vectors are keyed by (model identity, normalized chunk text) and stored as raw
+float32 (optionally float16) blobs in one SQLite file under ./cache, next to the parse cache, so they
+survive reset_db.py, chunking changes and moved files. Least recently used
+entries are evicted once the cache grows past its size limit.
+"""
+import hashlib
+import os
+import sqlite3
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.utils import SQLiteStore, setup_logger
+
+logger = setup_logger('embedding_cache')
+
+def model_identity(model_path: str, normalize: bool = True) -> str:
+    """
+    Model name plus a hash of its config.json, so that a different checkpoint
+    in the same folder does not reuse vectors
+    """
+    name = os.path.basename(os.path.normpath(model_path.replace('\\', '/')))
+    config_hash = "noconfig"
+    try:
+        with open(os.path.join(model_path, "config.json"), 'rb') as f:
+            config_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+    except OSError:
+        pass
+    return f"{name}:{config_hash}:{'norm' if normalize else 'raw'}"
+
+def text_key(model_id: str, text: str) -> bytes:
+    """
+    Whitespace runs do not change what the embedding model sees
+    """
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(f"{model_id}\0{normalized}".encode('utf-8')).digest()
+
+class EmbeddingCache(SQLiteStore):
+    def __init__(self, path: str = "./cache/embeddings.sqlite", max_size_mb: int = 1024,
+                 dtype: str = "float32"):
+        """
+        Args:
+            path: SQLite file
+            max_size_mb: Vector bytes kept before least recently used entries are evicted
+            dtype: Storage precision, "float16" halves the size at ~1e-3 relative error
+        """
+        super().__init__(path)
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+        self._conn.commit()
+        # Logical clock for recency, persisted implicitly as the largest `used`
+        row = self._conn.execute("SELECT COALESCE(MAX(used), 0), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        self._clock, self._size = row
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        Cached vectors (float32) in the order of keys, None for misses
+        """
+        found = {}
+        with self._lock:
+            for part, placeholders in self.in_chunks(keys):
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._clock += 1
+                self._conn.executemany("UPDATE embeddings SET used = ? WHERE key = ?",
+                                       [(self._clock, k) for k in found])
+                self._conn.commit()
+            num_hits = sum(k in found for k in keys)
+            self.hits += num_hits
+            self.misses += len(keys) - num_hits
+        return [
+            np.frombuffer(found[k], dtype=self.dtype).astype(np.float32) if k in found else None
+            for k in keys
+        ]
+
+    def put_many(self, keys: List[bytes], vectors: List[List[float]]) -> None:
+        if not keys:
+            return
+        blobs = [np.asarray(v, dtype=self.dtype).tobytes() for v in vectors]
+        with self._lock:
+            try:
+                self._clock += 1
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, used) VALUES (?, ?, ?)",
+                    [(k, b, self._clock) for k, b in zip(keys, blobs)]
+                )
+                self._conn.commit()
+                # Vectors of one model all have the same size
+                self._size += (self._conn.total_changes - before) * len(blobs[0])
+                if self._size > self.max_size_bytes:
+                    self._evict()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write embedding cache {self.path}: {e}")
+
+    def _evict(self) -> None:
+        """
+        Drop least recently used vectors until the cache is back under 90% of its limit
+        """
+        row_size = self._conn.execute("SELECT LENGTH(vector) FROM embeddings LIMIT 1").fetchone()
+        if not row_size:
+            return
+        excess_rows = (self._size - int(self.max_size_bytes * 0.9)) // row_size[0] + 1
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used LIMIT ?)", (excess_rows,)
+        )
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        logger.info(f"Embedding cache eviction: removed {excess_rows} vectors, {self._size / 1024 / 1024:.1f} MB left")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "size_mb": round(self._size / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_size_bytes / 1024 / 1024, 2)
+            }
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper used as the vector store's embedding function: document
+    texts are looked up in the cache and only the misses reach the model.
+    Queries are passed through
+    """
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_id: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        # Stored precision is part of the key: blobs of another dtype are not reinterpreted
+        self.model_id = f"{model_id}:{cache.dtype.name}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(self.model_id, t) for t in texts]
+        cached = self.cache.get_many(keys)
+        missing = [i for i, v in enumerate(cached) if v is None]
+        vectors: List[Optional[List[float]]] = [None if v is None else v.tolist() for v in cached]
+        if missing:
+            # Duplicate texts within the batch are embedded once
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            unique = list(first)
+            embedded = self.embeddings.embed_documents([texts[first[k]] for k in unique])
+            by_key = dict(zip(unique, embedded))
+            for i in missing:
+                vectors[i] = list(by_key[keys[i]])
+            self.cache.put_many(unique, embedded)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,74 @@
+import os
+import re
+import threading
+from src.utils import setup_logger
+
+logger = setup_logger('embedding_tokens')
+
+# Local embedding model (BAAI/bge-small-zh-v1.5), shared by the vector store and the chunker
+EMBEDDING_MODEL_PATH = r"e:\rag_project\models\bge-small-zh-v1.5"
+# "torch" (sentence-transformers) or "onnx" (src.onnx_embeddings, run its export and check first)
+EMBEDDING_BACKEND = "torch"
+# Graph used by the onnx backend: "model_quantized.onnx" (int8) or "model.onnx" (fp32)
+ONNX_EMBEDDING_FILE = "model_quantized.onnx"
+# Processes embedding chunks during ingestion, each with its own model copy (src.batch_embedder)
+EMBEDDING_WORKERS = 1
+# Model window including [CLS] and [SEP]; longer inputs are truncated at embed time
+MODEL_MAX_TOKENS = 512
+SPECIAL_TOKENS = 2
+
+# Fallback estimate, BERT-Chinese style: one token per CJK character or punctuation
+# mark, roughly one per three characters of latin words and numbers
+_TOKEN_ESTIMATE_RE = re.compile(r'[A-Za-z]+|\d+|\S')
+
+def estimate_tokens(text: str) -> int:
+    n = 0
+    for piece in _TOKEN_ESTIMATE_RE.findall(text):
+        n += 1 if len(piece) == 1 else (len(piece) + 2) // 3
+    return n
+
+class EmbeddingTokenCounter:
+    """
+    Counts text length in the embedding model's tokens, without special tokens.
+    Uses the model's tokenizer.json through `tokenizers`, loaded on first use;
+    if that is not available, falls back to estimate_tokens
+    """
+    def __init__(self, model_path: str = EMBEDDING_MODEL_PATH):
+        self.model_path = model_path
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            tokenizer_file = os.path.join(self.model_path, "tokenizer.json")
+            try:
+                from tokenizers import Tokenizer
+                tokenizer = Tokenizer.from_file(tokenizer_file)
+                tokenizer.no_truncation()
+                tokenizer.no_padding()
+                self._tokenizer = tokenizer
+            except Exception as e:
+                logger.warning(f"Embedding tokenizer not available ({tokenizer_file}: {e}), estimating token counts")
+            self._loaded = True
+
+    @property
+    def name(self) -> str:
+        """
+        Identifies what counts are based on, part of the chunk cache settings
+        """
+        if not self._loaded:
+            self._load()
+        if self._tokenizer is None:
+            return "estimate"
+        model_name = re.split(r'[\\/]', self.model_path.rstrip('\\/'))[-1]
+        return f"tokenizer:{model_name}"
+
+    def count(self, text: str) -> int:
+        if not self._loaded:
+            self._load()
+        if self._tokenizer is None:
+            return estimate_tokens(text)
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
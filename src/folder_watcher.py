@@ -0,0 +1,163 @@
+"""
+Optional event-driven sync of the data folder.
+
+A background thread receives filesystem events (watchfiles), waits until a
+file has been quiet for a few seconds (copies and saves emit bursts of events)
+and then syncs just that file: new or changed files are ingested, deleted ones
+purged, through the same manifest-based VectorStoreHandler.sync_file / purge_file
+as the full folder sync.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from src.ingest_manifest import manifest_key
+from src.utils import setup_logger
+
+logger = setup_logger('folder_watcher')
+
+class FolderWatcher:
+    def __init__(self, folder_path: str = "data", handler=None, doc_type: str = 'core',
+                 quiet_ms: int = 1000, settle_s: float = 2.0):
+        """
+        Args:
+            folder_path: Folder watched recursively
+            handler: VectorStoreHandler, defaults to the src.vector_store singleton (imported lazily)
+            doc_type: doc_type of ingested files, same default as folder sync
+            quiet_ms: A burst of events is handed over once no event came for this long
+            settle_s: A file is synced only once its last event and mtime are this old
+        """
+        self.folder_path = folder_path
+        self.doc_type = doc_type
+        self.quiet_ms = quiet_ms
+        self.settle_s = settle_s
+        self._handler = handler
+        # path -> time of its last event, waiting to settle
+        self._pending: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counts = {"added": 0, "updated": 0, "removed": 0, "failed": 0}
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            from src.vector_store import vector_store
+            self._handler = vector_store
+        return self._handler
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start watching in a daemon thread (idempotent). Returns False if watchfiles
+        is not installed
+        """
+        with self._lock:
+            if self.running:
+                return True
+            try:
+                import watchfiles  # noqa: F401
+            except ImportError:
+                logger.warning("watchfiles is not installed, data folder watcher disabled")
+                return False
+            os.makedirs(self.folder_path, exist_ok=True)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+            self._thread.start()
+        logger.info(f"Watching {self.folder_path} for changes")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counts, running=self.running, pending=len(self._pending))
+
+    def _wanted(self, path: str) -> bool:
+        name = os.path.basename(path)
+        # Office lock files (~$book.docx) and hidden editor temp files
+        if name.startswith(('~$', '.')):
+            return False
+        return os.path.splitext(name)[1].lower() in self.handler.valid_exts
+
+    def _run(self) -> None:
+        from watchfiles import Change, watch
+        try:
+            for changes in watch(
+                self.folder_path,
+                watch_filter=lambda change, path: change == Change.deleted or self._wanted(path),
+                step=self.quiet_ms,
+                # Wake up regularly so that settled files are synced without further events
+                rust_timeout=int(self.settle_s * 1000),
+                yield_on_timeout=True,
+                stop_event=self._stop
+            ):
+                now = time.time()
+                with self._lock:
+                    for _, path in changes:
+                        self._pending[path] = now
+                self.flush(now)
+        except Exception as e:
+            logger.error(f"Data folder watcher stopped: {e}")
+
+    def flush(self, now: Optional[float] = None) -> List[str]:
+        """
+        Sync the pending paths that settled. Returns the manifest keys synced
+        """
+        now = now or time.time()
+        ready = []
+        with self._lock:
+            for path, last_event in list(self._pending.items()):
+                if now - last_event < self.settle_s:
+                    continue
+                try:
+                    # Still being written (events may lag behind a long copy)
+                    if os.path.isfile(path) and now - os.path.getmtime(path) < self.settle_s:
+                        continue
+                except OSError:
+                    pass
+                del self._pending[path]
+                ready.append(path)
+        synced = []
+        for path in ready:
+            try:
+                synced.extend(self._sync_path(path))
+            except Exception as e:
+                logger.error(f"Error syncing {path}: {e}")
+        return synced
+
+    def _sync_path(self, path: str) -> List[str]:
+        handler = self.handler
+        key = manifest_key(path)
+        with handler.sync_lock:
+            if os.path.isfile(path):
+                if not self._wanted(path):
+                    return []
+                status = handler.sync_file(path, self.doc_type)
+                if status == 'unchanged':
+                    return []
+                self._count(status)
+                logger.info(f"Watcher: {key} {status}")
+                return [key]
+            if os.path.exists(path):
+                return []
+            # A deleted file, or a deleted folder with files in it
+            keys = ([key] if handler.manifest.get(key) is not None else []) + handler.manifest.keys_under(key)
+            for removed in keys:
+                handler.purge_file(removed)
+                self._count("removed")
+                logger.info(f"Watcher: {removed} removed")
+            return keys
+
+    def _count(self, status: str) -> None:
+        with self._lock:
+            self.counts[status] += 1
+
+# Singleton
+data_watcher = FolderWatcher("data")
@@ -0,0 +1,348 @@
+"""
+Persistent background queue for document ingestion.
+
+Uploads are staged to disk (hard-linked when possible, copied across volumes) and processed
+by a small pool of worker threads, so the UI only enqueues and polls. Files
+uploaded together form a batch with a per-file report and throughput. Job state lives in one JSON file next to the
+vector store. While a job runs, its checkpoint is the last page whose chunks are
+all upserted; a job interrupted by a crash or restart resumes after that page
+(the chunks of later pages are rolled back first, PDF pages before it are not
+parsed/OCRed again). Re-uploading a file only embeds its new or edited chunks.
+Cancelling a job removes the chunks it already embedded.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+import fitz  # PyMuPDF
+from src.document_processing import doc_processor
+from src.utils import setup_logger
+
+logger = setup_logger('ingest_jobs')
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+class IngestCancelled(Exception):
+    pass
+
+def count_pages(file_path: str) -> int:
+    """
+    Progress denominator: PDF page count, 1 for docx/txt (no page structure)
+    """
+    if os.path.splitext(file_path)[1].lower() != '.pdf':
+        return 1
+    try:
+        with fitz.open(file_path) as doc:
+            return len(doc)
+    except Exception:
+        return 1
+
+class IngestJobQueue:
+    def __init__(self, path: str = "./chroma_db/ingest_jobs.json", staging_dir: str = "./temp_uploads",
+                 handler=None, workers: int = 2):
+        """
+        Args:
+            path: JSON file holding all jobs
+            staging_dir: Uploaded files are kept here until their job finishes
+            handler: VectorStoreHandler, defaults to the src.vector_store singleton (imported lazily)
+            workers: Jobs processed concurrently (scanned PDFs of concurrent jobs share
+                the OCR pool of doc_processor, see DocumentProcessor.ocr_workers)
+        """
+        self.path = path
+        self.staging_dir = staging_dir
+        self.workers = workers
+        self._handler = handler
+        self._lock = threading.RLock()
+        self.jobs: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.jobs = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load ingestion jobs {path}: {e}")
+        self._wakeup = threading.Event()
+        self._cancel_requested = set()
+        self._workers: List[threading.Thread] = []
+        # Set by start(): the app calls it once the startup index backfill is done
+        self._started = False
+        self._copy_logged = False
+        # Jobs that were running when the process stopped resume from their checkpoint
+        for job in self.jobs.values():
+            if job["status"] == JOB_RUNNING:
+                job["status"] = JOB_QUEUED
+                job["resumes"] = job.get("resumes", 0) + 1
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            from src.vector_store import vector_store
+            self._handler = vector_store
+        return self._handler
+
+    def _save(self) -> None:
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.jobs, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Failed to save ingestion jobs {self.path}: {e}")
+
+    def _stage(self, file_path: str, staged_path: str) -> None:
+        """
+        The upload's temp file may be cleaned up before the job runs: keep a second
+        link to it, or a copy if the staging folder is on another filesystem
+        """
+        try:
+            os.link(file_path, staged_path)
+        except OSError as e:
+            if not self._copy_logged:
+                # Typically %TEMP% and the project are on different volumes. Pointing
+                # GRADIO_TEMP_DIR to a folder on the project's volume avoids the copies
+                logger.warning(f"Cannot hard-link uploads into {self.staging_dir} ({e}), copying them instead")
+                self._copy_logged = True
+            shutil.copy2(file_path, staged_path)
+
+    def enqueue(self, file_path: str, doc_type: str, batch_id: Optional[str] = None) -> str:
+        """
+        Stage the file and queue it for ingestion. Returns the job id
+        """
+        job_id = uuid.uuid4().hex[:12]
+        file_name = os.path.basename(file_path)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        staged_path = os.path.join(self.staging_dir, f"{job_id}_{file_name}")
+        self._stage(file_path, staged_path)
+        with self._lock:
+            self.jobs[job_id] = {
+                "id": job_id,
+                "batch": batch_id,
+                "file_name": file_name,
+                "staged_path": staged_path,
+                "doc_type": doc_type,
+                "status": JOB_QUEUED,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "total_pages": count_pages(staged_path),
+                "current_page": 0,
+                # Last page whose chunks are all upserted
+                "checkpoint_page": 0,
+                "chunks": 0,
+                "duplicates": 0,
+                "resumes": 0,
+                "message": ""
+            }
+            self._save()
+        logger.info(f"Queued ingestion job {job_id}: {file_name}")
+        if self._started:
+            self.start()
+        self._wakeup.set()
+        return job_id
+
+    def enqueue_batch(self, file_paths: List[str], doc_type: str) -> Tuple[str, List[str]]:
+        """
+        Queue several files as one batch. Returns (batch id, job ids)
+        """
+        batch_id = uuid.uuid4().hex[:8]
+        job_ids = [self.enqueue(file_path, doc_type, batch_id=batch_id) for file_path in file_paths]
+        return batch_id, job_ids
+
+    def batch_report(self, batch_id: str) -> Optional[Dict]:
+        """
+        Per-file results of a batch and its throughput so far, None for an unknown batch
+        """
+        with self._lock:
+            jobs = sorted((dict(j) for j in self.jobs.values() if j.get("batch") == batch_id),
+                          key=lambda j: j["created_at"])
+        if not jobs:
+            return None
+        started = [j["started_at"] for j in jobs if j["started_at"]]
+        finished = [j for j in jobs if j["status"] in FINISHED_STATES]
+        done = len(finished) == len(jobs)
+        end = max(j["finished_at"] for j in finished) if done else time.time()
+        elapsed = end - min(started) if started else 0.0
+        pages = sum(j["current_page"] for j in jobs)
+        chunks = sum(j["chunks"] for j in finished)
+        return {
+            "batch": batch_id,
+            "files": [{
+                "file_name": j["file_name"],
+                "status": j["status"],
+                "pages": f"{j['current_page']}/{j['total_pages']}",
+                "chunks": j["chunks"],
+                "seconds": round((j["finished_at"] or time.time()) - j["started_at"], 1) if j["started_at"] else 0.0,
+                "message": j["message"]
+            } for j in jobs],
+            "total": len(jobs),
+            "finished": len(finished),
+            "completed": sum(j["status"] == JOB_COMPLETED for j in jobs),
+            "elapsed_s": round(elapsed, 1),
+            "files_per_min": round(len(finished) / elapsed * 60, 1) if elapsed else 0.0,
+            "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_s": round(chunks / elapsed, 2) if elapsed else 0.0
+        }
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job, or ask a running one to stop and roll back.
+        Returns False if the job does not exist or already finished
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return False
+            if job["status"] == JOB_QUEUED:
+                self._finish(job, JOB_CANCELLED, "已取消")
+            else:
+                self._cancel_requested.add(job_id)
+                job["message"] = "正在取消..."
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        """
+        Most recent jobs first
+        """
+        with self._lock:
+            jobs = sorted(self.jobs.values(), key=lambda j: j["created_at"], reverse=True)
+            return [dict(j) for j in jobs[:limit]]
+
+    def start(self) -> None:
+        """
+        Start the worker threads (idempotent). Queued and interrupted jobs are picked up;
+        jobs submitted before wait for it
+        """
+        with self._lock:
+            self._started = True
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self.workers:
+                worker = threading.Thread(target=self._run, name=f"ingest-jobs-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        self._wakeup.set()
+
+    def _next_job(self) -> Optional[Dict]:
+        """
+        Claim the oldest queued job. A file name that is being ingested waits: its
+        chunks are diffed against the index (see VectorStoreHandler.ingest_documents)
+        """
+        with self._lock:
+            busy = {j["file_name"] for j in self.jobs.values() if j["status"] == JOB_RUNNING}
+            queued = [j for j in self.jobs.values() if j["status"] == JOB_QUEUED and j["file_name"] not in busy]
+            if not queued:
+                return None
+            job = min(queued, key=lambda j: j["created_at"])
+            job["status"] = JOB_RUNNING
+            return job
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                # Several workers share the event: the timeout covers a wakeup consumed by another one
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            try:
+                self._process(job)
+            except Exception as e:
+                logger.error(f"Ingestion job {job['id']} crashed: {e}")
+                with self._lock:
+                    self._finish(job, JOB_FAILED, str(e))
+
+    def _finish(self, job: Dict, status: str, message: str) -> None:
+        job["status"] = status
+        job["message"] = message
+        job["finished_at"] = time.time()
+        self._cancel_requested.discard(job["id"])
+        try:
+            if os.path.exists(job["staged_path"]):
+                os.remove(job["staged_path"])
+        except OSError as e:
+            logger.warning(f"Failed to remove staged file {job['staged_path']}: {e}")
+        self._save()
+
+    def _process(self, job: Dict) -> None:
+        handler = self.handler
+        job_id = job["id"]
+        file_name = job["file_name"]
+        with self._lock:
+            job["status"] = JOB_RUNNING
+            job["started_at"] = job["started_at"] or time.time()
+            job["message"] = ""
+            self._save()
+        if not os.path.exists(job["staged_path"]):
+            with self._lock:
+                self._finish(job, JOB_FAILED, "暂存文件丢失")
+            return
+
+        checkpoint = job["checkpoint_page"]
+        if job["resumes"]:
+            # Chunks of pages after the checkpoint may be partially indexed
+            logger.info(f"Resuming ingestion job {job_id} ({file_name}) after page {checkpoint}")
+            handler.delete_job_chunks(job_id, file_name, after_page=checkpoint)
+
+        def documents():
+            for doc in doc_processor.iter_documents(job["staged_path"], start_page=checkpoint + 1):
+                if job_id in self._cancel_requested:
+                    raise IngestCancelled()
+                # Parsed from the staged copy: report the uploaded file name
+                doc.metadata["source"] = file_name
+                doc.metadata["ingest_job"] = job_id
+                job["current_page"] = doc.metadata["page"]
+                yield doc
+
+        def on_flush(last_doc) -> None:
+            # Pages before the last upserted chunk's page are complete
+            page = last_doc.metadata["page"] - 1
+            if page > job["checkpoint_page"]:
+                with self._lock:
+                    job["checkpoint_page"] = page
+                    self._save()
+
+        logger.info(f"Running ingestion job {job_id}: {file_name} from page {checkpoint + 1}/{job['total_pages']}")
+        try:
+            _, num_duplicates = handler.ingest_documents(
+                documents(), job["staged_path"], job["doc_type"], source_path=file_name, on_flush=on_flush,
+                ingest_pass=job_id, from_page=checkpoint + 1
+            )
+        except IngestCancelled:
+            handler.delete_job_chunks(job_id, file_name)
+            with self._lock:
+                self._finish(job, JOB_CANCELLED, "已取消，已入库的片段已回滚")
+            logger.info(f"Ingestion job {job_id} cancelled")
+            return
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {e}")
+            handler.delete_job_chunks(job_id, file_name)
+            with self._lock:
+                self._finish(job, JOB_FAILED, str(e))
+            return
+
+        num_chunks = handler.count_job_chunks(job_id)
+        with self._lock:
+            job["chunks"] = num_chunks
+            job["duplicates"] += num_duplicates
+            job["checkpoint_page"] = job["current_page"] = job["total_pages"]
+            if num_chunks or job["duplicates"]:
+                self._finish(job, JOB_COMPLETED, f"索引片段 {num_chunks}，跳过近重复片段 {job['duplicates']}")
+            else:
+                self._finish(job, JOB_FAILED, "未能从文档中提取文本")
+        logger.info(f"Ingestion job {job_id} completed: {num_chunks} chunks")
+
+# Singleton
+ingest_queue = IngestJobQueue()
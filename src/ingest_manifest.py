@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from src.parse_cache import file_digest
+from src.utils import setup_logger
+
+logger = setup_logger('ingest_manifest')
+
+def manifest_key(file_path: str) -> str:
+    """
+    Manifest key of a file: its path relative to the working directory, with
+    forward slashes, e.g. "data/supplement/concepts.txt". Unlike the bare file
+    name it is unique across subfolders
+    """
+    return os.path.normpath(os.path.relpath(file_path)).replace(os.sep, '/')
+
+class IngestManifest:
+    """
+    Persistent record of ingested files: path -> size, mtime, content hash,
+    doc_type, chunk count, ingest time. Stored as one JSON file next to the
+    vector store so that folder sync can diff against it without reading the
+    collection.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self.entries: Dict[str, Dict] = {}
+        self.exists = os.path.exists(path)
+        if self.exists:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load ingest manifest {path}: {e}")
+                self.entries = {}
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+            self.exists = True
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def keys_under(self, folder_key: str) -> List[str]:
+        prefix = folder_key.rstrip('/') + '/'
+        with self._lock:
+            return [k for k in self.entries if k.startswith(prefix)]
+
+    def record(self, key: str, file_path: str, doc_type: str, num_chunks: int,
+               sha256: Optional[str] = None, legacy: bool = False) -> None:
+        st = os.stat(file_path)
+        entry = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": sha256 or file_digest(file_path),
+            "doc_type": doc_type,
+            "chunks": num_chunks,
+            "ingested_at": time.time()
+        }
+        if legacy:
+            # Indexed before the manifest existed: chunks carry only the file name
+            entry["legacy"] = True
+        with self._lock:
+            self.entries[key] = entry
+            self.save()
+
+    def touch(self, key: str, file_path: str) -> None:
+        """
+        Content unchanged but mtime moved (copy, touch): refresh size/mtime only
+        """
+        st = os.stat(file_path)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry["size"] = st.st_size
+            entry["mtime"] = st.st_mtime
+            self.save()
+
+    def invalidate(self, key: str) -> None:
+        """
+        Force the next sync to re-index the file even if it did not change on disk
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry["size"] = -1
+            entry["sha256"] = ""
+            self.save()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self.save()
+
+    def is_unchanged(self, key: str, file_path: str) -> Optional[bool]:
+        """
+        None if the file is not in the manifest, otherwise whether its content is
+        unchanged. The content hash is only computed when size or mtime differ
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        st = os.stat(file_path)
+        if st.st_size == entry["size"] and st.st_mtime == entry["mtime"]:
+            return True
+        if st.st_size != entry["size"]:
+            return False
+        if file_digest(file_path) == entry["sha256"]:
+            self.touch(key, file_path)
+            return True
+        return False
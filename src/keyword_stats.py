@@ -0,0 +1,95 @@
+"""
+Incrementally maintained keyword frequencies of the indexed chunks.
+
+Each chunk is tokenized once when it is added (src.utils.count_keywords); its
+term counts are stored under its chunk ID and added to corpus-wide totals, and
+subtracted again when the chunk is deleted. The insight panel's ranking is a
+top-N query over the totals instead of re-tokenizing the whole collection.
+"""
+import json
+from collections import Counter
+from typing import Dict, List, Tuple
+from src.utils import ACOUSTIC_TERMS, SQLiteStore, count_keywords, rank_keywords, setup_logger
+
+logger = setup_logger('keyword_stats')
+
+class KeywordStats(SQLiteStore):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunk_terms (chunk_id TEXT PRIMARY KEY, terms TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS term_totals (term TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS term_totals_count ON term_totals (count)")
+        self._conn.commit()
+
+    def add_chunks(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Count the terms of new chunks. Chunks already counted under the same ID are skipped
+        """
+        counted = [(cid, count_keywords(text)) for cid, text in zip(ids, texts)]
+        with self._lock, self._conn:
+            totals = Counter()
+            for cid, counts in counted:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO chunk_terms VALUES (?, ?)", (cid, json.dumps(counts, ensure_ascii=False))
+                )
+                if cursor.rowcount:
+                    totals.update(counts)
+            self._conn.executemany(
+                "INSERT INTO term_totals VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET count = count + excluded.count",
+                list(totals.items())
+            )
+
+    def remove_chunks(self, ids: List[str]) -> None:
+        totals = Counter()
+        with self._lock, self._conn:
+            for part, placeholders in self.in_chunks(ids):
+                for (terms,) in self._conn.execute(
+                    f"SELECT terms FROM chunk_terms WHERE chunk_id IN ({placeholders})", part
+                ):
+                    totals.update(json.loads(terms))
+                self._conn.execute(f"DELETE FROM chunk_terms WHERE chunk_id IN ({placeholders})", part)
+            self._conn.executemany("UPDATE term_totals SET count = count - ? WHERE term = ?",
+                                   [(n, term) for term, n in totals.items()])
+            self._conn.execute("DELETE FROM term_totals WHERE count <= 0")
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT term, count FROM term_totals ORDER BY count DESC, term LIMIT ?", (n,)
+            ).fetchall()
+
+    def counts(self, terms: List[str]) -> Dict[str, int]:
+        rows = []
+        with self._lock:
+            for part, placeholders in self.in_chunks(terms):
+                rows += self._conn.execute(
+                    f"SELECT term, count FROM term_totals WHERE term IN ({placeholders})", part
+                ).fetchall()
+        return dict(rows)
+
+    def top_keywords(self, top_n: int = 10) -> List[Tuple[str, int]]:
+        """
+        Same ranking as src.utils.extract_top_keywords over all counted chunks
+        (words with equal counts may come in a different order)
+        """
+        most_common = self.most_common(top_n * 2)
+        if not most_common:
+            return [("暂无数据", 0)]
+        return rank_keywords(self.counts(ACOUSTIC_TERMS), most_common, top_n)
+
+    def rebuild(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Recount from scratch (index built before keyword stats existed)
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunk_terms")
+            self._conn.execute("DELETE FROM term_totals")
+        self.add_chunks(ids, texts)
+        self.mark_built()
+        logger.info(f"Keyword statistics rebuilt from {len(ids)} chunks")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunk_terms").fetchone()[0]
+            vocabulary = self._conn.execute("SELECT COUNT(*) FROM term_totals").fetchone()[0]
+        return {"chunks": chunks, "vocabulary": vocabulary}
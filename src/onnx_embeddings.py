@@ -0,0 +1,270 @@
+"""
+ONNX Runtime embedding backend for bge-small-zh.
+
+Runs an exported (optionally int8-quantized) ONNX graph of the embedding model
+with the model's own tokenizer.json, pooled and normalized like the
+sentence-transformers model. Includes the export/quantize step, a parity check
+against the PyTorch backend (cosine agreement, top-k overlap) and a latency /
+throughput comparison.
+
+Usage:
+    # Export model.onnx and model_quantized.onnx into the model folder (needs torch + transformers + onnx)
+    python -m src.onnx_embeddings export
+    # Parity and speed of both ONNX graphs against the PyTorch backend, queried
+    # with the golden questions (scripts/golden_questions.jsonl)
+    python -m src.onnx_embeddings check data/some_book.pdf
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.embedding_tokens import EMBEDDING_MODEL_PATH, MODEL_MAX_TOKENS
+from src.utils import setup_logger
+
+logger = setup_logger('onnx_embeddings')
+
+ONNX_FILE = "model.onnx"
+QUANTIZED_ONNX_FILE = "model_quantized.onnx"
+# An ONNX graph passes the parity check when documents embed at least this close to
+# the PyTorch vectors on average, and retrieval returns mostly the same top-k
+PARITY_MIN_COSINE = 0.99
+PARITY_MIN_TOPK_OVERLAP = 0.9
+# Held-out queries for the top-k check: questions, not the indexed chunks themselves
+GOLDEN_QUESTIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "scripts", "golden_questions.jsonl")
+
+def _pooling_mode(model_path: str) -> str:
+    """
+    "cls" or "mean", from the sentence-transformers pooling config (bge uses CLS)
+    """
+    try:
+        with open(os.path.join(model_path, "1_Pooling", "config.json"), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if config.get("pooling_mode_mean_tokens") and not config.get("pooling_mode_cls_token"):
+            return "mean"
+    except (OSError, ValueError):
+        pass
+    return "cls"
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_path: str = EMBEDDING_MODEL_PATH, onnx_file: str = QUANTIZED_ONNX_FILE,
+                 batch_size: int = 32, threads: Optional[int] = None, normalize: bool = True):
+        """
+        Args:
+            model_path: Model folder with tokenizer.json and the exported graph
+            onnx_file: Graph file name inside model_path (see export_onnx)
+            batch_size: Texts per session run
+            threads: Intra-op threads, None = onnxruntime default (all cores)
+            normalize: L2-normalize, same as encode_kwargs normalize_embeddings
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        self.model_path = model_path
+        self.onnx_file = onnx_file
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.pooling = _pooling_mode(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_path, onnx_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MODEL_MAX_TOKENS)
+        pad_id = self.tokenizer.token_to_id("[PAD]")
+        self.tokenizer.enable_padding(pad_id=pad_id or 0, pad_token="[PAD]")
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        (len(texts), dim) float32 embeddings
+        """
+        parts = []
+        for i in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[i:i + self.batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+            if self.pooling == "mean":
+                mask = attention_mask[:, :, None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            else:
+                pooled = hidden[:, 0]
+            parts.append(pooled.astype(np.float32))
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.concatenate(parts)
+        if self.normalize:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+def export_onnx(model_path: str = EMBEDDING_MODEL_PATH, quantize: bool = True) -> List[str]:
+    """
+    Export the PyTorch model to model_path/model.onnx and, with quantize, a dynamic
+    int8 copy model_quantized.onnx. Needs torch, transformers and onnx, which the
+    ONNX backend itself does not. Returns the written files
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModel.from_pretrained(model_path).eval()
+    sample = tokenizer(["声纳方程描述了声源级与传播损失之间的关系"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    onnx_path = os.path.join(model_path, ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[name] for name in names), onnx_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=14
+        )
+    written = [onnx_path]
+    logger.info(f"Exported {onnx_path}")
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_path = os.path.join(model_path, QUANTIZED_ONNX_FILE)
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        written.append(quantized_path)
+        logger.info(f"Quantized to {quantized_path}")
+    return written
+
+def _as_array(embeddings: Embeddings, texts: List[str]) -> np.ndarray:
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+def parity_check(reference: Embeddings, candidate: Embeddings, texts: List[str],
+                 queries: List[str], k: int = 5) -> Dict:
+    """
+    Compare a candidate backend with the reference one on the same texts:
+    cosine similarity of each text's two vectors, and the overlap of the top-k
+    texts retrieved for each query (held-out questions, a text queried with
+    itself would trivially rank first)
+    """
+    ref_docs = _as_array(reference, texts)
+    cand_docs = _as_array(candidate, texts)
+    cosines = (ref_docs * cand_docs).sum(axis=1) / (
+        np.linalg.norm(ref_docs, axis=1) * np.linalg.norm(cand_docs, axis=1) + 1e-12
+    )
+    k = min(k, len(texts))
+    overlaps = []
+    for query in queries:
+        ref_top = set(np.argsort(-(ref_docs @ np.asarray(reference.embed_query(query))))[:k])
+        cand_top = set(np.argsort(-(cand_docs @ np.asarray(candidate.embed_query(query))))[:k])
+        overlaps.append(len(ref_top & cand_top) / k)
+    result = {
+        "texts": len(texts),
+        "queries": len(queries),
+        "k": k,
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "min_cosine": round(float(cosines.min()), 5),
+        "topk_overlap": round(float(np.mean(overlaps)), 4)
+    }
+    result["passed"] = result["mean_cosine"] >= PARITY_MIN_COSINE and result["topk_overlap"] >= PARITY_MIN_TOPK_OVERLAP
+    return result
+
+def benchmark(embeddings: Embeddings, texts: List[str], queries: List[str]) -> Dict:
+    """
+    Single-query latency (p50/p95, ms) and document throughput (texts/s)
+    """
+    embeddings.embed_query(queries[0])  # warm-up
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    embeddings.embed_documents(texts)
+    seconds = time.perf_counter() - start
+    return {
+        "query_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+        "query_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "docs_per_s": round(len(texts) / seconds, 1)
+    }
+
+def _sample_texts(files: List[str], limit: int) -> List[str]:
+    from src.document_processing import DocumentProcessor
+    processor = DocumentProcessor(ocr_workers=1, cache=None)
+    texts = []
+    for path in files:
+        texts.extend(d.page_content for d in processor.iter_documents(path))
+        if len(texts) >= limit:
+            break
+    return texts[:limit]
+
+def load_queries(path: str = GOLDEN_QUESTIONS) -> List[str]:
+    """
+    The questions of a golden question file (one JSON object per line)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime embedding backend tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="导出 ONNX 图并做 int8 动态量化")
+    export_parser.add_argument("--model-path", default=EMBEDDING_MODEL_PATH)
+    export_parser.add_argument("--no-quantize", action="store_true")
+    check_parser = sub.add_parser("check", help="与 PyTorch 后端比较一致性和速度")
+    check_parser.add_argument("files", nargs="*", help="txt/docx/pdf 文件 (默认: data 下的 txt 文件)")
+    check_parser.add_argument("--model-path", default=EMBEDDING_MODEL_PATH)
+    check_parser.add_argument("--limit", type=int, default=300, help="最多使用的片段数")
+    check_parser.add_argument("--k", type=int, default=5)
+    check_parser.add_argument("--queries", default=GOLDEN_QUESTIONS, help="查询用的问题集 (jsonl，每行含 question)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        for path in export_onnx(args.model_path, quantize=not args.no_quantize):
+            print(path)
+        return
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    files = args.files or sorted(glob.glob(os.path.join("data", "**", "*.txt"), recursive=True))
+    texts = _sample_texts(files, args.limit)
+    if len(texts) < 2:
+        print("片段太少，请指定文档。")
+        sys.exit(2)
+    queries = load_queries(args.queries)
+    torch_backend = HuggingFaceEmbeddings(
+        model_name=args.model_path, model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}, show_progress=False
+    )
+    print(f"片段 {len(texts)} 个, 查询 {len(queries)} 个")
+    print(f"{'backend':<24}{'p50 ms':>9}{'p95 ms':>9}{'docs/s':>9}{'mean cos':>10}{'min cos':>10}{'top-k':>8}  parity")
+    speed = benchmark(torch_backend, texts, queries)
+    print(f"{'torch':<24}{speed['query_ms_p50']:>9}{speed['query_ms_p95']:>9}{speed['docs_per_s']:>9}")
+    failed = False
+    for onnx_file in (ONNX_FILE, QUANTIZED_ONNX_FILE):
+        if not os.path.exists(os.path.join(args.model_path, onnx_file)):
+            print(f"{onnx_file:<24}不存在 (先运行 python -m src.onnx_embeddings export)")
+            continue
+        backend = OnnxEmbeddings(args.model_path, onnx_file=onnx_file)
+        speed = benchmark(backend, texts, queries)
+        parity = parity_check(torch_backend, backend, texts, queries, k=args.k)
+        failed = failed or not parity["passed"]
+        print(f"{onnx_file:<24}{speed['query_ms_p50']:>9}{speed['query_ms_p95']:>9}{speed['docs_per_s']:>9}"
+              f"{parity['mean_cosine']:>10}{parity['min_cosine']:>10}{parity['topk_overlap']:>8}  "
+              f"{'PASS' if parity['passed'] else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
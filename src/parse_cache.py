@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from src.utils import setup_logger
+
+logger = setup_logger('parse_cache')
+
+# Cached artifact kinds: raw OCR text per page, and final (page, chunk) lists
+KIND_OCR = "ocr"
+KIND_CHUNKS = "chunks"
+
+def file_digest(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of the file content, read in blocks
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+def make_key(digest: str, settings: Dict) -> str:
+    """
+    Cache key = content hash + the processor settings that affect the artifact
+    """
+    payload = json.dumps({"digest": digest, "settings": settings}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ParseCache:
+    """
+    Persistent, content-addressed cache for parse/OCR artifacts.
+    One JSON file per entry under <cache_dir>/<kind>/<key[:2]>/<key>.json.
+    Entries are evicted oldest-used first once the total size exceeds max_size_mb.
+    """
+    def __init__(self, cache_dir: str = "./cache/parse", max_size_mb: int = 2048):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.hits = {KIND_OCR: 0, KIND_CHUNKS: 0}
+        self.misses = {KIND_OCR: 0, KIND_CHUNKS: 0}
+        self._lock = threading.Lock()
+        # Total size is computed on first write, then maintained incrementally
+        self._total_size = None
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.cache_dir, kind, key[:2], f"{key}.json")
+
+    def _get(self, kind: str, key: str):
+        path = self._path(kind, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # Mark as recently used for eviction
+            os.utime(path, None)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses[kind] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Corrupt cache entry {path}: {e}")
+            with self._lock:
+                self.misses[kind] += 1
+            return None
+        with self._lock:
+            self.hits[kind] += 1
+        return value
+
+    def _put(self, kind: str, key: str, value) -> None:
+        path = self._path(kind, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            with self._lock:
+                if self._total_size is None:
+                    self._total_size = self._scan_size()
+                else:
+                    self._total_size += os.path.getsize(path) - old_size
+                if self._total_size > self.max_size_bytes:
+                    self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """
+        Drop least recently used entries until the cache is back under 90% of its limit
+        """
+        target = int(self.max_size_bytes * 0.9)
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        self._total_size = total
+        logger.info(f"Parse cache eviction: removed {removed} entries, {total / 1024 / 1024:.1f} MB left")
+
+    def get_ocr_pages(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Returns {"<0-based page>": raw_ocr_text} for the pages OCRed so far, or None on miss
+        """
+        return self._get(KIND_OCR, key)
+
+    def put_ocr_pages(self, key: str, page_texts: Dict[str, str]) -> None:
+        self._put(KIND_OCR, key, page_texts)
+
+    def get_chunks(self, key: str) -> Optional[List[Tuple[int, str]]]:
+        """
+        Returns [(page, chunk_text), ...] or None on miss
+        """
+        value = self._get(KIND_CHUNKS, key)
+        if value is None:
+            return None
+        return [(page, text) for page, text in value]
+
+    def put_chunks(self, key: str, chunks: List[Tuple[int, str]]) -> None:
+        self._put(KIND_CHUNKS, key, [[page, text] for page, text in chunks])
+
+    def counts(self) -> Tuple[Dict, Dict]:
+        """
+        Copies of the (hits, misses) counters per kind
+        """
+        with self._lock:
+            return dict(self.hits), dict(self.misses)
+
+    def add_counts(self, hits: Dict, misses: Dict) -> None:
+        """
+        Add lookups made in another process (bulk ingest parse workers)
+        """
+        with self._lock:
+            for kind, n in hits.items():
+                self.hits[kind] = self.hits.get(kind, 0) + n
+            for kind, n in misses.items():
+                self.misses[kind] = self.misses.get(kind, 0) + n
+
+    def stats(self) -> Dict:
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = self._scan_size()
+            return {
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "size_mb": round(self._total_size / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_size_bytes / 1024 / 1024, 2)
+            }
+
+# Singleton
+parse_cache = ParseCache()
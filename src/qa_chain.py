@@ -18,6 +18,10 @@ class QAChainHandler:
         self.reranker = None
         self.rerank_score_threshold = 0.0
         self.max_rerank_docs = 3 # Reduce to 3 for faster inference
+        # Candidates retrieved (hybrid BM25 + dense, see vector_store.search) and passed to the
+        # reranker. Still the dense-only value: lower it only to the k that scripts/eval_retrieval.py
+        # reports for the labelled golden questions (none are labelled yet)
+        self.initial_k = 10
         if os.path.exists(self.reranker_path):
             try:
                 logger.info(f"Loading Reranker model from {self.reranker_path}...")
@@ -278,8 +282,7 @@ class QAChainHandler:
             search_query = (prefix + " " + search_query)[-768:]
 
         # Reduce initial retrieval count to speed up reranking
-        initial_k = 10 # Reduced from default/larger value
-        candidate_docs = vector_store.search(search_query, k=initial_k)
+        candidate_docs = vector_store.search(search_query, k=self.initial_k)
         
         docs = candidate_docs
         if self.reranker and candidate_docs:
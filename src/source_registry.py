@@ -0,0 +1,113 @@
+"""
+Per-source registry of the vector store.
+
+One SQLite row per indexed source (chunk count, page count, chunks over the
+embedding model's token limit, doc_type, ingest time, content hash), written in the same step as the source's chunks are added
+or deleted. File listings and counts read this table instead of walking the
+metadata of every chunk in the collection.
+"""
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+from src.embedding_tokens import MODEL_MAX_TOKENS, SPECIAL_TOKENS
+from src.utils import SQLiteStore, setup_logger
+
+logger = setup_logger('source_registry')
+
+_COLUMNS = ("source_path", "source", "doc_type", "chunks", "pages", "sha256", "ingested_at", "legacy", "over_limit")
+
+def count_over_limit(metadatas: Iterable[Optional[Dict]]) -> int:
+    """
+    Chunks longer than the embedding model's window (truncated when embedded), from the
+    `tokens` metadata set by the parser (chunks indexed before it existed count as fitting)
+    """
+    return sum(1 for meta in metadatas if meta and meta.get("tokens", 0) > MODEL_MAX_TOKENS - SPECIAL_TOKENS)
+
+class SourceRegistry(SQLiteStore):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "source_path TEXT PRIMARY KEY, source TEXT NOT NULL, doc_type TEXT, "
+            "chunks INTEGER NOT NULL, pages INTEGER NOT NULL, sha256 TEXT, "
+            "ingested_at REAL NOT NULL, legacy INTEGER NOT NULL DEFAULT 0, over_limit INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sources)")]
+        if "over_limit" not in columns:
+            # Registry written before over-limit counts were kept
+            self._conn.execute("ALTER TABLE sources ADD COLUMN over_limit INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sources_source ON sources (source)")
+        self._conn.commit()
+
+    def record(self, source_path: str, source: str, doc_type: Optional[str], chunks: int, pages: int,
+               sha256: Optional[str] = None, legacy: bool = False, over_limit: int = 0) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source_path, source, doc_type, chunks, pages, sha256, time.time(), int(legacy), over_limit)
+            )
+
+    def remove(self, *source_paths: str) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM sources WHERE source_path = ?", [(p,) for p in source_paths])
+
+    def get(self, source_path: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sources WHERE source_path = ?", (source_path,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def names(self) -> List[str]:
+        """
+        Distinct file names (`source` metadata) of the indexed sources
+        """
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT source FROM sources ORDER BY source")]
+
+    def list_sources(self, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """
+        One page of sources, ordered by source path
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM sources ORDER BY source_path LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def totals(self) -> Dict:
+        with self._lock:
+            files, chunks, pages, over_limit = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0), COALESCE(SUM(pages), 0), COALESCE(SUM(over_limit), 0) "
+                "FROM sources"
+            ).fetchone()
+        return {"files": files, "chunks": chunks, "pages": pages, "over_limit": over_limit}
+
+    def rebuild(self, metadatas: Iterable[Optional[Dict]]) -> int:
+        """
+        Replace the registry with the sources found in chunk metadata (one pass over the
+        collection, for indexes built before the registry existed). Chunks without
+        `source_path` are grouped under their file name as legacy sources.
+        Returns the number of sources
+        """
+        groups: Dict[str, Dict] = {}
+        for meta in metadatas:
+            if not meta or not (meta.get("source_path") or meta.get("source")):
+                continue
+            key = meta.get("source_path") or meta["source"]
+            group = groups.setdefault(key, {
+                "source": meta.get("source") or os.path.basename(key), "doc_type": meta.get("doc_type"),
+                "chunks": 0, "pages": set(), "legacy": "source_path" not in meta, "over_limit": 0
+            })
+            group["chunks"] += 1
+            group["pages"].add(meta.get("page"))
+            group["over_limit"] += count_over_limit([meta])
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sources")
+            self._conn.executemany(
+                "INSERT INTO sources VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?)",
+                [(k, g["source"], g["doc_type"], g["chunks"], len(g["pages"]), now, int(g["legacy"]), g["over_limit"])
+                 for k, g in groups.items()]
+            )
+        self.mark_built()
+        logger.info(f"Source registry rebuilt from the collection: {len(groups)} sources")
+        return len(groups)
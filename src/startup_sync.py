@@ -0,0 +1,129 @@
+"""
+Initial data folder sync in the background, so that the UI comes up at once and
+answers from the existing index while new or changed files are being ingested.
+The BM25 and keyword stats backfills of an existing collection (see
+VectorStoreHandler.ensure_bm25 / ensure_keyword_stats) run first in the same
+thread; search is dense only until they are done, and on_ready (the upload job
+queue) is started only after them.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+from src.utils import setup_logger
+
+logger = setup_logger('startup_sync')
+
+SYNC_IDLE = "idle"
+SYNC_RUNNING = "running"
+SYNC_DONE = "done"
+SYNC_FAILED = "failed"
+
+class BackgroundSync:
+    def __init__(self, handler=None):
+        """
+        Args:
+            handler: VectorStoreHandler, defaults to the src.vector_store singleton (imported lazily)
+        """
+        self._handler = handler
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.state = SYNC_IDLE
+        self.total = 0
+        self.done = 0
+        self.current = ""
+        self.started_at = None
+        self.finished_at = None
+        self.result: Dict = {}
+        self.error = ""
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            from src.vector_store import vector_store
+            self._handler = vector_store
+        return self._handler
+
+    @property
+    def running(self) -> bool:
+        return self.state == SYNC_RUNNING
+
+    def start(self, folder_path: str, workers: int = 1, on_done: Optional[Callable[[], None]] = None,
+              on_ready: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Sync folder_path in a daemon thread; on_ready runs after the index backfill, before
+        the folder sync, on_done after the sync (both also after a failure).
+        Returns False if a sync is already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.state = SYNC_RUNNING
+            self.total = self.done = 0
+            self.current = ""
+            self.started_at = time.time()
+            self.finished_at = None
+            self.result = {}
+            self.error = ""
+            self._thread = threading.Thread(
+                target=self._run, args=(folder_path, workers, on_done, on_ready), name="startup-sync", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def _progress(self, done: int, total: int, key: str) -> None:
+        with self._lock:
+            self.done = done
+            self.total = total
+            self.current = key
+
+    def _run(self, folder_path: str, workers: int, on_done: Optional[Callable[[], None]],
+             on_ready: Optional[Callable[[], None]]) -> None:
+        logger.info(f"Background sync of {folder_path} started")
+        try:
+            try:
+                self.handler.ensure_bm25()
+                self.handler.ensure_keyword_stats()
+            finally:
+                if on_ready is not None:
+                    on_ready()
+            result = self.handler.sync_folder(folder_path, workers=workers, progress=self._progress)
+            with self._lock:
+                self.result = result
+                self.state = SYNC_DONE
+        except Exception as e:
+            logger.error(f"Background sync of {folder_path} failed: {e}")
+            with self._lock:
+                self.error = str(e)
+                self.state = SYNC_FAILED
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+            if on_done is not None:
+                on_done()
+        logger.info(f"Background sync of {folder_path} finished in {self.finished_at - self.started_at:.1f}s")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the running sync finished. Returns False on timeout
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def status(self) -> Dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "state": self.state,
+                "done": self.done,
+                "total": self.total,
+                "current": self.current,
+                "elapsed_s": round(end - self.started_at, 1) if self.started_at else 0.0,
+                "result": {k: len(v) for k, v in self.result.items()},
+                "error": self.error
+            }
+
+# Singleton
+initial_sync = BackgroundSync()
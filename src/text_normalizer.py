@@ -0,0 +1,132 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, List
+
+# Noise-line rules, in precedence order. A line is dropped by the first rule that matches.
+RULE_EMPTY = "empty"
+RULE_NUMBERING = "numbering"          # bare page/section numbers: "12", "iv", "3.2."
+RULE_PAGE_MARKER = "page_marker"      # "Page 12", "page12"
+RULE_URL = "url"
+RULE_EMAIL = "email"
+RULE_DECORATION = "decoration"        # "---", "•", "~*~"
+RULE_SPECIAL_CHARS = "special_chars"  # > 40% symbols (formula debris, OCR garbage)
+RULE_SHORT_NOISE = "short_noise"      # < 4 chars, no digit/"第" prefix, no Chinese
+RULES = (
+    RULE_EMPTY, RULE_NUMBERING, RULE_PAGE_MARKER, RULE_URL, RULE_EMAIL,
+    RULE_DECORATION, RULE_SPECIAL_CHARS, RULE_SHORT_NOISE
+)
+
+_NUMBERING_RE = re.compile(r'[0-9ivxlcdm\.]+')
+_PAGE_MARKER_RE = re.compile(r'page\s*\d+')
+_URL_RE = re.compile(r'https?://')
+_CHINESE_RE = re.compile(r'[\u4e00-\u9fa5]')
+_DECORATION_CHARS = frozenset('-_=·•—~*·. ')
+_SPECIAL_CHARS_RATIO = 0.4
+
+def _build_allowed_table() -> Dict[int, None]:
+    """
+    str.translate table deleting every "normal" character, so that the length of
+    what is left is the number of special characters in one C-level pass
+    """
+    allowed = set(range(0x4e00, 0x9fa5 + 1))
+    allowed.update(ord(ch) for ch in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+    allowed.update(ord(ch) for ch in '.,，。、()（）')
+    # Same whitespace set as regex \s on str patterns
+    allowed.update(c for c in range(0x3000 + 1) if chr(c).isspace())
+    return dict.fromkeys(allowed)
+
+_ALLOWED_TABLE = _build_allowed_table()
+
+class TextNormalizer:
+    """
+    Rule-driven line filter behind DocumentProcessor.clean_text.
+    Patterns are compiled once; each line is classified in a single pass over the
+    rules, ordered cheapest first within their precedence. Per-rule hit counters
+    show what gets dropped.
+    """
+    def __init__(self):
+        self.hits = Counter()
+        self.lines_seen = 0
+        self.lines_kept = 0
+        self._lock = threading.Lock()
+        # Hits of the file being parsed in this thread, see begin_file
+        self._file = threading.local()
+
+    def classify(self, raw: str) -> str:
+        """
+        Returns the name of the rule dropping the (stripped) line, or "" to keep it
+        """
+        if not raw:
+            return RULE_EMPTY
+        n = len(raw)
+        lower = raw.lower()
+        if _NUMBERING_RE.fullmatch(lower):
+            return RULE_NUMBERING
+        if 'page' in lower and _PAGE_MARKER_RE.search(lower):
+            return RULE_PAGE_MARKER
+        if '://' in lower and _URL_RE.search(lower):
+            return RULE_URL
+        if '@' in lower and ' ' not in lower:
+            return RULE_EMAIL
+        if n <= 3 and all(ch in _DECORATION_CHARS for ch in raw):
+            return RULE_DECORATION
+        if n > 5 and len(raw.translate(_ALLOWED_TABLE)) / n > _SPECIAL_CHARS_RATIO:
+            return RULE_SPECIAL_CHARS
+        # Remove isolated single characters or very short meaningless lines
+        # But keep short headings like "1. 引言"
+        if n < 4 and not raw[0].isdecimal() and raw[0] != '第' and not _CHINESE_RE.search(raw):
+            return RULE_SHORT_NOISE
+        return ""
+
+    def normalize(self, text: str) -> str:
+        """
+        Drop noise lines, join the rest with single spaces
+        """
+        kept: List[str] = []
+        hits = Counter()
+        lines = text.splitlines()
+        for line in lines:
+            raw = line.strip()
+            rule = self.classify(raw)
+            if rule:
+                hits[rule] += 1
+            else:
+                kept.append(raw)
+        file_hits = getattr(self._file, "hits", None)
+        if file_hits is not None:
+            file_hits.update(hits)
+        with self._lock:
+            self.hits.update(hits)
+            self.lines_seen += len(lines)
+            self.lines_kept += len(kept)
+        # Same as re.sub(r'\s+', ' ', ...).strip(): lines are joined, then inner runs collapsed
+        return ' '.join(' '.join(kept).split())
+
+    def begin_file(self) -> None:
+        """
+        Start counting the hits of one file in the calling thread, see end_file
+        """
+        self._file.hits = Counter()
+
+    def end_file(self) -> Counter:
+        """
+        Hits since begin_file in the calling thread
+        """
+        hits = getattr(self._file, "hits", None) or Counter()
+        self._file.hits = None
+        return hits
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "lines_seen": self.lines_seen,
+                "lines_kept": self.lines_kept,
+                "dropped": {rule: self.hits[rule] for rule in RULES if self.hits[rule]}
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits.clear()
+            self.lines_seen = 0
+            self.lines_kept = 0
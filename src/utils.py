@@ -1,7 +1,9 @@
 import logging
 import os
+import sqlite3
 import sys
-from typing import List, Counter, Tuple
+import threading
+from typing import Dict, Iterator, List, Counter, Sequence, Tuple
 import jieba
 import re
 import matplotlib.pyplot as plt
@@ -31,61 +33,106 @@ def setup_logger(name: str, log_file: str = 'app.log', level=logging.INFO) -> lo
             
     return logger
 
-def extract_top_keywords(text_list: List[str], top_n: int = 10) -> List[Tuple[str, int]]:
+class SQLiteStore:
     """
-    提取文本列表中的高频专业热词及其频次
-    :param text_list: 文档内容列表
-    :param top_n: 返回前N个热词
+    单文件 SQLite 存储的公共部分 (嵌入缓存、来源登记表、热词统计、BM25 索引、近重复指纹)：
+    - 一个连接由各线程共享，读写都在 self._lock 内；分词等耗时计算放在加锁之前做
+    - in_chunks 把 ID 列表切成小段做 IN (...) 查询，不超过 SQLite 的参数个数上限
+    - built 标记：从已有向量库回填 (rebuild) 完成后才写入，回填中途退出时下次启动会重新回填。
+      与向量库放在一起的文件由 reset_db 一并删除
+    """
+    # SQLite 单条语句的参数个数上限 (旧版本为 999)
+    MAX_PARAMS = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    @classmethod
+    def in_chunks(cls, ids: Sequence) -> Iterator[Tuple[Sequence, str]]:
+        """
+        逐段返回 (ID 片段, "?,?,..." 占位符)
+        """
+        for i in range(0, len(ids), cls.MAX_PARAMS):
+            part = ids[i:i + cls.MAX_PARAMS]
+            yield part, ','.join('?' * len(part))
+
+    @property
+    def built(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM meta WHERE key = 'built'").fetchone() is not None
+
+    def mark_built(self) -> None:
+        """
+        内容已覆盖整个向量库 (回填完成，或新建的空库)
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('built', '1')")
+
+# 自定义水声词典：分词时作为整词，统计热词时优先
+ACOUSTIC_TERMS = [
+    "传播损失", "声纳方程", "多途效应", "混响", "声源级", "噪声级", "指向性指数",
+    "检测阈", "声速剖面", "汇聚区", "深海声道", "浅海", "波束形成", "匹配滤波",
+    "Wenz曲线", "空化噪声", "目标强度", "多普勒", "水听器", "换能器",
+    "主动声纳", "被动声纳", "信噪比", "虚警概率", "阵列增益"
+]
+_acoustic_terms_added = False
+
+def add_acoustic_terms() -> None:
+    """
+    把水声术语加入 jieba 词典 (只执行一次)
+    """
+    global _acoustic_terms_added
+    if not _acoustic_terms_added:
+        for term in ACOUSTIC_TERMS:
+            jieba.add_word(term)
+        _acoustic_terms_added = True
+
+def count_keywords(text: str) -> Counter:
+    """
+    分词并统计词频 (过滤单字和纯数字)，供热词统计使用
+    """
+    add_acoustic_terms()
+    return Counter(w for w in jieba.cut(text) if len(w) >= 2 and not re.match(r'^\d+$', w))
+
+def rank_keywords(term_counts: Dict[str, int], most_common: List[Tuple[str, int]], top_n: int = 10) -> List[Tuple[str, int]]:
+    """
+    专业术语优先的热词排行
+    :param term_counts: ACOUSTIC_TERMS 中各术语的频次
+    :param most_common: 全部词中频次最高的 top_n * 2 个 [(词, 频次), ...]
     :return: [(词, 频次), ...]
     """
-    if not text_list:
-        return [("暂无数据", 0)]
-        
-    combined_text = " ".join(text_list)
-    
-    # 1. 增加自定义水声词典
-    acoustic_terms = [
-        "传播损失", "声纳方程", "多途效应", "混响", "声源级", "噪声级", "指向性指数",
-        "检测阈", "声速剖面", "汇聚区", "深海声道", "浅海", "波束形成", "匹配滤波",
-        "Wenz曲线", "空化噪声", "目标强度", "多普勒", "水听器", "换能器",
-        "主动声纳", "被动声纳", "信噪比", "虚警概率", "阵列增益"
-    ]
-    for term in acoustic_terms:
-        jieba.add_word(term)
-        
-    # 2. 分词
-    words = jieba.cut(combined_text)
-    
-    # 3. 过滤停用词和短词
-    filtered_words = []
-    for w in words:
-        if len(w) >= 2 and not re.match(r'^\d+$', w): # 长度>=2且非纯数字
-            filtered_words.append(w)
-            
-    # 4. 统计词频
-    word_counts = Counter(filtered_words)
-    
-    # 5. 优先筛选专业术语，并按频次排序
     # 先把所有专业术语提出来
-    term_counts = []
-    for term in acoustic_terms:
-        if word_counts[term] > 0:
-            term_counts.append((term, word_counts[term]))
+    term_list = [(term, term_counts.get(term, 0)) for term in ACOUSTIC_TERMS if term_counts.get(term, 0) > 0]
             
     # 如果专业术语不够，再补其他高频词
-    if len(term_counts) < top_n:
-        top_general = word_counts.most_common(top_n * 2)
-        for w, c in top_general:
+    if len(term_list) < top_n:
+        for w, c in most_common:
             # 避免重复添加
-            if w not in [t[0] for t in term_counts]:
-                term_counts.append((w, c))
-            if len(term_counts) >= top_n:
+            if w not in [t[0] for t in term_list]:
+                term_list.append((w, c))
+            if len(term_list) >= top_n:
                 break
     
     # 按频次降序排列
-    term_counts.sort(key=lambda x: x[1], reverse=True)
-            
-    return term_counts[:top_n]
+    term_list.sort(key=lambda x: x[1], reverse=True)
+    return term_list[:top_n]
+
+def extract_top_keywords(text_list: List[str], top_n: int = 10) -> List[Tuple[str, int]]:
+    """
+    提取文本列表中的高频专业热词及其频次 (全量分词；知识库统计见 src.keyword_stats)
+    :param text_list: 文档内容列表
+    :param top_n: 返回前N个热词
+    :return: [(词, 频次), ...]
+    """
+    if not text_list:
+        return [("暂无数据", 0)]
+    word_counts = count_keywords(" ".join(text_list))
+    return rank_keywords(word_counts, word_counts.most_common(top_n * 2), top_n)
 
 def generate_knowledge_charts(top_keywords: List[Tuple[str, int]]) -> str:
     """
@@ -1,9 +1,21 @@
 import os
-from typing import List, Tuple
+import threading
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from src.batch_embedder import BatchEmbedder, load_embedding_backend
+from src.bm25_index import BM25Index, reciprocal_rank_fusion
+from src.chunk_ids import ChunkIdAssigner
+from src.content_tagger import content_tagger
+from src.dedup import NearDuplicateIndex
+from src.embedding_cache import CachedEmbeddings, EmbeddingCache, model_identity
 from src.document_processing import doc_processor
+from src.embedding_tokens import EMBEDDING_BACKEND, EMBEDDING_MODEL_PATH, EMBEDDING_WORKERS, ONNX_EMBEDDING_FILE
+from src.ingest_manifest import IngestManifest, manifest_key
+from src.keyword_stats import KeywordStats
+from src.parse_cache import file_digest
+from src.source_registry import SourceRegistry, count_over_limit
 from src.utils import setup_logger
 
 logger = setup_logger('vector_store')
@@ -15,22 +27,60 @@ class VectorStoreHandler:
         # It will be downloaded to default cache if not present
         logger.info("Initializing Embedding Model...")
         # Use local model path
-        model_path = r"e:\rag_project\models\bge-small-zh-v1.5"
+        model_path = EMBEDDING_MODEL_PATH
         
         try:
-            logger.info(f"Loading model from local path: {model_path}")
-            self.embedding_function = HuggingFaceEmbeddings(
-                model_name=model_path,
-                model_kwargs={'device': 'cpu'}, 
-                encode_kwargs={'normalize_embeddings': True},
-                show_progress=False
-            )
+            logger.info(f"Loading model from local path: {model_path} ({EMBEDDING_BACKEND} backend)")
+            self.embedding_function = load_embedding_backend(EMBEDDING_BACKEND, model_path, ONNX_EMBEDDING_FILE)
         except Exception as e:
             logger.error(f"Failed to load embedding model from {model_path}: {e}")
             raise e
+        # Ingestion embeds length-bucketed, token-budgeted batches, optionally in
+        # EMBEDDING_WORKERS processes sharing the cores
+        worker_threads = max(1, (os.cpu_count() or 1) // EMBEDDING_WORKERS)
+        self.batch_embedder = BatchEmbedder(
+            self.embedding_function, doc_processor.token_counter,
+            token_budget=8192, max_batch_size=128, workers=EMBEDDING_WORKERS,
+            backend_args=(EMBEDDING_BACKEND, model_path, ONNX_EMBEDDING_FILE, worker_threads)
+        )
+        # Vectors of unchanged chunk texts are reused across re-indexing (./cache survives reset_db).
+        # Quantized vectors differ slightly, so each backend has its own cache keys
+        self.embedding_cache = EmbeddingCache("./cache/embeddings.sqlite", max_size_mb=1024)
+        backend_id = ONNX_EMBEDDING_FILE if EMBEDDING_BACKEND == "onnx" else "torch"
+        self.embedding_function = CachedEmbeddings(
+            self.batch_embedder, self.embedding_cache,
+            f"{model_identity(model_path, normalize=True)}:{backend_id}"
+        )
         
         self.persist_directory = "./chroma_db"
         self.collection_name = "water_acoustic_kb"
+        # Chunks embedded + upserted per batch during ingestion, bounds peak memory.
+        # Large enough for the batch embedder to bucket chunks by length
+        self.ingest_batch_size = 256
+        # Record of files ingested by folder sync, lives with the index
+        self.manifest = IngestManifest(os.path.join(self.persist_directory, "ingest_manifest.json"))
+        # Chunk/page counts per indexed source, for file listings and stats without scanning the collection
+        self.registry = SourceRegistry(os.path.join(self.persist_directory, "source_registry.sqlite"))
+        # Term frequencies of the indexed chunks for the insight panel, updated per chunk
+        self.keyword_stats = KeywordStats(os.path.join(self.persist_directory, "keyword_stats.sqlite"))
+        # Lexical (BM25) index of the chunks; search fuses it with dense similarity
+        self.bm25 = BM25Index(os.path.join(self.persist_directory, "bm25_index.sqlite"))
+        self.hybrid_search_enabled = True
+        # Candidates taken from each ranking before fusion, at least this many
+        self.hybrid_fetch_k = 20
+        # Near-duplicate chunks (SimHash similarity >= threshold) are not embedded, only
+        # recorded with the chunk they matched
+        self.dedup_enabled = True
+        self.dedup = NearDuplicateIndex(os.path.join(self.persist_directory, "dedup_index.sqlite"), threshold=0.9)
+        # Scene tags (env, device, band, ...) per chunk from term density in its text
+        self.content_tagging = True
+        self.valid_exts = ['.docx', '.pdf', '.txt']
+        # Serializes folder syncs: the sync button, startup and the folder watcher
+        self.sync_lock = threading.RLock()
+        # Held by every write of chunks to the collection and its sidecar indexes (upload
+        # jobs, folder sync, deletes) and for a whole sidecar backfill, so no write falls
+        # between the backfill's snapshot of the collection and its rebuild
+        self.index_lock = threading.RLock()
         
         # Initialize ChromaDB
         logger.info(f"Initializing ChromaDB at {self.persist_directory}")
@@ -39,13 +89,22 @@ class VectorStoreHandler:
             embedding_function=self.embedding_function,
             collection_name=self.collection_name
         )
+        if not self.registry.built:
+            self._rebuild_registry()
+        if not self.keyword_stats.built and self.vectordb._collection.count() == 0:
+            # New index: nothing to recount
+            self.keyword_stats.mark_built()
+        # Backfills of an existing collection run in the startup sync thread
+        # (ensure_bm25, ensure_keyword_stats)
 
-    def add_document(self, file_path: str, doc_type: str) -> Tuple[bool, str, int]:
+    def add_document(self, file_path: str, doc_type: str, source_path: Optional[str] = None) -> Tuple[bool, str, int]:
         """
         Add document to vector store
         Args:
             file_path: Path to the file
             doc_type: 'core' or 'supplement'
+            source_path: Unique source identity stored as `source_path` metadata,
+                defaults to the file name (folder sync passes the manifest key)
         Returns:
             (success, message, num_chunks)
         """
@@ -54,155 +113,611 @@ class VectorStoreHandler:
 
         logger.info(f"Processing document: {file_path}")
         try:
-            # 1. Get documents with metadata (page, source)
-            documents = doc_processor.process(file_path)
-            if not documents:
-                return False, "No text extracted from document", 0
-
-            # 2. Add extra metadata and filter empty content
-            valid_documents = []
-            for doc in documents:
-                if doc.page_content and doc.page_content.strip():
-                    doc.metadata["doc_type"] = doc_type
-                    # Lightweight keyword-based tagging (trial)
-                    fname = os.path.basename(file_path)
-                    low = fname.lower()
-                    cn = fname
-                    # env
-                    if "深海" in cn or "deep" in low:
-                        doc.metadata["env"] = "深海"
-                    elif "浅海" in cn or "shallow" in low:
-                        doc.metadata["env"] = "浅海"
-                    elif "港湾" in cn or "近岸" in cn or "harbor" in low:
-                        doc.metadata["env"] = "港湾"
-                    elif "冰下" in cn or "ice" in low:
-                        doc.metadata["env"] = "冰下"
-                    # device
-                    if "主动" in cn or "active" in low:
-                        doc.metadata["device"] = "主动"
-                    elif "被动" in cn or "passive" in low:
-                        doc.metadata["device"] = "被动"
-                    # band
-                    if "低频" in cn or "low-frequency" in low:
-                        doc.metadata["band"] = "低频"
-                    elif "中频" in cn or "mid-frequency" in low or "中频段" in cn:
-                        doc.metadata["band"] = "中频"
-                    elif "高频" in cn or "high-frequency" in low:
-                        doc.metadata["band"] = "高频"
-                    # ssp_type
-                    if "汇聚区" in cn or "sofar" in low or "声道" in cn:
-                        doc.metadata["ssp_type"] = "汇聚区"
-                    elif "表面声道" in cn:
-                        doc.metadata["ssp_type"] = "表面声道"
-                    elif "中层极小" in cn:
-                        doc.metadata["ssp_type"] = "中层极小"
-                    # bottom_type
-                    if "泥" in cn or "mud" in low:
-                        doc.metadata["bottom_type"] = "泥"
-                    elif "砂" in cn or "sand" in low:
-                        doc.metadata["bottom_type"] = "砂"
-                    elif "岩" in cn or "rock" in low:
-                        doc.metadata["bottom_type"] = "岩"
-                    # task
-                    if "侦察" in cn or "recon" in low:
-                        doc.metadata["task"] = "侦察"
-                    elif "跟踪" in cn or "track" in low:
-                        doc.metadata["task"] = "跟踪"
-                    elif "定位" in cn or "locat" in low:
-                        doc.metadata["task"] = "定位"
-                    elif "通信" in cn or "commun" in low:
-                        doc.metadata["task"] = "通信"
-                    # array_type
-                    if "线阵" in cn or "line array" in low:
-                        doc.metadata["array_type"] = "线阵"
-                    elif "面阵" in cn or "planar array" in low:
-                        doc.metadata["array_type"] = "面阵"
-                    elif "拖曳阵" in cn or "towed array" in low:
-                        doc.metadata["array_type"] = "拖曳阵"
-                    valid_documents.append(doc)
+            # Streaming pipeline: parse -> clean -> split (doc_processor.iter_documents)
+            # -> tag -> embed + upsert in batches of ingest_batch_size.
+            # Chunks of early pages become searchable while later pages are still processed.
+            num_chunks, num_duplicates = self.ingest_documents(
+                doc_processor.iter_documents(file_path), file_path, doc_type, source_path
+            )
             
-            if not valid_documents:
-                return False, "No valid text content after filtering", 0
-
-            # 3. Add to ChromaDB
-            self.vectordb.add_documents(valid_documents)
-            # Persist is automatic in newer Chroma versions, but good to know
+            if not num_chunks and not num_duplicates:
+                return False, "No text extracted from document", 0
             
-            logger.info(f"Added {len(documents)} chunks to Vector Store")
-            return True, f"Successfully added {os.path.basename(file_path)}", len(documents)
+            logger.info(f"Added {num_chunks} chunks to Vector Store")
+            msg = f"Successfully added {os.path.basename(file_path)}"
+            if num_duplicates:
+                msg += f" ({num_duplicates} near-duplicate chunks skipped)"
+            return True, msg, num_chunks
 
         except Exception as e:
             logger.error(f"Error adding document: {e}")
             return False, str(e), 0
 
+    def ingest_documents(self, documents: Iterable[Document], file_path: str, doc_type: str,
+                         source_path: Optional[str] = None,
+                         on_flush: Optional[Callable[[Document], None]] = None,
+                         ingest_pass: Optional[str] = None, from_page: int = 1,
+                         sha256: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Tag, embed and upsert already parsed chunks of one file in batches of ingest_batch_size.
+        Chunk IDs are deterministic (src.chunk_ids): chunks already indexed for this source
+        under the same ID are not embedded again, only their metadata is refreshed. Once the
+        whole file went through, chunks of the source not seen in this pass are deleted.
+        Near-duplicates of already indexed chunks are skipped (see self.dedup).
+        Args:
+            on_flush: Called with the last upserted Document after each batch (checkpointing)
+            ingest_pass: Marks the chunks seen in this pass, defaults to a new random id.
+                A resumed ingestion job passes its job id, so the chunks seen before
+                the interruption count as well
+            from_page: First page in `documents` (resumed job): the near-duplicate
+                fingerprints of earlier pages stay in place
+            sha256: Content hash of the file for the source registry, computed if not given
+        Returns (number of chunks of the file now indexed, number of near-duplicates suppressed)
+        """
+        # File-name based tags are the same for every chunk of the file
+        tags = self._filename_tags(os.path.basename(file_path))
+        source_path = source_path or os.path.basename(file_path)
+        ingest_pass = ingest_pass or uuid.uuid4().hex[:12]
+        existing = set(self._source_chunks(source_path))
+        # Fingerprints of the previous version are set aside, not dropped: they come back if
+        # the pass fails or yields nothing, and only those of deleted chunks are forgotten
+        after_page = from_page - 1 if from_page > 1 else None
+        detached = self.dedup.detach_source(source_path, after_page=after_page)
+        ids = ChunkIdAssigner(source_path)
+        
+        num_chunks = 0
+        num_duplicates = 0
+        added_ids = []
+        num_reused = 0
+        batch = []
+
+        def flush() -> None:
+            nonlocal num_reused
+            new = [(cid, doc) for cid, doc in batch if cid not in existing]
+            reused = [(cid, doc) for cid, doc in batch if cid in existing]
+            new_ids = [cid for cid, _ in new]
+            new_texts = [doc.page_content for _, doc in new]
+            # Embedded before taking the index lock, only the writes are serialized
+            embeddings = self.embedding_function.embed_documents(new_texts) if new else []
+            with self.index_lock:
+                if new:
+                    self.vectordb._collection.upsert(
+                        ids=new_ids, embeddings=embeddings, documents=new_texts,
+                        metadatas=[doc.metadata for _, doc in new]
+                    )
+                    added_ids.extend(new_ids)
+                    self.keyword_stats.add_chunks(new_ids, new_texts)
+                    self.bm25.add_chunks(new_ids, new_texts)
+                if reused:
+                    # Metadata is merged; ingest_job keeps naming the job that embedded the chunk
+                    self.vectordb._collection.update(
+                        ids=[cid for cid, _ in reused],
+                        metadatas=[{k: v for k, v in doc.metadata.items() if k != "ingest_job"} for _, doc in reused]
+                    )
+            num_reused += len(reused)
+            if on_flush is not None:
+                on_flush(batch[-1][1])
+
+        try:
+            for ordinal, doc in enumerate(documents):
+                # Filter empty content
+                if not doc.page_content or not doc.page_content.strip():
+                    continue
+                cid = ids.assign(doc.metadata.get("page"), doc.page_content)
+                if self.dedup_enabled and self.dedup.admit(
+                    doc.page_content, source_path, doc.metadata.get("page"), ordinal, chunk_id=cid
+                ) is not None:
+                    num_duplicates += 1
+                    continue
+                doc.metadata["doc_type"] = doc_type
+                doc.metadata["source_path"] = source_path
+                doc.metadata["ingest_pass"] = ingest_pass
+                doc.metadata.update(tags)
+                if self.content_tagging:
+                    # Chunk text overrides the file-name guess field by field
+                    doc.metadata.update(content_tagger.tag(doc.page_content))
+                batch.append((cid, doc))
+                num_chunks += 1
+                if len(batch) >= self.ingest_batch_size:
+                    flush()
+                    batch = []
+            if batch:
+                flush()
+        except Exception:
+            # Back to the previous version of the file: drop what this pass embedded
+            if added_ids:
+                self._delete_chunks(added_ids)
+            self.dedup.restore_source(source_path, detached, after_page=after_page)
+            self.dedup.save()
+            raise
+        
+        num_stale = 0
+        dependents = []
+        if num_chunks or num_duplicates:
+            indexed = self._source_chunks(source_path)
+            stale = [cid for cid, meta in indexed.items() if meta.get("ingest_pass") != ingest_pass]
+            if stale:
+                self._delete_chunks(stale)
+                num_stale = len(stale)
+                # Chunks other files were deduplicated against may be gone
+                dependents = self.dedup.dependents(source_path, stale)
+            if sha256 is None and os.path.exists(file_path):
+                sha256 = file_digest(file_path)
+            self._record_source(
+                source_path, [meta for meta in indexed.values() if meta.get("ingest_pass") == ingest_pass],
+                doc_type, sha256, default_name=os.path.basename(file_path)
+            )
+        else:
+            # Nothing parsed: the indexed version stays, and so do its fingerprints
+            self.dedup.restore_source(source_path, detached, after_page=after_page)
+        self.dedup.save()
+        self._reindex_dependents(source_path, dependents)
+        if num_duplicates:
+            logger.info(f"Skipped {num_duplicates} near-duplicate chunks of {source_path}")
+        logger.info(
+            f"{source_path}: embedded {len(added_ids)} new chunks, kept {num_reused} unchanged, "
+            f"deleted {num_stale} stale (embedding cache hit rate {self.embedding_cache.stats()['hit_rate']:.0%}, "
+            f"embedding {self.batch_embedder.stats()['chunks_per_s']} chunks/s)"
+        )
+        # Persist is automatic in newer Chroma versions, but good to know
+        return num_chunks, num_duplicates
+
+    def _source_chunks(self, source_path: str) -> Dict[str, Dict]:
+        """
+        IDs and metadata of the indexed chunks of one source
+        """
+        data = self.vectordb._collection.get(where={"source_path": source_path}, include=['metadatas'])
+        return {cid: meta or {} for cid, meta in zip(data["ids"], data["metadatas"])}
+
+    def _legacy_chunks(self, source: str) -> List[str]:
+        """
+        IDs of the chunks of a file name indexed before `source_path` existed
+        """
+        data = self.vectordb._collection.get(where={"source": source}, include=['metadatas'])
+        return [cid for cid, meta in zip(data["ids"], data["metadatas"]) if "source_path" not in (meta or {})]
+
+    def _delete_chunks(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None) -> List[str]:
+        """
+        Delete chunks by ID or metadata filter, with their keyword counts and BM25 postings.
+        Returns the deleted IDs
+        """
+        with self.index_lock:
+            if ids is None:
+                ids = self.vectordb._collection.get(where=where, include=[])["ids"]
+            if ids:
+                self.vectordb._collection.delete(ids=ids)
+                self.keyword_stats.remove_chunks(ids)
+                self.bm25.remove_chunks(ids)
+        return ids
+
+    def ensure_bm25(self) -> None:
+        """
+        Index all chunks once if the BM25 index does not cover the collection yet
+        (built before the BM25 index existed, or a backfill cut short by a restart).
+        Called from the startup sync thread; search is dense only until it is done
+        """
+        if self.bm25.built:
+            return
+        try:
+            # Chunk writes wait until the rebuild is done (a write between the snapshot
+            # and the rebuild would be missing from the index for good)
+            with self.index_lock:
+                data = self.vectordb._collection.get(include=['documents'])
+                if data["ids"]:
+                    logger.info(f"Building BM25 index for {len(data['ids'])} chunks...")
+                self.bm25.rebuild(data["ids"], data["documents"])
+        except Exception as e:
+            logger.error(f"Error building BM25 index: {e}")
+
+    def ensure_keyword_stats(self) -> None:
+        """
+        Count all chunks once if the keyword stats do not cover the collection yet
+        (built before keyword stats existed, or a recount cut short by a restart).
+        Called from the startup sync thread, like ensure_bm25
+        """
+        if self.keyword_stats.built:
+            return
+        try:
+            with self.index_lock:
+                data = self.vectordb._collection.get(include=['documents'])
+                self.keyword_stats.rebuild(data["ids"], data["documents"])
+        except Exception as e:
+            logger.error(f"Error rebuilding keyword statistics: {e}")
+
+    def top_keywords(self, top_n: int = 10) -> List[Tuple[str, int]]:
+        """
+        Most frequent terms of the indexed chunks, technical terms first (see src.keyword_stats)
+        """
+        try:
+            if not self.keyword_stats.built:
+                # Still being counted by ensure_keyword_stats
+                return [("加载中...", 0)]
+            return self.keyword_stats.top_keywords(top_n)
+        except Exception as e:
+            logger.error(f"Error getting keyword statistics: {e}")
+            return [("错误", 0)]
+
+    def _record_source(self, source_path: str, metadatas: List[Dict], doc_type: Optional[str] = None,
+                       sha256: Optional[str] = None, default_name: Optional[str] = None) -> None:
+        """
+        Update the registry entry of a source from the metadata of its indexed chunks
+        """
+        previous = self.registry.get(source_path) or {}
+        source = next((m["source"] for m in metadatas if m.get("source")), None) \
+            or previous.get("source") or default_name or os.path.basename(source_path)
+        self.registry.record(
+            source_path, source, doc_type or previous.get("doc_type"), len(metadatas),
+            len({m.get("page") for m in metadatas}), sha256 or previous.get("sha256"),
+            over_limit=count_over_limit(metadatas)
+        )
+
+    def _rebuild_registry(self) -> None:
+        """
+        Index built before the source registry existed: one pass over all chunk metadata
+        """
+        try:
+            data = self.vectordb._collection.get(include=['metadatas'])
+            self.registry.rebuild(data["metadatas"])
+        except Exception as e:
+            logger.error(f"Error rebuilding source registry: {e}")
+
+    def _filename_tags(self, fname: str) -> Dict[str, str]:
+        """
+        Lightweight keyword-based tagging (trial) from the file name,
+        the default for fields the chunk text does not decide (see content_tagger)
+        """
+        tags = {}
+        low = fname.lower()
+        cn = fname
+        # env
+        if "深海" in cn or "deep" in low:
+            tags["env"] = "深海"
+        elif "浅海" in cn or "shallow" in low:
+            tags["env"] = "浅海"
+        elif "港湾" in cn or "近岸" in cn or "harbor" in low:
+            tags["env"] = "港湾"
+        elif "冰下" in cn or "ice" in low:
+            tags["env"] = "冰下"
+        # device
+        if "主动" in cn or "active" in low:
+            tags["device"] = "主动"
+        elif "被动" in cn or "passive" in low:
+            tags["device"] = "被动"
+        # band
+        if "低频" in cn or "low-frequency" in low:
+            tags["band"] = "低频"
+        elif "中频" in cn or "mid-frequency" in low or "中频段" in cn:
+            tags["band"] = "中频"
+        elif "高频" in cn or "high-frequency" in low:
+            tags["band"] = "高频"
+        # ssp_type
+        if "汇聚区" in cn or "sofar" in low or "声道" in cn:
+            tags["ssp_type"] = "汇聚区"
+        elif "表面声道" in cn:
+            tags["ssp_type"] = "表面声道"
+        elif "中层极小" in cn:
+            tags["ssp_type"] = "中层极小"
+        # bottom_type
+        if "泥" in cn or "mud" in low:
+            tags["bottom_type"] = "泥"
+        elif "砂" in cn or "sand" in low:
+            tags["bottom_type"] = "砂"
+        elif "岩" in cn or "rock" in low:
+            tags["bottom_type"] = "岩"
+        # task
+        if "侦察" in cn or "recon" in low:
+            tags["task"] = "侦察"
+        elif "跟踪" in cn or "track" in low:
+            tags["task"] = "跟踪"
+        elif "定位" in cn or "locat" in low:
+            tags["task"] = "定位"
+        elif "通信" in cn or "commun" in low:
+            tags["task"] = "通信"
+        # array_type
+        if "线阵" in cn or "line array" in low:
+            tags["array_type"] = "线阵"
+        elif "面阵" in cn or "planar array" in low:
+            tags["array_type"] = "面阵"
+        elif "拖曳阵" in cn or "towed array" in low:
+            tags["array_type"] = "拖曳阵"
+        return tags
+
     def search(self, query: str, k: int = 3) -> List[Document]:
         """
-        Search for relevant documents
+        Search for relevant documents: hybrid (BM25 + dense, see hybrid_search) or dense only,
+        also while the BM25 backfill (ensure_bm25) is still running
         """
         try:
+            if self.hybrid_search_enabled and self.bm25.built:
+                return self.hybrid_search(query, k=k)
             results = self.vectordb.similarity_search(query, k=k)
             return results
         except Exception as e:
             logger.error(f"Error searching: {e}")
             return []
 
+    def dense_ranking(self, query: str, k: int) -> Tuple[List[str], Dict[str, Document]]:
+        """
+        Chunk IDs by embedding similarity, with their Documents
+        """
+        if not k:
+            return [], {}
+        results = self.vectordb._collection.query(
+            query_embeddings=[self.embedding_function.embed_query(query)], n_results=k,
+            include=['documents', 'metadatas']
+        )
+        ids = results["ids"][0]
+        docs = {
+            cid: Document(page_content=text, metadata=meta or {})
+            for cid, text, meta in zip(ids, results["documents"][0], results["metadatas"][0])
+        }
+        return ids, docs
+
+    def hybrid_search(self, query: str, k: int = 3, fetch_k: Optional[int] = None) -> List[Document]:
+        """
+        Reciprocal rank fusion of the dense ranking and the BM25 ranking, each cut at
+        fetch_k (default max(2k, hybrid_fetch_k)). Exact terms and symbols the embedding
+        blurs (TL, DI, Wenz, SOFAR) are found lexically
+        """
+        fetch_k = fetch_k or max(2 * k, self.hybrid_fetch_k)
+        dense_ids, docs = self.dense_ranking(query, fetch_k)
+        lexical_ids = [cid for cid, _ in self.bm25.search(query, fetch_k)]
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids])[:k]
+        missing = [cid for cid in fused if cid not in docs]
+        if missing:
+            data = self.vectordb._collection.get(ids=missing, include=['documents', 'metadatas'])
+            for cid, text, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+                docs[cid] = Document(page_content=text, metadata=meta or {})
+        # A chunk deleted since it was indexed lexically is skipped
+        return [docs[cid] for cid in fused if cid in docs]
+
     def get_indexed_files(self) -> List[str]:
         """
-        Get list of filenames already indexed in the vector store
+        Get list of filenames already indexed in the vector store (from the source registry)
         """
         try:
-            # Fetch all metadata
-            data = self.vectordb.get(include=['metadatas'])
-            if not data or 'metadatas' not in data:
-                return []
-            
-            # Extract unique source filenames
-            sources = set()
-            for meta in data['metadatas']:
-                if meta and 'source' in meta:
-                    sources.add(meta['source'])
-            return list(sources)
+            return self.registry.names()
         except Exception as e:
             logger.error(f"Error getting indexed files: {e}")
             return []
 
-    def scan_and_ingest(self, folder_path: str) -> List[str]:
+    def delete_source(self, source_path: str, legacy_source: Optional[str] = None) -> None:
+        """
+        Remove all chunks of one source from the collection
+        Args:
+            source_path: `source_path` metadata of the chunks
+            legacy_source: For chunks indexed before `source_path` existed, their `source` file name
+        """
+        try:
+            self._delete_chunks(where={"source_path": source_path})
+            if legacy_source:
+                self._delete_chunks(where={"source": legacy_source})
+            self.registry.remove(*([source_path, legacy_source] if legacy_source else [source_path]))
+        except Exception as e:
+            logger.error(f"Error deleting chunks of {source_path}: {e}")
+        self._forget_fingerprints(source_path)
+
+    def _forget_fingerprints(self, source_path: str, chunk_ids: Optional[List[str]] = None) -> None:
+        """
+        Drop deleted chunks (all chunks of the source if chunk_ids is None) from the
+        near-duplicate index. Chunks of other files that were skipped as duplicates of
+        them lost their indexed copy: make the next sync re-index those files (cheap,
+        unchanged chunks are not embedded again)
+        """
+        if chunk_ids is None:
+            others = self.dedup.remove_source(source_path)
+        else:
+            others = self.dedup.remove_chunks(source_path, chunk_ids)
+        self._reindex_dependents(source_path, others)
+
+    def _reindex_dependents(self, source_path: str, others: List[str]) -> None:
+        for other in others:
+            if self.manifest.get(other) is not None:
+                logger.info(f"{other} had chunks deduplicated against {source_path}, marking for re-index")
+                self.manifest.invalidate(other)
+            else:
+                logger.warning(f"{other} had chunks deduplicated against {source_path}, re-add it to restore them")
+
+    def delete_job_chunks(self, job_id: str, source_path: str, after_page: int = 0) -> None:
+        """
+        Roll back the chunks embedded by an ingestion job (see src.ingest_jobs):
+        all of them, or only those of pages > after_page. Chunks it kept unchanged
+        from an earlier upload of the file stay
+        """
+        where = {"ingest_job": job_id}
+        if after_page:
+            where = {"$and": [where, {"page": {"$gt": after_page}}]}
+        deleted = []
+        try:
+            deleted = self._delete_chunks(where=where)
+            remaining = list(self._source_chunks(source_path).values())
+            if remaining:
+                self._record_source(source_path, remaining)
+            else:
+                self.registry.remove(source_path)
+        except Exception as e:
+            logger.error(f"Error deleting chunks of ingestion job {job_id}: {e}")
+        # Chunks kept unchanged from an earlier upload keep their fingerprints
+        if deleted:
+            self._forget_fingerprints(source_path, deleted)
+
+    def count_job_chunks(self, job_id: str) -> int:
+        """
+        Chunks indexed by an ingestion job, embedded by it or kept unchanged
+        """
+        try:
+            data = self.vectordb._collection.get(where={"ingest_pass": job_id}, include=[])
+            return len(data["ids"])
+        except Exception as e:
+            logger.error(f"Error counting chunks of ingestion job {job_id}: {e}")
+            return 0
+
+    def _bootstrap_manifest(self, folder_path: str) -> None:
+        """
+        First sync on an index built before the manifest existed: adopt files whose
+        name is already indexed instead of ingesting them a second time
+        """
+        indexed_files = set(self.get_indexed_files())
+        if not indexed_files:
+            return
+        logger.info(f"No ingest manifest yet, adopting {len(indexed_files)} already indexed files.")
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                if os.path.splitext(file)[1].lower() in self.valid_exts and file in indexed_files:
+                    full_path = os.path.join(root, file)
+                    self.manifest.record(manifest_key(full_path), full_path, doc_type='core', num_chunks=0, legacy=True)
+
+    def file_sync_status(self, file_path: str) -> str:
+        """
+        Compare a file on disk with the manifest: 'added', 'updated' or 'unchanged'
         """
-        Scan folder for new files and ingest them
-        Returns list of newly added files
+        unchanged = self.manifest.is_unchanged(manifest_key(file_path), file_path)
+        if unchanged is None:
+            return 'added'
+        return 'unchanged' if unchanged else 'updated'
+
+    def sync_file(self, file_path: str, doc_type: str = 'core') -> str:
+        """
+        Bring one file's chunks in line with its content on disk.
+        Returns 'added', 'updated', 'unchanged' or 'failed'
+        """
+        status = self.file_sync_status(file_path)
+        if status == 'unchanged':
+            logger.debug(f"Skipping unchanged file: {manifest_key(file_path)}")
+            return status
+        return self.reindex_file(file_path, status, doc_processor.iter_documents(file_path), doc_type)
+
+    def reindex_file(self, file_path: str, status: str, documents: Iterable[Document], doc_type: str = 'core') -> str:
         """
+        Bring the chunks of a new ('added') or changed ('updated') file in line with `documents`
+        and record it in the manifest. Only new or edited chunks are embedded (see ingest_documents).
+        Returns status, or 'failed' if nothing was indexed (the previous version is kept)
+        """
+        key = manifest_key(file_path)
+        legacy_ids = []
+        if status == 'updated':
+            logger.info(f"File changed, re-indexing: {key}")
+            entry = self.manifest.get(key) or {}
+            if entry.get("legacy"):
+                # Adopted chunks predate source_path and chunk IDs: all of them are replaced,
+                # once the new version is indexed
+                legacy_ids = self._legacy_chunks(os.path.basename(file_path))
+        else:
+            logger.info(f"Auto-ingesting new file: {key}")
+        try:
+            sha256 = file_digest(file_path)
+            num_chunks, num_duplicates = self.ingest_documents(documents, file_path, doc_type, source_path=key, sha256=sha256)
+        except Exception as e:
+            # ingest_documents already dropped the chunks it added
+            logger.error(f"Error adding document {key}: {e}")
+            return 'failed'
+        if not num_chunks and not num_duplicates:
+            return 'failed'
+        if legacy_ids:
+            self._delete_chunks(legacy_ids)
+            if os.path.basename(file_path) != key:
+                self.registry.remove(os.path.basename(file_path))
+        logger.info(f"Indexed {num_chunks} chunks of {key}")
+        self.manifest.record(key, file_path, doc_type, num_chunks, sha256=sha256)
+        return status
+
+    def plan_folder_sync(self, folder_path: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        Diff a folder against the manifest without touching the collection.
+        Returns ([(file_path, 'added'|'updated'), ...], [removed manifest keys])
+        """
+        if not self.manifest.exists:
+            self._bootstrap_manifest(folder_path)
+        known = set(self.manifest.keys_under(manifest_key(folder_path)))
+        logger.info(f"Found {len(known)} files in the ingest manifest.")
+        
+        changes = []
+        seen = set()
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                ext = os.path.splitext(file)[1].lower()
+                if ext not in self.valid_exts:
+                    continue
+                full_path = os.path.join(root, file)
+                seen.add(manifest_key(full_path))
+                status = self.file_sync_status(full_path)
+                if status != 'unchanged':
+                    changes.append((full_path, status))
+        return changes, sorted(known - seen)
+
+    def purge_file(self, key: str) -> None:
+        """
+        Remove a file that no longer exists on disk from the index and the manifest
+        """
+        entry = self.manifest.get(key) or {}
+        logger.info(f"File deleted, purging chunks: {key}")
+        self.delete_source(key, os.path.basename(key) if entry.get("legacy") else None)
+        self.manifest.remove(key)
+
+    def sync_folder(self, folder_path: str, workers: int = 1,
+                    progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, List[str]]:
+        """
+        Incremental folder sync against the ingest manifest:
+        new files are added, changed files re-indexed, deleted files purged.
+        With workers > 1 files are parsed in a process pool (see src.bulk_ingest)
+        progress is called with (files done, files to sync, manifest key) after each file
+        Returns {'added': [...], 'updated': [...], 'removed': [...], 'failed': [...]}
+        """
+        with self.sync_lock:
+            return self._sync_folder(folder_path, workers, progress)
+
+    def _sync_folder(self, folder_path: str, workers: int,
+                     progress: Optional[Callable[[int, int, str], None]]) -> Dict[str, List[str]]:
+        result = {"added": [], "updated": [], "removed": [], "failed": []}
         if not os.path.exists(folder_path):
             logger.warning(f"Folder not found: {folder_path}")
-            return []
+            return result
 
         logger.info(f"Scanning folder: {folder_path}")
-        indexed_files = self.get_indexed_files()
-        logger.info(f"Found {len(indexed_files)} already indexed files.")
+        changes, removed = self.plan_folder_sync(folder_path)
+        total = len(removed) + len(changes)
+
+        def file_done(key: str) -> None:
+            if progress is not None:
+                progress(sum(len(v) for v in result.values()), total, key)
         
-        added_files = []
+        for key in removed:
+            self.purge_file(key)
+            result["removed"].append(key)
+            file_done(key)
         
-        valid_exts = ['.docx', '.pdf', '.txt']
+        if workers > 1 and len(changes) > 1:
+            from src.bulk_ingest import bulk_ingest
+
+            def on_file(item: Dict) -> None:
+                result[item["status"]].append(item["key"])
+                file_done(item["key"])
+            bulk_ingest(self, changes, workers=workers, on_file=on_file)
+        else:
+            for full_path, status in changes:
+                # Default to 'core' doc_type for auto-ingested files
+                status = self.reindex_file(full_path, status, doc_processor.iter_documents(full_path), doc_type='core')
+                result[status].append(manifest_key(full_path))
+                file_done(manifest_key(full_path))
         
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in valid_exts:
-                    if file not in indexed_files:
-                        full_path = os.path.join(root, file)
-                        logger.info(f"Auto-ingesting new file: {file}")
-                        # Default to 'core' doc_type for auto-ingested files
-                        success, _, _ = self.add_document(full_path, doc_type='core')
-                        if success:
-                            added_files.append(file)
-                    else:
-                        logger.debug(f"Skipping already indexed file: {file}")
-                        
-        if added_files:
-            logger.info(f"Auto-ingestion complete. Added {len(added_files)} files: {added_files}")
+        if any(result.values()):
+            logger.info(
+                f"Sync complete: {len(result['added'])} added, {len(result['updated'])} updated, "
+                f"{len(result['removed'])} removed, {len(result['failed'])} failed."
+            )
         else:
-            logger.info("No new files found to ingest.")
-            
-        return added_files
+            logger.info("No new or changed files found.")
+        if not self.manifest.exists:
+            self.manifest.save()
+        return result
+
+    def scan_and_ingest(self, folder_path: str) -> List[str]:
+        """
+        Scan folder for new or changed files and ingest them (see sync_folder)
+        Returns list of newly added / re-indexed files
+        """
+        result = self.sync_folder(folder_path)
+        return result["added"] + result["updated"]
 
 # Singleton
 vector_store = VectorStoreHandler()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings
+from src.batch_embedder import BatchEmbedder, plan_batches
+
+class CharCounter:
+    name = "chars"
+
+    def count(self, text):
+        return len(text)
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t)), float(ord(t[0]))] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), float(ord(text[0]))]
+
+class TestBatchEmbedder(unittest.TestCase):
+    def setUp(self):
+        # OCR fragments mixed with long paragraphs
+        self.texts = [("x" if i % 2 else "y") * (5 if i % 3 else 400) for i in range(60)]
+
+    def test_plan_respects_token_budget(self):
+        lengths = [5, 400, 7, 120, 5, 300, 9]
+        batches = plan_batches(lengths, token_budget=600, max_batch_size=4)
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(len(lengths))))
+        for batch in batches:
+            self.assertLessEqual(len(batch), 4)
+            if len(batch) > 1:
+                self.assertLessEqual(len(batch) * max(lengths[i] for i in batch), 600)
+        # Short chunks are batched together, not with the long ones
+        self.assertEqual(sorted(batches[0]), [0, 2, 4, 6])
+
+    def test_oversized_chunk_gets_own_batch(self):
+        self.assertEqual(plan_batches([50, 2000], token_budget=100, max_batch_size=8), [[0], [1]])
+
+    def test_vectors_in_input_order(self):
+        model = RecordingEmbeddings()
+        embedder = BatchEmbedder(model, CharCounter(), token_budget=1000, max_batch_size=16)
+        vectors = embedder.embed_documents(self.texts)
+        self.assertEqual(vectors, [[float(len(t)), float(ord(t[0]))] for t in self.texts])
+        self.assertGreater(len(model.batches), 1)
+        for batch in model.batches:
+            # Special tokens are part of the padded length
+            self.assertTrue(len(batch) == 1 or len(batch) * (max(map(len, batch)) + 2) <= 1000)
+
+        stats = embedder.stats()
+        self.assertEqual(stats["chunks"], len(self.texts))
+        self.assertGreater(stats["chunks_per_s"], 0)
+        self.assertGreater(stats["padding_efficiency"], 0.9)
+
+    def test_queries_bypass_batching(self):
+        model = RecordingEmbeddings()
+        embedder = BatchEmbedder(model, CharCounter())
+        self.assertEqual(embedder.embed_query("abc"), [3.0, 97.0])
+        self.assertEqual(embedder.embed_documents([]), [])
+        self.assertEqual(model.batches, [])
+
+    def test_broken_pool_falls_back_to_process(self):
+        model = RecordingEmbeddings()
+        # Workers cannot load this backend, so the pool breaks
+        embedder = BatchEmbedder(model, CharCounter(), token_budget=1000, workers=2,
+                                 backend_args=("onnx", "/nonexistent-model", "model.onnx", 1))
+        try:
+            vectors = embedder.embed_documents(self.texts)
+        finally:
+            embedder.close()
+        self.assertEqual(vectors, [[float(len(t)), float(ord(t[0]))] for t in self.texts])
+        self.assertEqual(sum(len(b) for b in model.batches), len(self.texts))
+
+if __name__ == '__main__':
+    unittest.main()
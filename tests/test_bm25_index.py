@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = {
+    "p1": "传播损失 TL 由扩展损失和吸收损失组成，球面扩展时 TL = 20lg r。",
+    "p2": "Wenz曲线给出了海洋环境噪声级随频率的变化。",
+    "p3": "深海声道 SOFAR 的声道轴附近声速最小，声能可传播很远。",
+    "p4": "指向性指数 DI 描述了换能器阵列对噪声的空间抑制能力。",
+    "p5": "浅海中海底反射造成多途效应，传播损失随海底类型变化。",
+}
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "bm25_index.sqlite")
+        self.index = BM25Index(self.path)
+        self.index.add_chunks(list(CHUNKS), list(CHUNKS.values()))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_tokenize_splits_symbols(self):
+        terms = tokenize("Wenz曲线与TL=20lg r")
+        self.assertIn("wenz", terms)
+        self.assertIn("曲线", terms)
+        self.assertIn("tl", terms)
+        self.assertIn("r", terms)
+        self.assertNotIn("与", terms)
+
+    def test_exact_terms_rank_first(self):
+        self.assertEqual(self.index.search("Wenz 曲线是什么", k=3)[0][0], "p2")
+        self.assertEqual(self.index.search("SOFAR", k=3)[0][0], "p3")
+        self.assertEqual(self.index.search("DI 的含义", k=3)[0][0], "p4")
+        # p3 only shares "传播"
+        self.assertEqual({cid for cid, _ in self.index.search("传播损失", k=5)[:2]}, {"p1", "p5"})
+        self.assertEqual(self.index.search("量子计算", k=3), [])
+
+    def test_add_remove_and_persist(self):
+        # Already indexed chunks are not counted twice
+        self.index.add_chunks(["p1"], [CHUNKS["p1"]])
+        self.assertEqual(self.index.stats()["chunks"], 5)
+        self.index.remove_chunks(["p3", "missing"])
+        self.assertEqual(self.index.search("SOFAR", k=3), [])
+
+        reopened = BM25Index(self.path)
+        # Indexed chunks alone do not cover an existing collection
+        self.assertFalse(reopened.built)
+        self.assertEqual(reopened.stats()["chunks"], 4)
+        self.assertEqual(reopened.search("Wenz", k=1), self.index.search("Wenz", k=1))
+
+        reopened.rebuild(["p3"], [CHUNKS["p3"]])
+        self.assertTrue(BM25Index(self.path).built)
+        self.assertEqual(reopened.stats()["chunks"], 1)
+        self.assertEqual(reopened.search("SOFAR", k=1)[0][0], "p3")
+
+    def test_reciprocal_rank_fusion(self):
+        dense = ["a", "b", "c"]
+        lexical = ["c", "d", "a"]
+        fused = reciprocal_rank_fusion([dense, lexical])
+        # In both rankings beats first place in only one
+        self.assertEqual(fused[:2], ["a", "c"])
+        self.assertEqual(set(fused), {"a", "b", "c", "d"})
+
+if __name__ == '__main__':
+    unittest.main()
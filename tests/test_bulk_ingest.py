@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bulk_ingest import bulk_ingest
+from src.document_processing import doc_processor
+from src.ingest_manifest import manifest_key
+from src.parse_cache import KIND_CHUNKS
+
+class FakeHandler:
+    """
+    Records the files handed to the writer
+    """
+    def __init__(self):
+        self.reindexed = {}
+        self.manifest = self
+
+    def reindex_file(self, file_path, status, documents, doc_type='core'):
+        self.reindexed[manifest_key(file_path)] = list(documents)
+        return status
+
+    def get(self, key):
+        return {"chunks": len(self.reindexed.get(key, []))}
+
+class TestBulkIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # The parse cache (./cache/parse) of the workers and this process lives here
+        self.old_cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_worker_cache_hits_are_reported(self):
+        path = os.path.join(self.tmp_dir, "notes.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("浅海中海底反射造成多途效应，传播损失随海底类型变化。")
+        hits_before = doc_processor.cache.counts()[0].get(KIND_CHUNKS, 0)
+        first = bulk_ingest(FakeHandler(), [(path, 'added')], workers=1)
+        second = bulk_ingest(FakeHandler(), [(path, 'updated')], workers=1)
+        self.assertEqual((first["cached_files"], second["cached_files"]), (0, 1))
+        self.assertTrue(second["files"][0]["cached"])
+        # Counted in this process although the lookup ran in a worker
+        self.assertEqual(doc_processor.cache.counts()[0][KIND_CHUNKS], hits_before + 1)
+
+    def test_parse_error_leaves_file_alone(self):
+        good = os.path.join(self.tmp_dir, "notes.txt")
+        with open(good, "w", encoding="utf-8") as f:
+            f.write("声纳方程把声源级、传播损失和噪声级联系起来，是声纳设计的基础。")
+        broken = os.path.join(self.tmp_dir, "broken.pdf")
+        with open(broken, "wb") as f:
+            f.write(b"not a pdf")
+        handler = FakeHandler()
+        report = bulk_ingest(handler, [(good, 'added'), (broken, 'updated')], workers=2)
+        # The previous version of a file that failed to parse is not touched
+        self.assertEqual(list(handler.reindexed), [manifest_key(good)])
+        statuses = {f["key"]: f["status"] for f in report["files"]}
+        self.assertEqual(statuses, {manifest_key(good): 'added', manifest_key(broken): 'failed'})
+
+if __name__ == '__main__':
+    unittest.main()
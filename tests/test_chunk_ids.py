@@ -0,0 +1,32 @@
+import unittest
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chunk_ids import ChunkIdAssigner, chunk_id
+
+class TestChunkIds(unittest.TestCase):
+    def test_ids_are_deterministic(self):
+        text = "传播损失随距离按 20logR 增加。"
+        self.assertEqual(chunk_id("data/a.pdf", 3, text), chunk_id("data/a.pdf", 3, text))
+        # Source, page and content all take part
+        ids = {
+            chunk_id("data/a.pdf", 3, text),
+            chunk_id("data/b.pdf", 3, text),
+            chunk_id("data/a.pdf", 4, text),
+            chunk_id("data/a.pdf", 3, text + "。")
+        }
+        self.assertEqual(len(ids), 4)
+
+    def test_repeated_chunks_get_distinct_ids(self):
+        first = ChunkIdAssigner("data/a.pdf")
+        ids = [first.assign(1, "图 1"), first.assign(1, "图 1"), first.assign(2, "图 1")]
+        self.assertEqual(len(set(ids)), 3)
+        # A second pass over the same content reproduces the same IDs
+        second = ChunkIdAssigner("data/a.pdf")
+        self.assertEqual([second.assign(1, "图 1"), second.assign(1, "图 1"), second.assign(2, "图 1")], ids)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.content_tagger import AhoCorasick, ContentTagger
+
+class TestContentTagger(unittest.TestCase):
+    def setUp(self):
+        self.tagger = ContentTagger()
+
+    def test_automaton_finds_overlapping_patterns(self):
+        automaton = AhoCorasick({"he": "he", "she": "she", "his": "his", "hers": "hers"})
+        matches = sorted((end, payload) for end, _, payload, _ in automaton.iter_matches("uShers ahishe"))
+        self.assertEqual(matches, [(3, "he"), (3, "she"), (5, "hers"), (10, "his"), (12, "he"), (12, "she")])
+
+    def test_tags_from_term_density(self):
+        text = (
+            "浅海环境中多途效应严重，浅海海底为砂底，砂底反射损失较小。"
+            "被动声纳通过接收目标辐射噪声实现探测，被动声纳的检测阈决定作用距离。"
+        )
+        self.assertEqual(self.tagger.tag(text), {"env": "浅海", "device": "被动", "bottom_type": "砂"})
+        # A single mention in a long chunk is not enough
+        self.assertEqual(self.tagger.tag("低频" + "声波在海水中传播时的吸收系数随频率增加。" * 40), {})
+
+    def test_mixed_topics_and_word_boundaries(self):
+        # Shallow and deep water discussed equally: no dominant env
+        self.assertNotIn("env", self.tagger.tag("浅海与深海的传播条件不同：浅海多途严重，深海存在汇聚区。"))
+        # "rock" and "mud" inside longer words do not count
+        hits = self.tagger.count_terms("The Rockwell muddle: a rock and MUD survey.")
+        self.assertEqual((hits[("bottom_type", "岩")], hits[("bottom_type", "泥")]), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
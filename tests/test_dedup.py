@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dedup import NearDuplicateIndex, simhash, similarity
+
+BASE = (
+    "声纳方程描述了声源级、传播损失、噪声级与指向性指数之间的关系，"
+    "是评估主动声纳与被动声纳作用距离的基本工具。在浅海环境中，"
+    "海底反射和多途效应会显著增加传播损失的不确定性。"
+)
+# Same passage from another edition, one word changed
+EDITED = BASE.replace("基本工具", "主要工具")
+OTHER = (
+    "拖曳线列阵通过增加孔径提高低频目标的检测能力，"
+    "其阵形畸变会导致波束主瓣展宽和旁瓣升高，需要进行阵形估计与校正。"
+)
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "dedup_index.sqlite")
+        self.index = NearDuplicateIndex(self.path, threshold=0.9)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_simhash_similarity(self):
+        self.assertEqual(simhash(BASE), simhash(" ".join(BASE)))
+        self.assertGreaterEqual(similarity(simhash(BASE), simhash(EDITED)), 0.9)
+        self.assertLess(similarity(simhash(BASE), simhash(OTHER)), 0.9)
+
+    def test_admit_records_provenance(self):
+        self.assertIsNone(self.index.admit(BASE, "data/a.txt", 3, 0))
+        self.assertIsNone(self.index.admit(OTHER, "data/a.txt", 4, 1))
+        record = self.index.admit(EDITED, "data/b.txt", 7, 5)
+        self.assertIsNotNone(record)
+        self.assertEqual(
+            (record["matched_source"], record["matched_page"], record["matched_ordinal"]),
+            ("data/a.txt", 3, 0)
+        )
+        self.assertEqual((record["page"], record["ordinal"]), (7, 5))
+        self.assertEqual(self.index.stats(), {"threshold": 0.9, "chunks": 2, "suppressed": 1})
+
+        # Persisted and reloaded, with a stricter threshold the edit is no longer a duplicate
+        self.index.save()
+        reloaded = NearDuplicateIndex(self.path, threshold=1.0)
+        self.assertEqual(reloaded.suppressed_for("data/b.txt"), [record])
+        self.assertIsNone(reloaded.admit(EDITED, "data/c.txt", 1, 0))
+
+    def test_remove_source_reports_orphans(self):
+        self.index.admit(BASE, "data/a.txt", 1, 0)
+        self.index.admit(EDITED, "data/b.txt", 1, 0)
+        self.assertEqual(self.index.remove_source("data/a.txt"), ["data/b.txt"])
+        # The fingerprint is gone: the same text is admitted again
+        self.assertIsNone(self.index.admit(BASE, "data/b.txt", 1, 0))
+        self.assertEqual(self.index.remove_source("data/b.txt"), [])
+        self.assertEqual(self.index.stats()["suppressed"], 0)
+
+    def test_detach_and_restore_source(self):
+        self.index.admit(BASE, "data/a.txt", 1, 0, chunk_id="a-1")
+        self.index.admit(OTHER, "data/a.txt", 2, 1, chunk_id="a-2")
+        self.assertIsNotNone(self.index.admit(EDITED, "data/b.txt", 1, 0, chunk_id="b-1"))
+        detached = self.index.detach_source("data/a.txt")
+        # Re-ingesting a.txt: its unchanged chunks are not duplicates of themselves
+        self.assertIsNone(self.index.admit(BASE, "data/a.txt", 1, 0, chunk_id="a-1"))
+        # The pass fails: back to the state before it
+        self.index.restore_source("data/a.txt", detached)
+        self.assertEqual(self.index.stats()["chunks"], 2)
+        record = self.index.admit(EDITED, "data/c.txt", 1, 0, chunk_id="c-1")
+        self.assertEqual(record["matched_chunk"], "a-1")
+
+    def test_dependents_of_deleted_chunks(self):
+        self.index.admit(BASE, "data/a.txt", 1, 0, chunk_id="a-1")
+        self.index.admit(OTHER, "data/a.txt", 2, 1, chunk_id="a-2")
+        self.index.admit(EDITED, "data/b.txt", 1, 0, chunk_id="b-1")
+        self.assertEqual(self.index.dependents("data/a.txt", ["a-2"]), [])
+        self.assertEqual(self.index.dependents("data/a.txt", ["a-1"]), ["data/b.txt"])
+
+    def test_remove_chunks_keeps_other_chunks(self):
+        self.index.admit(BASE, "data/a.txt", 1, 0, chunk_id="a-1")
+        self.index.admit(OTHER, "data/a.txt", 2, 1, chunk_id="a-2")
+        self.index.admit(EDITED, "data/b.txt", 1, 0, chunk_id="b-1")
+        self.assertEqual(self.index.remove_chunks("data/a.txt", ["a-2"]), [])
+        self.assertEqual(self.index.stats()["chunks"], 1)
+        # a-1 is still indexed and still catches its near-duplicates
+        self.assertIsNotNone(self.index.admit(EDITED, "data/c.txt", 1, 0, chunk_id="c-1"))
+        self.assertIsNone(self.index.admit(OTHER, "data/c.txt", 2, 1, chunk_id="c-2"))
+        self.assertEqual(self.index.remove_chunks("data/a.txt", ["a-1"]), ["data/b.txt", "data/c.txt"])
+
+    def test_unsaved_changes_are_not_persisted(self):
+        self.index.admit(BASE, "data/a.txt", 1, 0, chunk_id="a-1")
+        self.index.save()
+        self.index.admit(OTHER, "data/a.txt", 2, 1, chunk_id="a-2")
+        self.assertEqual(NearDuplicateIndex(self.path).stats()["chunks"], 1)
+        self.index.save()
+        self.assertEqual(NearDuplicateIndex(self.path).stats()["chunks"], 2)
+
+    def test_imports_json_index(self):
+        json_path = os.path.join(self.tmp_dir, "old", "dedup_index.json")
+        os.makedirs(os.path.dirname(json_path))
+        record = {"page": 1, "ordinal": 0, "similarity": 0.95, "matched_source": "data/a.txt", "matched_page": 1,
+                  "matched_ordinal": 0, "preview": EDITED[:80]}
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"chunks": {"data/a.txt": [[f"{simhash(BASE):016x}", 1, 0]]},
+                       "suppressed": {"data/b.txt": [record]}}, f)
+        index = NearDuplicateIndex(os.path.join(self.tmp_dir, "old", "dedup_index.sqlite"))
+        self.assertFalse(os.path.exists(json_path))
+        self.assertEqual(index.stats()["chunks"], 1)
+        self.assertEqual(index.suppressed_for("data/b.txt"), [dict(record, matched_chunk=None)])
+        # Records without chunk IDs depend on any chunk of the matched source
+        self.assertEqual(index.dependents("data/a.txt", ["a-9"]), ["data/b.txt"])
+        self.assertEqual(index.admit(EDITED, "data/c.txt", 1, 0)["matched_source"], "data/a.txt")
+
+if __name__ == '__main__':
+    unittest.main()
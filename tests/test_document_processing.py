@@ -0,0 +1,271 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+import numpy as np
+from src.document_processing import OCR_ZOOM, DocumentProcessor, iter_docx_paragraphs, triage_page
+from src.parse_cache import ParseCache, file_digest, make_key
+
+SAMPLE_TEXT = (
+    "第一章 绪论\n"
+    "水声工程是研究水下声场的产生、传播、接收和处理规律的学科。\n"
+    "\n"
+    "1.1 研究背景\n"
+    "声纳方程把声源级、传播损失、目标强度、噪声级和指向性指数联系起来。\n"
+    "Page 3\n"
+    "1.2 传播损失\n"
+    "球面扩展的传播损失为 20logR，柱面扩展为 10logR。\n"
+) * 20
+
+class TestStreamingProcessing(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.processor = DocumentProcessor(ocr_workers=1, cache=None)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_txt_stream_matches_split_with_headings(self):
+        path = os.path.join(self.tmp_dir, "sample.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_TEXT)
+        expected = self.processor.split_with_headings(SAMPLE_TEXT)
+        docs = list(self.processor.iter_documents(path))
+        self.assertEqual([d.page_content for d in docs], expected)
+        self.assertTrue(all(d.metadata == {"source": "sample.txt", "page": 1,
+                                           "tokens": self.processor.token_counter.count(d.page_content)}
+                            for d in docs))
+
+    def test_docx_stream_matches_split_with_headings(self):
+        import docx
+        path = os.path.join(self.tmp_dir, "sample.docx")
+        doc = docx.Document()
+        for line in SAMPLE_TEXT.splitlines():
+            doc.add_paragraph(line)
+        doc.save(path)
+        expected = self.processor.split_with_headings(SAMPLE_TEXT)
+        self.assertEqual([d.page_content for d in self.processor.process(path)], expected)
+
+    def test_streaming_docx_reader_matches_python_docx(self):
+        import docx
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+        from docx.enum.text import WD_BREAK
+        path = os.path.join(self.tmp_dir, "rich.docx")
+        doc = docx.Document()
+        doc.add_heading("第一章 绪论", level=1)
+        para = doc.add_paragraph("声速剖面\t分层")
+        para.add_run().add_break()
+        para.add_run("第二行")
+        para.add_run().add_break(WD_BREAK.PAGE)
+        para.add_run("分页后")
+        # Image parts are never read by the streaming reader
+        png = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False).tobytes("png")
+        png_path = os.path.join(self.tmp_dir, "fig.png")
+        with open(png_path, "wb") as f:
+            f.write(png)
+        doc.add_picture(png_path)
+        table = doc.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = "表格内容不在 paragraphs 中"
+        doc.add_paragraph("")
+        link = doc.add_paragraph("参见 ")
+        link._p.append(parse_xml(
+            f'<w:hyperlink {nsdecls("w")} w:anchor="x"><w:r><w:t>声纳方程</w:t></w:r>'
+            f'<w:r><w:noBreakHyphen/><w:t xml:space="preserve">附录 </w:t></w:r></w:hyperlink>'
+        ))
+        for line in SAMPLE_TEXT.splitlines():
+            doc.add_paragraph(line)
+        doc.save(path)
+
+        legacy = [p.text for p in docx.Document(path).paragraphs]
+        self.assertEqual(list(iter_docx_paragraphs(path)), legacy)
+        lines = [line for text in legacy for line in (text.splitlines() or [""])]
+        self.assertEqual(
+            [d.page_content for d in self.processor.process(path)],
+            list(self.processor.iter_heading_chunks(lines))
+        )
+
+    def test_stream_is_lazy(self):
+        path = os.path.join(self.tmp_dir, "sample.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_TEXT)
+        first = next(self.processor.iter_documents(path))
+        self.assertIn("第一章 绪论", first.page_content)
+
+    def test_mid_file_error_is_raised_and_not_cached(self):
+        path = os.path.join(self.tmp_dir, "sample.pdf")
+        doc = fitz.open()
+        for topic in ["sonar equation", "transmission loss", "ambient noise"]:
+            doc.new_page().insert_text((72, 90), f"Section on {topic}: definitions and examples", fontsize=11)
+        doc.save(path)
+        cache = ParseCache(cache_dir=os.path.join(self.tmp_dir, "cache"))
+        processor = DocumentProcessor(ocr_workers=1, cache=cache)
+        split = processor.split_with_headings
+        def failing_split(text):
+            if "transmission loss" in text:
+                raise RuntimeError("page 2 failed")
+            return split(text)
+        with mock.patch.object(processor, "split_with_headings", side_effect=failing_split):
+            stream = processor.iter_documents(path)
+            self.assertEqual(next(stream).metadata["page"], 1)
+            with self.assertRaises(RuntimeError):
+                list(stream)
+        self.assertIsNone(cache.get_chunks(make_key(file_digest(path), processor.chunk_cache_settings())))
+        # The next run parses the whole file again
+        self.assertEqual([d.metadata["page"] for d in processor.iter_documents(path)], [1, 2, 3])
+
+    def test_section_limit_is_part_of_cache_key(self):
+        path = os.path.join(self.tmp_dir, "long.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"第{i}段：浅海中海底反射造成多途效应，传播损失随海底类型变化。" for i in range(40)))
+        cache = ParseCache(cache_dir=os.path.join(self.tmp_dir, "cache"))
+        processor = DocumentProcessor(ocr_workers=1, cache=cache)
+        list(processor.iter_documents(path))
+        processor.max_section_chars = 100
+        # Cut into different sections: not served from the entry written above
+        self.assertIsNone(cache.get_chunks(make_key(file_digest(path), processor.chunk_cache_settings())))
+        uncached = DocumentProcessor(ocr_workers=1, cache=None)
+        uncached.max_section_chars = 100
+        expected = [d.page_content for d in uncached.iter_documents(path)]
+        self.assertEqual([d.page_content for d in processor.iter_documents(path)], expected)
+
+    def test_failed_ocr_page_is_not_cached(self):
+        path = os.path.join(self.tmp_dir, "scan.pdf")
+        doc = fitz.open()
+        for _ in range(3):
+            doc.new_page()
+        doc.save(path)
+        cache = ParseCache(cache_dir=os.path.join(self.tmp_dir, "cache"))
+        processor = DocumentProcessor(ocr_workers=1, cache=cache)
+        processor.ocr_page_triage = False
+        processor._ocr = object()
+        chunk_key = make_key(file_digest(path), processor.chunk_cache_settings())
+        fail = {1}
+        def fake_ocr(ocr, page, triage=False):
+            if page.number in fail:
+                raise RuntimeError("OCR failed")
+            return f"第{page.number + 1}页扫描文本：声纳方程描述了主动声纳的作用距离。", None
+        with mock.patch("src.document_processing._extract_ocr_text", side_effect=fake_ocr):
+            self.assertEqual([d.metadata["page"] for d in processor.iter_documents(path)], [1, 3])
+            self.assertIsNone(cache.get_chunks(chunk_key))
+            fail.clear()
+            self.assertEqual([d.metadata["page"] for d in processor.iter_documents(path)], [1, 2, 3])
+        self.assertEqual([p for p, _ in cache.get_chunks(chunk_key)], [1, 2, 3])
+
+    def test_pymupdf_strips_header_footer_by_position(self):
+        path = os.path.join(self.tmp_dir, "paper.pdf")
+        doc = fitz.open()
+        for i in range(4):
+            page = doc.new_page()
+            page.insert_text((72, 40), f"Journal of Underwater Acoustics, Vol. {12 + i}", fontsize=9)
+            page.insert_text((72, 200), f"Section {i + 1}: sound speed profile and ray bending.", fontsize=11)
+            # Repeats on every page, but in the body: kept
+            page.insert_text((72, 400), "See the sonar equation above.", fontsize=11)
+            page.insert_text((290, 815), str(i + 1), fontsize=9)
+            page.insert_text((380, 815), "Confidential draft", fontsize=9)
+        doc.save(path)
+        processor = DocumentProcessor(ocr_workers=1, cache=None, pdf_backend="pymupdf")
+        pages = processor.extract_pages_pymupdf(path)
+        self.assertEqual(len(pages), 4)
+        for i, text in enumerate(pages):
+            self.assertIn(f"Section {i + 1}: sound speed profile", text)
+            self.assertIn("See the sonar equation above.", text)
+            self.assertNotIn("Journal of Underwater Acoustics", text)
+            self.assertNotIn("Confidential draft", text)
+            self.assertNotIn(str(i + 1), text.replace(f"Section {i + 1}", ""))
+
+class TestPooledOcr(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "scan.pdf")
+        topics = ["sonar equation", "transmission loss", "ambient noise", "target strength"]
+        scan = fitz.open()
+        for i, topic in enumerate(topics):
+            src = fitz.open()
+            page = src.new_page()
+            page.insert_text((72, 90), f"Chapter {i + 1} The {topic}", fontsize=16)
+            for j in range(4):
+                page.insert_text((72, 140 + j * 24), f"Line {j}: the {topic} depends on range and frequency.", fontsize=12)
+            # Image-only page, like a scan
+            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+            scanned = scan.new_page(width=page.rect.width, height=page.rect.height)
+            scanned.insert_image(scanned.rect, pixmap=pix)
+        scan.save(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_pooled_matches_sequential(self):
+        sequential = DocumentProcessor(ocr_workers=1, cache=None)
+        pooled = DocumentProcessor(ocr_workers=2, cache=None)
+        pooled.min_pages_for_parallel_ocr = 2
+        expected = [(d.metadata, d.page_content) for d in sequential.iter_documents(self.path)]
+        with mock.patch.object(pooled, "_iter_ocr_pages_sequential", side_effect=AssertionError("not pooled")):
+            docs = [(d.metadata, d.page_content) for d in pooled.iter_documents(self.path)]
+        self.assertEqual(sorted({m["page"] for m, _ in expected}), [1, 2, 3, 4])
+        self.assertEqual(docs, expected)
+
+    def test_concurrent_files_share_one_pool(self):
+        other = os.path.join(self.tmp_dir, "scan2.pdf")
+        shutil.copy(self.path, other)
+        sequential = DocumentProcessor(ocr_workers=1, cache=None)
+        expected = [(d.metadata["page"], d.page_content) for d in sequential.iter_documents(self.path)]
+        pooled = DocumentProcessor(ocr_workers=2, cache=None)
+        pooled.min_pages_for_parallel_ocr = 2
+        first, second = pooled.iter_documents(self.path), pooled.iter_documents(other)
+        docs = {self.path: [next(first)], other: [next(second)]}
+        # Both files are in the middle of OCR: one pool of ocr_workers processes
+        self.assertEqual(list(pooled._ocr_pool_users.values()), [2])
+        docs[self.path].extend(first)
+        docs[other].extend(second)
+        self.assertIsNone(pooled._ocr_pool)
+        for path in (self.path, other):
+            self.assertEqual([(d.metadata["page"], d.page_content) for d in docs[path]], expected)
+
+class TestOcrPageTriage(unittest.TestCase):
+    def scanned(self, draw) -> "fitz.Page":
+        """
+        Draw on a page, then rasterize it into an image-only page like a scan
+        """
+        src = fitz.open()
+        draw(src.new_page())
+        pix = src[0].get_pixmap(matrix=fitz.Matrix(2, 2))
+        self.scan = fitz.open()
+        page = self.scan.new_page(width=src[0].rect.width, height=src[0].rect.height)
+        page.insert_image(page.rect, pixmap=pix)
+        return page
+
+    def test_blank_and_page_number_only(self):
+        self.assertEqual(triage_page(self.scanned(lambda p: None))[0], "blank")
+        self.assertEqual(triage_page(self.scanned(lambda p: p.insert_text((290, 800), "17", fontsize=10)))[0], "blank")
+
+    def test_full_page_figure(self):
+        def photo(page):
+            h, w = 1200, 900
+            yy, xx = np.mgrid[0:h, 0:w]
+            img = ((np.sin(xx / 40.0) + np.cos(yy / 55.0)) * 50 + 128).astype(np.uint8)
+            page.insert_image(fitz.Rect(40, 60, 555, 720), pixmap=fitz.Pixmap(fitz.csGRAY, w, h, img.tobytes(), False))
+            page.insert_text((72, 780), "Figure 3: Sound speed profile", fontsize=11)
+        self.assertEqual(triage_page(self.scanned(photo))[0], "figure")
+
+    def test_render_zoom_follows_text_size(self):
+        def body(page):
+            for j in range(30):
+                page.insert_text((72, 90 + j * 22), f"Line {j}: TL = 20 log r + alpha r", fontsize=11)
+        def large(page):
+            for j in range(8):
+                page.insert_text((60, 120 + j * 80), f"Chapter {j} Sonar", fontsize=40)
+        self.assertEqual(triage_page(self.scanned(body)), ("text", OCR_ZOOM))
+        verdict, zoom = triage_page(self.scanned(large))
+        self.assertEqual(verdict, "text")
+        self.assertLess(zoom, 1.5)
+
+if __name__ == '__main__':
+    unittest.main()
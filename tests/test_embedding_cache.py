@@ -0,0 +1,86 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.embedding_cache import CachedEmbeddings, EmbeddingCache, text_key
+
+DIM = 384
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        rng = np.random.default_rng(abs(hash(text)) % (1 << 32))
+        v = rng.standard_normal(DIM)
+        return (v / np.linalg.norm(v)).tolist()
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "embeddings.sqlite")
+        self.model = CountingEmbeddings()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def cached(self, **kwargs):
+        return CachedEmbeddings(self.model, EmbeddingCache(self.path, **kwargs), "bge-small-zh-v1.5:test")
+
+    def test_only_misses_are_embedded(self):
+        embeddings = self.cached()
+        texts = ["声速剖面", "传播损失", "声速剖面"]
+        first = embeddings.embed_documents(texts)
+        # Duplicates within a batch are embedded once
+        self.assertEqual(self.model.embedded, ["声速剖面", "传播损失"])
+
+        # Reopened cache (new process), whitespace differences still hit
+        embeddings = self.cached()
+        second = embeddings.embed_documents(["传播损失", " 声速剖面\n", "目标强度"])
+        self.assertEqual(self.model.embedded[2:], ["目标强度"])
+        np.testing.assert_allclose(second[0], first[1], rtol=1e-6)
+        np.testing.assert_allclose(second[1], first[0], rtol=1e-6)
+        stats = embeddings.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 1, 3))
+        self.assertAlmostEqual(stats["hit_rate"], 0.667)
+
+        # Another storage precision does not reuse float32 blobs
+        self.cached(dtype="float16").embed_documents(["传播损失"])
+        self.assertEqual(self.model.embedded[-1], "传播损失")
+
+    def test_least_recently_used_are_evicted(self):
+        # Room for 100 float32 vectors
+        cache = EmbeddingCache(self.path, max_size_mb=1)
+        cache.max_size_bytes = 100 * DIM * 4
+        vec = [0.1] * DIM
+        keys = [text_key("m", f"chunk {i}") for i in range(100)]
+        cache.put_many(keys, [vec] * 100)
+        cache.get_many(keys[:10])
+        cache.put_many([text_key("m", "new")], [vec])
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 91)
+        # Recently read entries survive, the oldest unread ones are gone
+        self.assertTrue(all(v is not None for v in cache.get_many(keys[:10])))
+        self.assertIsNone(cache.get_many(keys[10:11])[0])
+
+    def test_lookup_beyond_parameter_limit(self):
+        cache = EmbeddingCache(self.path)
+        keys = [text_key("m", f"chunk {i}") for i in range(cache.MAX_PARAMS * 2 + 7)]
+        cache.put_many(keys[::2], [[float(i)] * 4 for i in range(0, len(keys), 2)])
+        found = cache.get_many(keys)
+        self.assertEqual([v is not None for v in found], [i % 2 == 0 for i in range(len(keys))])
+        self.assertEqual(found[-1][0], len(keys) - 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.document_processing import DocumentProcessor
+from src.embedding_tokens import MODEL_MAX_TOKENS, SPECIAL_TOKENS, EmbeddingTokenCounter, estimate_tokens
+
+SECTION = (
+    "声纳方程把声源级、传播损失、目标强度、噪声级和指向性指数联系起来，"
+    "球面扩展的传播损失为20logR，柱面扩展为10logR。"
+    "Shallow water propagation is dominated by bottom interaction and multipath. "
+) * 40
+
+def write_bert_style_tokenizer(model_dir: str) -> None:
+    """
+    Small WordPiece tokenizer with the bge/BERT-Chinese pipeline (one token per CJK char)
+    """
+    vocab = {"[UNK]": 0, "[CLS]": 1, "[SEP]": 2}
+    for ch in sorted(set(SECTION.lower())):
+        if not ch.isspace():
+            vocab.setdefault(ch, len(vocab))
+            vocab.setdefault("##" + ch, len(vocab))
+    tokenizer = Tokenizer(models.WordPiece(vocab=vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(handle_chinese_chars=True, lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.save(os.path.join(model_dir, "tokenizer.json"))
+
+class TestTokenBudgetChunking(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        write_bert_style_tokenizer(self.tmp_dir)
+        self.counter = EmbeddingTokenCounter(self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_counter_uses_model_tokenizer(self):
+        self.assertTrue(self.counter.name.startswith("tokenizer:"))
+        self.assertEqual(self.counter.count("声纳方程"), 4)
+        self.assertEqual(EmbeddingTokenCounter(os.path.join(self.tmp_dir, "missing")).name, "estimate")
+        self.assertEqual(estimate_tokens("声纳方程 sonar"), 6)
+
+    def test_chunks_fit_model_window(self):
+        limit = MODEL_MAX_TOKENS - SPECIAL_TOKENS
+        # Character-based splitting as before: Chinese chunks run past the window
+        char_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
+        before = [self.counter.count(c) for c in char_splitter.split_text(SECTION)]
+        self.assertTrue(any(n > limit for n in before))
+
+        processor = DocumentProcessor(ocr_workers=1, cache=None)
+        processor.token_counter = self.counter
+        path = os.path.join(self.tmp_dir, "sample.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(SECTION)
+        docs = processor.process(path)
+        after = [self.counter.count(d.page_content) for d in docs]
+        self.assertTrue(all(n <= processor.chunk_token_budget for n in after))
+        # Packed close to the budget, not over-fragmented
+        self.assertGreater(sum(after) / len(after), processor.chunk_token_budget * 0.6)
+        stats = processor.chunk_length_stats()
+        self.assertEqual((stats["chunks"], stats["over_limit"]), (len(docs), 0))
+
+if __name__ == '__main__':
+    unittest.main()
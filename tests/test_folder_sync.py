@@ -0,0 +1,100 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vector_store import VectorStoreHandler
+
+class TestFolderSync(unittest.TestCase):
+    """
+    Manifest-based folder sync on a scratch index: the handler is created inside
+    a temporary working directory, so ./chroma_db and the manifest keys live there
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.old_cwd = os.getcwd()
+        cls.tmp_dir = tempfile.mkdtemp()
+        os.chdir(cls.tmp_dir)
+        cls.vs = VectorStoreHandler()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.old_cwd)
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(rel_path), exist_ok=True)
+        with open(rel_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def chunk_texts(self, key):
+        data = self.vs.vectordb._collection.get(where={"source_path": key}, include=["documents"])
+        return data["documents"]
+
+    def test_add_update_remove(self):
+        self.write("sync_a/concepts.txt", "声纳方程把声源级、传播损失和噪声级联系起来。")
+        self.write("sync_a/noise.txt", "Wenz 曲线给出了海洋环境噪声级随频率的变化。")
+        result = self.vs.sync_folder("sync_a")
+        self.assertEqual(sorted(result["added"]), ["sync_a/concepts.txt", "sync_a/noise.txt"])
+        self.assertEqual(result["updated"] + result["removed"] + result["failed"], [])
+        self.assertIsNotNone(self.vs.manifest.get("sync_a/noise.txt"))
+
+        # Nothing changed on disk: nothing to do
+        self.assertFalse(any(self.vs.sync_folder("sync_a").values()))
+
+        self.write("sync_a/concepts.txt", "主动声纳方程中混响级取代了噪声级。")
+        os.remove("sync_a/noise.txt")
+        result = self.vs.sync_folder("sync_a")
+        self.assertEqual(result["updated"], ["sync_a/concepts.txt"])
+        self.assertEqual(result["removed"], ["sync_a/noise.txt"])
+        texts = self.chunk_texts("sync_a/concepts.txt")
+        self.assertTrue(texts and all("混响级" in t for t in texts))
+        self.assertEqual(self.chunk_texts("sync_a/noise.txt"), [])
+        self.assertIsNone(self.vs.manifest.get("sync_a/noise.txt"))
+        self.assertNotIn("sync_a/noise.txt", self.vs.registry.names())
+
+    def test_same_file_name_in_subfolders(self):
+        self.write("sync_b/core/notes.txt", "深海声道 SOFAR 的声道轴附近声速最小。")
+        self.write("sync_b/supplement/notes.txt", "浅海中海底反射造成多途效应。")
+        result = self.vs.sync_folder("sync_b")
+        self.assertEqual(sorted(result["added"]), ["sync_b/core/notes.txt", "sync_b/supplement/notes.txt"])
+        self.assertTrue(all("SOFAR" in t for t in self.chunk_texts("sync_b/core/notes.txt")))
+        self.assertTrue(all("多途" in t for t in self.chunk_texts("sync_b/supplement/notes.txt")))
+
+        # Changing or deleting one of them leaves the other alone
+        self.write("sync_b/core/notes.txt", "汇聚区的距离约为 60 公里。")
+        result = self.vs.sync_folder("sync_b")
+        self.assertEqual(result["updated"], ["sync_b/core/notes.txt"])
+        self.assertTrue(all("多途" in t for t in self.chunk_texts("sync_b/supplement/notes.txt")))
+
+        os.remove("sync_b/supplement/notes.txt")
+        result = self.vs.sync_folder("sync_b")
+        self.assertEqual(result["removed"], ["sync_b/supplement/notes.txt"])
+        self.assertEqual(self.chunk_texts("sync_b/supplement/notes.txt"), [])
+        self.assertTrue(all("汇聚区" in t for t in self.chunk_texts("sync_b/core/notes.txt")))
+
+    def test_legacy_chunks_kept_until_reindexed(self):
+        self.write("sync_c/legacy.txt", "声速剖面决定了声线的弯曲方向。")
+        key = "sync_c/legacy.txt"
+        # Adopted from an index built before source_path existed
+        self.vs.vectordb.add_texts(["旧版本：声速剖面。"], metadatas=[{"source": "legacy.txt", "page": 1}], ids=["legacy-1"])
+        self.vs.manifest.record(key, key, doc_type='core', num_chunks=0, legacy=True)
+
+        def broken():
+            raise RuntimeError("parse error")
+            yield
+
+        # A failed pass keeps the previous version
+        self.assertEqual(self.vs.reindex_file(key, 'updated', broken()), 'failed')
+        self.assertEqual(self.vs.vectordb._collection.get(ids=["legacy-1"])["ids"], ["legacy-1"])
+
+        self.assertEqual(self.vs.sync_file(key), 'updated')
+        self.assertEqual(self.vs.vectordb._collection.get(ids=["legacy-1"])["ids"], [])
+        self.assertTrue(all("声线" in t for t in self.chunk_texts(key)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.folder_watcher import FolderWatcher
+from src.ingest_manifest import IngestManifest, manifest_key
+
+class FakeHandler:
+    """
+    Stands in for VectorStoreHandler: records synced and purged files in a manifest
+    """
+    def __init__(self, manifest_path):
+        self.valid_exts = ['.docx', '.pdf', '.txt']
+        self.sync_lock = threading.RLock()
+        self.manifest = IngestManifest(manifest_path)
+        self.synced = []
+
+    def sync_file(self, file_path, doc_type='core'):
+        key = manifest_key(file_path)
+        status = 'added' if self.manifest.get(key) is None else 'updated'
+        self.manifest.record(key, file_path, doc_type, num_chunks=1)
+        self.synced.append(key)
+        return status
+
+    def purge_file(self, key):
+        self.manifest.remove(key)
+
+class TestFolderWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp_dir, "data")
+        os.makedirs(os.path.join(self.data_dir, "sub"))
+        self.handler = FakeHandler(os.path.join(self.tmp_dir, "manifest.json"))
+        self.watcher = FolderWatcher(self.data_dir, handler=self.handler, quiet_ms=50, settle_s=0.2)
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, rel_path, text="声呐方程"):
+        path = os.path.join(self.data_dir, rel_path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_flush_waits_for_files_to_settle(self):
+        path = self.write("a.txt")
+        lock_file = self.write("~$a.docx")
+        now = time.time()
+        self.watcher._pending = {path: now, lock_file: now}
+        self.assertEqual(self.watcher.flush(now), [])
+        self.assertEqual(self.watcher.flush(now + 1), [manifest_key(path)])
+        self.assertEqual(self.handler.synced, [manifest_key(path)])
+
+        # A deleted folder purges every file recorded under it
+        nested = self.write(os.path.join("sub", "b.txt"))
+        self.handler.sync_file(nested)
+        shutil.rmtree(os.path.join(self.data_dir, "sub"))
+        self.watcher._pending = {os.path.join(self.data_dir, "sub"): now}
+        self.assertEqual(self.watcher.flush(now + 1), [manifest_key(nested)])
+        self.assertIsNone(self.handler.manifest.get(manifest_key(nested)))
+        self.assertEqual(self.watcher.stats()["removed"], 1)
+
+    def test_events_trigger_incremental_sync(self):
+        try:
+            import watchfiles  # noqa: F401
+        except ImportError:
+            self.skipTest("watchfiles not installed")
+        self.assertTrue(self.watcher.start())
+        time.sleep(0.3)
+        path = self.write("new.txt")
+        key = manifest_key(path)
+        deadline = time.time() + 10
+        while self.handler.manifest.get(key) is None and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertIsNotNone(self.handler.manifest.get(key))
+
+        os.remove(path)
+        deadline = time.time() + 10
+        while self.handler.manifest.get(key) is not None and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertIsNone(self.handler.manifest.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from src.document_processing import doc_processor
+from src.ingest_jobs import JOB_CANCELLED, JOB_COMPLETED, JOB_QUEUED, JOB_RUNNING, IngestJobQueue
+
+class FakeHandler:
+    """
+    Stands in for VectorStoreHandler: keeps upserted chunks in a list
+    """
+    def __init__(self, batch_size=2):
+        self.docs = []
+        self.batch_size = batch_size
+        self.before_flush = None
+
+    def ingest_documents(self, documents, file_path, doc_type, source_path=None, on_flush=None,
+                         ingest_pass=None, from_page=1):
+        batch = []
+        added = 0
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                if self.before_flush:
+                    self.before_flush(batch)
+                self.docs.extend(batch)
+                added += len(batch)
+                on_flush(batch[-1])
+                batch = []
+        if batch:
+            self.docs.extend(batch)
+            added += len(batch)
+            on_flush(batch[-1])
+        return added, 0
+
+    def delete_job_chunks(self, job_id, source_path, after_page=0):
+        self.docs = [d for d in self.docs if d.metadata["ingest_job"] != job_id or d.metadata["page"] <= after_page]
+
+    def count_job_chunks(self, job_id):
+        return sum(d.metadata["ingest_job"] == job_id for d in self.docs)
+
+def make_text_pdf(path, num_pages):
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        for j in range(3):
+            page.insert_text((72, 100 + j * 200), f"Section {i + 1}.{j + 1} transmission loss", fontsize=11)
+            page.insert_text((72, 120 + j * 200), f"Spherical spreading gives 20 log r on sheet {i + 1} part {j + 1}.", fontsize=11)
+    doc.save(path)
+
+class TestIngestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.tmp_dir, "book.pdf")
+        make_text_pdf(self.pdf_path, 5)
+        self.jobs_path = os.path.join(self.tmp_dir, "ingest_jobs.json")
+        self.handler = FakeHandler()
+        self.queue = self.make_queue()
+        self.expected = [(d.metadata["page"], d.page_content) for d in doc_processor.process(self.pdf_path)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_queue(self):
+        queue = IngestJobQueue(self.jobs_path, os.path.join(self.tmp_dir, "staging"), handler=self.handler)
+        # Jobs are run synchronously through _process in these tests
+        queue.start = lambda: None
+        return queue
+
+    def indexed(self):
+        return sorted((d.metadata["page"], d.page_content) for d in self.handler.docs)
+
+    def test_job_completes_with_progress(self):
+        job_id = self.queue.enqueue(self.pdf_path, "core")
+        self.assertEqual(self.queue.get(job_id)["status"], JOB_QUEUED)
+        self.queue._process(self.queue.jobs[job_id])
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], JOB_COMPLETED)
+        self.assertEqual((job["total_pages"], job["checkpoint_page"], job["chunks"]), (5, 5, len(self.expected)))
+        self.assertEqual(self.indexed(), sorted(self.expected))
+        self.assertEqual({d.metadata["source"] for d in self.handler.docs}, {"book.pdf"})
+        self.assertFalse(os.path.exists(job["staged_path"]))
+
+    def test_interrupted_job_resumes_from_checkpoint(self):
+        job_id = self.queue.enqueue(self.pdf_path, "core")
+        pages_parsed = []
+
+        def crash_on_page_4(batch):
+            if batch[-1].metadata["page"] >= 4:
+                raise KeyboardInterrupt()
+        self.handler.before_flush = crash_on_page_4
+        with self.assertRaises(KeyboardInterrupt):
+            self.queue._process(self.queue.jobs[job_id])
+        checkpoint = self.queue.get(job_id)["checkpoint_page"]
+        self.assertEqual(self.queue.get(job_id)["status"], JOB_RUNNING)
+        self.assertGreater(checkpoint, 0)
+        with open(self.jobs_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)[job_id]["checkpoint_page"], checkpoint)
+
+        # "Restart": a new queue loads the persisted job and resumes it
+        self.handler.before_flush = lambda batch: pages_parsed.extend(d.metadata["page"] for d in batch)
+        queue = self.make_queue()
+        self.assertEqual(queue.get(job_id)["status"], JOB_QUEUED)
+        queue._process(queue.jobs[job_id])
+        self.assertEqual(queue.get(job_id)["status"], JOB_COMPLETED)
+        self.assertEqual(self.indexed(), sorted(self.expected))
+        self.assertTrue(all(p > checkpoint for p in pages_parsed))
+
+    def test_cancel_rolls_back(self):
+        job_id = self.queue.enqueue(self.pdf_path, "core")
+
+        def cancel_midway(batch):
+            self.queue.cancel(job_id)
+        self.handler.before_flush = cancel_midway
+        self.queue._process(self.queue.jobs[job_id])
+        self.assertEqual(self.queue.get(job_id)["status"], JOB_CANCELLED)
+        self.assertEqual(self.handler.docs, [])
+        # Queued jobs are cancelled right away, finished ones cannot be
+        queued_id = self.queue.enqueue(self.pdf_path, "core")
+        self.assertTrue(self.queue.cancel(queued_id))
+        self.assertEqual(self.queue.get(queued_id)["status"], JOB_CANCELLED)
+        self.assertFalse(self.queue.cancel(queued_id))
+
+    def test_batch_is_staged_without_copies(self):
+        batch_id, job_ids = self.queue.enqueue_batch([self.pdf_path, self.pdf_path], "core")
+        staged = self.queue.get(job_ids[0])["staged_path"]
+        self.assertEqual(os.stat(staged).st_ino, os.stat(self.pdf_path).st_ino)
+        report = self.queue.batch_report(batch_id)
+        self.assertEqual((report["total"], report["finished"]), (2, 0))
+        self.assertIsNone(self.queue.batch_report("unknown"))
+
+    def test_staging_copies_across_volumes(self):
+        with mock.patch("os.link", side_effect=OSError(18, "Invalid cross-device link")):
+            job_id = self.queue.enqueue(self.pdf_path, "core")
+        staged = self.queue.get(job_id)["staged_path"]
+        self.assertNotEqual(os.stat(staged).st_ino, os.stat(self.pdf_path).st_ino)
+        # The job does not depend on the upload's temp file any more
+        os.remove(self.pdf_path)
+        self.queue._process(self.queue.jobs[job_id])
+        self.assertEqual(self.queue.get(job_id)["status"], JOB_COMPLETED)
+        self.assertFalse(os.path.exists(staged))
+
+    def test_batch_runs_on_concurrent_workers(self):
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(self.tmp_dir, f"part{i}.pdf"))
+            shutil.copy(self.pdf_path, paths[-1])
+        queue = IngestJobQueue(self.jobs_path, os.path.join(self.tmp_dir, "staging"), handler=self.handler, workers=2)
+        batch_id, job_ids = queue.enqueue_batch(paths, "core")
+        # Nothing runs before start (the app starts the queue after the index backfill)
+        time.sleep(0.2)
+        self.assertEqual([queue.get(j)["status"] for j in job_ids], [JOB_QUEUED] * 3)
+        queue.start()
+        deadline = time.time() + 30
+        while queue.batch_report(batch_id)["finished"] < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        report = queue.batch_report(batch_id)
+        self.assertEqual(report["completed"], 3)
+        self.assertEqual([f["chunks"] for f in report["files"]], [len(self.expected)] * 3)
+        self.assertGreater(report["chunks_per_s"], 0)
+        self.assertEqual(len([w for w in queue._workers if w.is_alive()]), 2)
+
+if __name__ == '__main__':
+    unittest.main()
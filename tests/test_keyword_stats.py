@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.keyword_stats import KeywordStats
+from src.utils import extract_top_keywords
+
+CHUNKS = {
+    "a-p1": "传播损失随距离增大，浅海传播损失受海底影响。",
+    "a-p2": "声纳方程把声源级、传播损失和噪声级联系起来。",
+    "b-p1": "混响限制主动声纳的作用距离，混响级随距离变化。",
+    "b-p2": "被动声纳依靠目标辐射噪声，噪声级越低越难探测。",
+}
+
+class TestKeywordStats(unittest.TestCase):
+    def assertSameRanking(self, ranking, texts, top_n):
+        """
+        Same counts as a full recount; words tied at the same count may differ
+        """
+        expected = extract_top_keywords(texts, top_n=top_n)
+        self.assertEqual([c for _, c in ranking], [c for _, c in expected])
+        full_counts = dict(extract_top_keywords(texts, top_n=10000))
+        for word, count in ranking:
+            self.assertEqual(full_counts.get(word), count)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "keyword_stats.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_matches_full_recount(self):
+        stats = KeywordStats(self.path)
+        stats.add_chunks(list(CHUNKS), list(CHUNKS.values()))
+        self.assertSameRanking(stats.top_keywords(5), list(CHUNKS.values()), 5)
+        self.assertSameRanking(stats.top_keywords(20), list(CHUNKS.values()), 20)
+
+    def test_add_and_remove_are_incremental(self):
+        stats = KeywordStats(self.path)
+        stats.add_chunks(["a-p1", "a-p2"], [CHUNKS["a-p1"], CHUNKS["a-p2"]])
+        # Re-adding a chunk that is already counted changes nothing
+        stats.add_chunks(["a-p1", "b-p1"], [CHUNKS["a-p1"], CHUNKS["b-p1"]])
+        self.assertEqual(stats.counts(["传播损失", "混响"]), {"传播损失": 3, "混响": 2})
+
+        stats.remove_chunks(["a-p1", "b-p1", "missing"])
+        self.assertEqual(stats.counts(["传播损失", "混响"]), {"传播损失": 1})
+        self.assertSameRanking(stats.top_keywords(5), [CHUNKS["a-p2"]], 5)
+
+        stats.remove_chunks(["a-p2"])
+        self.assertEqual(stats.top_keywords(5), [("暂无数据", 0)])
+        self.assertEqual(stats.stats(), {"chunks": 0, "vocabulary": 0})
+
+    def test_persisted_and_rebuilt(self):
+        stats = KeywordStats(self.path)
+        self.assertFalse(stats.built)
+        stats.add_chunks(["a-p1"], [CHUNKS["a-p1"]])
+        reopened = KeywordStats(self.path)
+        # Counted chunks alone do not cover an existing index
+        self.assertFalse(reopened.built)
+        self.assertEqual(reopened.counts(["传播损失"]), {"传播损失": 2})
+
+        reopened.rebuild(["b-p1", "b-p2"], [CHUNKS["b-p1"], CHUNKS["b-p2"]])
+        self.assertTrue(KeywordStats(self.path).built)
+        self.assertEqual(reopened.stats()["chunks"], 2)
+        self.assertEqual(reopened.counts(["传播损失", "混响"]), {"混响": 2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.onnx_embeddings import OnnxEmbeddings, parity_check
+from tests.test_embedding_tokens import write_bert_style_tokenizer
+
+TEXTS = [f"第{i}节 声纳方程与传播损失 {i}" for i in range(40)]
+QUERIES = [f"问题 {i}：传播损失怎么算？" for i in range(10)]
+
+class TableEmbeddings(Embeddings):
+    """
+    Fixed random vector per text, optionally perturbed (a less precise backend)
+    """
+    def __init__(self, noise=0.0):
+        rng = np.random.default_rng(0)
+        self.table = {t: rng.standard_normal(32) for t in TEXTS + QUERIES}
+        self.noise = noise
+        self.rng = np.random.default_rng(1)
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        v = self.table[text] + self.noise * self.rng.standard_normal(32)
+        return (v / np.linalg.norm(v)).tolist()
+
+class TestOnnxEmbeddings(unittest.TestCase):
+    def test_parity_check(self):
+        reference = TableEmbeddings()
+        result = parity_check(reference, TableEmbeddings(noise=0.01), TEXTS, QUERIES, k=5)
+        self.assertGreater(result["mean_cosine"], 0.99)
+        self.assertGreaterEqual(result["topk_overlap"], 0.9)
+        self.assertTrue(result["passed"])
+        # A backend that drifts too far fails
+        result = parity_check(reference, TableEmbeddings(noise=1.0), TEXTS, QUERIES, k=5)
+        self.assertLess(result["mean_cosine"], 0.9)
+        self.assertFalse(result["passed"])
+
+    def test_cls_pooling_on_onnx_graph(self):
+        try:
+            from onnx import TensorProto, helper, numpy_helper
+        except ImportError:
+            self.skipTest("onnx not installed")
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+        write_bert_style_tokenizer(tmp_dir)
+        # Token embedding lookup standing in for the transformer
+        table = np.random.default_rng(0).standard_normal((400, 16)).astype(np.float32)
+        inputs = [helper.make_tensor_value_info(n, TensorProto.INT64, ["batch", "seq"])
+                  for n in ("input_ids", "attention_mask", "token_type_ids")]
+        output = helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "seq", 16])
+        graph = helper.make_graph(
+            [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+            "lookup", inputs, [output], [numpy_helper.from_array(table, "table")]
+        )
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 14)])
+        model.ir_version = 8
+        with open(os.path.join(tmp_dir, "model.onnx"), "wb") as f:
+            f.write(model.SerializeToString())
+
+        embeddings = OnnxEmbeddings(tmp_dir, onnx_file="model.onnx", batch_size=2)
+        texts = ["声纳方程", "传播损失", "声纳"]
+        vectors = np.array(embeddings.embed_documents(texts))
+        ids = [embeddings.tokenizer.encode(t).ids[0] for t in texts]
+        expected = table[ids] / np.linalg.norm(table[ids], axis=1, keepdims=True)
+        np.testing.assert_allclose(vectors, expected, rtol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parse_cache import ParseCache, file_digest, make_key
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(cache_dir=os.path.join(self.tmp_dir, "cache"), max_size_mb=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_key_depends_on_content_and_settings(self):
+        path = os.path.join(self.tmp_dir, "a.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("传播损失")
+        digest = file_digest(path)
+        self.assertEqual(make_key(digest, {"chunk_size": 800}), make_key(digest, {"chunk_size": 800}))
+        self.assertNotEqual(make_key(digest, {"chunk_size": 800}), make_key(digest, {"chunk_size": 400}))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("。")
+        self.assertNotEqual(digest, file_digest(path))
+
+    def test_round_trip_and_counters(self):
+        key = make_key("abc", {})
+        self.assertIsNone(self.cache.get_chunks(key))
+        self.cache.put_chunks(key, [(1, "声纳方程"), (2, "多途效应")])
+        self.assertEqual(self.cache.get_chunks(key), [(1, "声纳方程"), (2, "多途效应")])
+        self.cache.put_ocr_pages(key, {"0": "第一页", "3": ""})
+        self.assertEqual(self.cache.get_ocr_pages(key), {"0": "第一页", "3": ""})
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], {"ocr": 1, "chunks": 1})
+        self.assertEqual(stats["misses"], {"ocr": 0, "chunks": 1})
+
+    def test_size_based_eviction(self):
+        payload = {"0": "x" * 100 * 1024}
+        for i in range(15):
+            self.cache.put_ocr_pages(make_key(str(i), {}), payload)
+        self.assertLessEqual(self.cache.stats()["size_mb"], 1.0)
+        # Most recent entry survives
+        self.assertIsNotNone(self.cache.get_ocr_pages(make_key("14", {})))
+        self.assertIsNone(self.cache.get_ocr_pages(make_key("0", {})))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.source_registry import SourceRegistry
+
+class TestSourceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "source_registry.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_record_list_and_remove(self):
+        registry = SourceRegistry(self.path)
+        self.assertFalse(registry.built)
+        registry.record("data/b.pdf", "b.pdf", "core", chunks=12, pages=4, sha256="bb", over_limit=2)
+        registry.record("data/a.txt", "a.txt", "supplement", chunks=3, pages=1)
+        registry.record("data/sub/a.txt", "a.txt", "core", chunks=5, pages=1)
+
+        self.assertEqual(registry.totals(), {"files": 3, "chunks": 20, "pages": 6, "over_limit": 2})
+        self.assertEqual(registry.names(), ["a.txt", "b.pdf"])
+        self.assertEqual([e["source_path"] for e in registry.list_sources(0, 2)], ["data/a.txt", "data/b.pdf"])
+        self.assertEqual([e["source_path"] for e in registry.list_sources(2, 2)], ["data/sub/a.txt"])
+        entry = registry.get("data/b.pdf")
+        self.assertEqual((entry["doc_type"], entry["chunks"], entry["pages"], entry["sha256"]), ("core", 12, 4, "bb"))
+
+        # Re-ingestion replaces the entry
+        registry.record("data/b.pdf", "b.pdf", "core", chunks=10, pages=4, sha256="cc")
+        self.assertEqual(registry.get("data/b.pdf")["chunks"], 10)
+        registry.remove("data/b.pdf", "data/missing.txt")
+        self.assertIsNone(registry.get("data/b.pdf"))
+        self.assertEqual(registry.totals()["files"], 2)
+
+        # Persisted; the file alone does not mark it built
+        reopened = SourceRegistry(self.path)
+        self.assertFalse(reopened.built)
+        self.assertEqual(reopened.totals(), {"files": 2, "chunks": 8, "pages": 2, "over_limit": 0})
+
+    def test_rebuild_from_chunk_metadata(self):
+        registry = SourceRegistry(self.path)
+        registry.record("stale.pdf", "stale.pdf", "core", chunks=1, pages=1)
+        metadatas = [
+            {"source": "a.pdf", "source_path": "data/a.pdf", "page": 1, "doc_type": "core", "tokens": 600},
+            {"source": "a.pdf", "source_path": "data/a.pdf", "page": 1, "doc_type": "core", "tokens": 510},
+            {"source": "a.pdf", "source_path": "data/a.pdf", "page": 2, "doc_type": "core"},
+            # Indexed before source_path existed
+            {"source": "old.docx", "page": 1},
+            None,
+        ]
+        self.assertEqual(registry.rebuild(metadatas), 2)
+        self.assertTrue(SourceRegistry(self.path).built)
+        self.assertIsNone(registry.get("stale.pdf"))
+        entry = registry.get("data/a.pdf")
+        self.assertEqual((entry["chunks"], entry["pages"], entry["legacy"], entry["over_limit"]), (3, 2, 0, 1))
+        self.assertEqual(registry.get("old.docx")["legacy"], 1)
+
+    def test_adds_over_limit_column_to_old_registry(self):
+        import sqlite3
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE sources (source_path TEXT PRIMARY KEY, source TEXT NOT NULL, doc_type TEXT, "
+            "chunks INTEGER NOT NULL, pages INTEGER NOT NULL, sha256 TEXT, "
+            "ingested_at REAL NOT NULL, legacy INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("INSERT INTO sources VALUES ('data/a.pdf', 'a.pdf', 'core', 5, 2, NULL, 0, 0)")
+        conn.commit()
+        conn.close()
+        registry = SourceRegistry(self.path)
+        self.assertEqual(registry.get("data/a.pdf")["over_limit"], 0)
+        registry.record("data/b.pdf", "b.pdf", "core", chunks=3, pages=1, over_limit=1)
+        self.assertEqual(registry.totals()["over_limit"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
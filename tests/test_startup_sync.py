@@ -0,0 +1,65 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.startup_sync import SYNC_DONE, SYNC_FAILED, SYNC_RUNNING, BackgroundSync
+
+class FakeHandler:
+    """
+    sync_folder blocks until released, reporting progress per file
+    """
+    def __init__(self, fail=False):
+        self.release = threading.Event()
+        self.fail = fail
+        self.calls = []
+
+    def ensure_bm25(self):
+        self.calls.append("ensure_bm25")
+
+    def ensure_keyword_stats(self):
+        self.calls.append("ensure_keyword_stats")
+
+    def sync_folder(self, folder_path, workers=1, progress=None):
+        self.calls.append("sync_folder")
+        progress(1, 3, "data/a.pdf")
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("disk full")
+        progress(3, 3, "data/c.txt")
+        return {"added": ["data/a.pdf", "data/b.docx"], "updated": [], "removed": ["data/old.txt"], "failed": []}
+
+class TestBackgroundSync(unittest.TestCase):
+    def test_progress_and_completion(self):
+        handler = FakeHandler()
+        sync = BackgroundSync(handler)
+        finished = threading.Event()
+        self.assertTrue(sync.start("data", on_done=finished.set, on_ready=lambda: handler.calls.append("on_ready")))
+        self.assertFalse(sync.start("data"))
+        # The caller is not blocked while the sync runs
+        status = sync.status()
+        self.assertEqual(status["state"], SYNC_RUNNING)
+        handler.release.set()
+        self.assertTrue(sync.wait(5))
+        self.assertTrue(finished.is_set())
+        status = sync.status()
+        self.assertEqual((status["state"], status["done"], status["total"]), (SYNC_DONE, 3, 3))
+        self.assertEqual(status["result"], {"added": 2, "updated": 0, "removed": 1, "failed": 0})
+        # The backfills run in the sync thread; the job queue starts before the folder sync
+        self.assertEqual(handler.calls, ["ensure_bm25", "ensure_keyword_stats", "on_ready", "sync_folder"])
+
+    def test_failure_is_reported(self):
+        handler = FakeHandler(fail=True)
+        handler.release.set()
+        sync = BackgroundSync(handler)
+        sync.start("data")
+        sync.wait(5)
+        status = sync.status()
+        self.assertEqual((status["state"], status["error"]), (SYNC_FAILED, "disk full"))
+        self.assertEqual(status["current"], "data/a.pdf")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import random
+import re
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.text_normalizer import TextNormalizer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def legacy_clean_text(text: str) -> str:
+    """
+    Frozen copy of DocumentProcessor.clean_text before TextNormalizer, the golden reference
+    """
+    lines = text.splitlines()
+    cleaned_lines = []
+    for line in lines:
+        raw = line.strip()
+        if not raw:
+            continue
+        lower = raw.lower()
+        if re.fullmatch(r'[0-9ivxlcdm\.]+', lower):
+            continue
+        if re.search(r'page\s*\d+', lower):
+            continue
+        if re.search(r'https?://', lower):
+            continue
+        if '@' in lower and ' ' not in lower:
+            continue
+        if len(raw) <= 3 and all(ch in '-_=·•—~*·. ' for ch in raw):
+            continue
+        special_chars = re.findall(r'[^\u4e00-\u9fa5a-zA-Z0-9\s\.\,\，\。\、\(\)（）]', raw)
+        if len(raw) > 5 and len(special_chars) / len(raw) > 0.4:
+            continue
+        if len(raw) < 4 and not re.match(r'^\d', raw) and not re.match(r'^第', raw):
+            if not re.search(r'[\u4e00-\u9fa5]', raw):
+                continue
+        cleaned_lines.append(raw)
+    text = ' '.join(cleaned_lines)
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+    return text
+
+GOLDEN_LINES = [
+    "第一章 绪论", "1.1 研究背景", "12", "iv", "3.2.", "XIV", "Page 12", "page12 of 300", "PAGE 7",
+    "参见 https://example.com/a", "HTTP://X.ORG", "author@example.com", "mail: a@b.c",
+    "---", "•", "~*~", "· ·", "——", "a", "ab", "ab1", "1a", "第", "第三", "声", "x声",
+    "TL = 20log(r) + αr", "∑∫∂√∞≈≠≤≥", "SL-TL+TS-(NL-DI)=DT", "【结果】 ±3 dB", "１２３",
+    "　全角空格　行", "tab\tseparated\tline", "声速 c=1500 m/s，深度 z=100 m。",
+    "Wenz曲线 (1962)", "∗∗∗∗∗∗∗", "ⅣⅤ", "²³", "ı", "İ", "K", "\x1c\x1dtext\x1e",
+]
+
+def golden_corpus():
+    texts = ["\n".join(GOLDEN_LINES)]
+    for name in ("rag_input.txt", "test_questions.md", "README.md", "TESTING_GUIDE.md"):
+        path = os.path.join(ROOT, name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                texts.append(f.read())
+    # Seeded fuzz over a pool mixing Chinese, ASCII, symbols, digits and whitespace
+    rng = random.Random(20240601)
+    pool = list("水声工程传播损失声纳第章节abcXYZivxlcdm0123456789.,，。、()（）-_=·•—~*@:/ \t　αβ∑√±【】%#&")
+    for _ in range(300):
+        lines = ["".join(rng.choice(pool) for _ in range(rng.randint(0, 14))) for _ in range(rng.randint(1, 12))]
+        texts.append("\n".join(lines))
+    return texts
+
+class TestTextNormalizer(unittest.TestCase):
+    def test_matches_legacy_clean_text_on_golden_corpus(self):
+        normalizer = TextNormalizer()
+        for text in golden_corpus():
+            self.assertEqual(normalizer.normalize(text), legacy_clean_text(text), repr(text[:200]))
+
+    def test_rule_hit_counters(self):
+        normalizer = TextNormalizer()
+        normalizer.normalize("Page 3\n12\n声纳方程\nhttps://a.b\n---\n\n∑∫∂√∞≈≠")
+        stats = normalizer.stats()
+        self.assertEqual(stats["lines_kept"], 1)
+        self.assertEqual(stats["dropped"], {
+            "empty": 1, "numbering": 1, "page_marker": 1, "url": 1, "decoration": 1, "special_chars": 1
+        })
+
+    def test_per_file_hits(self):
+        normalizer = TextNormalizer()
+        normalizer.normalize("Page 1\n声纳方程")
+        normalizer.begin_file()
+        normalizer.normalize("Page 2\nhttps://a.b\n传播损失")
+        normalizer.normalize("Page 3\n混响")
+        self.assertEqual(normalizer.end_file(), {"page_marker": 2, "url": 1})
+        # Not counting outside begin_file/end_file
+        normalizer.normalize("Page 4")
+        self.assertEqual(normalizer.end_file(), {})
+        self.assertEqual(normalizer.stats()["dropped"], {"page_marker": 4, "url": 1})
+
+if __name__ == '__main__':
+    unittest.main()
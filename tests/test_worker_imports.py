@@ -0,0 +1,39 @@
+import unittest
+import os
+import subprocess
+import sys
+
+# Add project root to sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# Modules that load a model or open the index on import
+HEAVY_MODULES = ["src.vector_store", "src.qa_chain", "torch", "sentence_transformers", "chromadb", "gradio"]
+
+class TestWorkerImports(unittest.TestCase):
+    """
+    Process pool workers started with spawn (Windows) import the module of the
+    task function in a fresh interpreter; it must not pull in the heavy singletons
+    """
+    def heavy_imports(self, module: str):
+        code = (
+            f"import sys; import {module}; "
+            f"print('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        line = [l for l in result.stdout.splitlines() if l.startswith("heavy:")][-1]
+        return [m for m in line[len("heavy:"):].split(",") if m]
+
+    def test_bulk_ingest_worker(self):
+        self.assertEqual(self.heavy_imports("src.bulk_ingest"), [])
+
+    def test_ocr_worker(self):
+        self.assertEqual(self.heavy_imports("src.document_processing"), [])
+
+    def test_embedding_worker(self):
+        # The worker loads its own model copy in the initializer, not on import
+        self.assertEqual(self.heavy_imports("src.batch_embedder"), [])
+
+if __name__ == '__main__':
+    unittest.main()